@@ -0,0 +1,443 @@
+"""
+Batching agent server for many Tetris environments on one machine.
+
+Instead of every worker process building its own HeuristicAgent, workers
+connect to one server over a local Unix socket. The server collects the
+requests that arrive within a short window and evaluates all of them with
+one HeuristicAgent.evaluate_placements_batch() call. Each worker uses a
+RemoteAgent, a HeuristicAgent that asks the server for the scored placements
+and only finds the action path to the winner itself:
+
+    python agent_server.py serve --socket /tmp/tetris-agent.sock
+    python agent_server.py clients --socket /tmp/tetris-agent.sock --clients 8
+
+Requests and responses are length-prefixed binary frames. A request holds
+the board grid packed to one bit per cell and the shape of the falling
+piece; a response starts with a status byte and holds either the rotation,
+position, score and features of every placement or an error message. The
+request queue is bounded, so a server that falls behind stops reading from
+its clients instead of buffering without limit.
+"""
+import sys
+import os
+import time
+import asyncio
+import socket
+import stat
+import struct
+import argparse
+from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any
+import numpy as np
+from numpy.typing import NDArray
+
+# Add the parent directory to the Python path
+sys.path.append('..')
+
+from tetris.environment.tetris_env import TetrisEnv
+from tetris.engine.board import Board
+
+from examples.board_features import FEATURE_NAMES
+from examples.placement import Placement, piece_symmetry
+from examples.heuristic_agent import HeuristicAgent, MoveEvaluation
+from examples.benchmark_agent import LatencyRecorder
+
+DEFAULT_SOCKET = "/tmp/tetris-agent.sock"
+
+# Frame length prefix and request header: rows, cols, shape rows, shape cols
+_LENGTH = struct.Struct('<I')
+_REQUEST_HEADER = struct.Struct('<BBBB')
+
+# First byte of a response
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+# One scored placement in a response
+PLACEMENT_DTYPE = np.dtype([
+    ('rotation', 'i1'), ('x', 'i1'), ('y', 'i1'), ('score', '<f4'), ('features', '<f4', (len(FEATURE_NAMES),))
+])
+
+
+def encode_request(grid: NDArray[np.int8], shape: NDArray[np.int8]) -> bytes:
+    """Pack a board grid and a piece shape into a request payload."""
+    return (_REQUEST_HEADER.pack(*grid.shape, *shape.shape)
+            + np.packbits(grid > 0).tobytes()
+            + (shape > 0).astype(np.uint8).tobytes())
+
+
+def decode_request(payload: bytes) -> tuple[NDArray[np.int8], NDArray[np.int8]]:
+    """
+    Unpack a request payload into a grid (1 for filled cells) and a piece shape.
+
+    Raises:
+        ValueError: If the payload is malformed, the grid is empty or the shape has no filled cell
+    """
+    if len(payload) < _REQUEST_HEADER.size:
+        raise ValueError(f"Request of {len(payload)} bytes is shorter than its header")
+    rows, cols, shape_rows, shape_cols = _REQUEST_HEADER.unpack_from(payload)
+    offset = _REQUEST_HEADER.size
+    grid_bytes = (rows * cols + 7) // 8
+    if len(payload) != offset + grid_bytes + shape_rows * shape_cols:
+        raise ValueError(f"Request of {len(payload)} bytes does not match a {rows}x{cols} grid "
+                         f"and a {shape_rows}x{shape_cols} shape")
+    if rows == 0 or cols == 0:
+        raise ValueError(f"Grid of {rows}x{cols} cells is empty")
+    grid = np.unpackbits(np.frombuffer(payload, np.uint8, grid_bytes, offset), count=rows * cols)
+    shape = np.frombuffer(payload, np.uint8, shape_rows * shape_cols, offset + grid_bytes)
+    if not shape.any():
+        raise ValueError("Piece shape has no filled cell")
+    return (grid.reshape(rows, cols).astype(np.int8),
+            shape.reshape(shape_rows, shape_cols).astype(np.int8))
+
+
+def encode_response(evaluations: list[MoveEvaluation]) -> bytes:
+    """Pack the scored placements of one board into a response payload."""
+    records = np.empty(len(evaluations), dtype=PLACEMENT_DTYPE)
+    for i, evaluation in enumerate(evaluations):
+        placement = evaluation.placement
+        records[i] = (placement.rotation, placement.x, placement.y, evaluation.score,
+                      [evaluation.metrics[name] for name in FEATURE_NAMES])
+    return bytes([STATUS_OK]) + records.tobytes()
+
+
+def encode_error(message: str) -> bytes:
+    """Pack an error message into a response payload."""
+    return bytes([STATUS_ERROR]) + message.encode()
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> bytes:
+    """Read one length-prefixed frame from a stream."""
+    (length,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    return await reader.readexactly(length)
+
+
+@dataclass
+class ServerStats:
+    """Counters of an agent server."""
+    requests: int = 0
+    batches: int = 0
+    max_batch: int = 0
+    peak_queue: int = 0  # Most requests waiting for a batch at once
+    latencies: LatencyRecorder = field(default_factory=LatencyRecorder)  # From arrival until the response is sent
+
+    def summary(self) -> dict[str, float]:
+        """Get the counters, the mean batch size and the latency percentiles."""
+        latency = self.latencies.summary()
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'mean_batch': self.requests / self.batches if self.batches else 0.0,
+            'max_batch': self.max_batch,
+            'peak_queue': self.peak_queue,
+            'p50_ms': latency['p50_ms'],
+            'p95_ms': latency['p95_ms'],
+            'p99_ms': latency['p99_ms'],
+        }
+
+
+class AgentServer:
+    """Serves batched placement evaluations of one agent over a Unix socket."""
+
+    def __init__(self, agent: HeuristicAgent, path: str = DEFAULT_SOCKET, batch_window_ms: float = 1.0,
+                 max_batch: int = 64, max_pending: int = 256):
+        """
+        Set up the server.
+
+        Args:
+            agent: Agent whose weights score the placements
+            path: Path of the Unix socket
+            batch_window_ms: How long the first request of a batch waits for others
+            max_batch: Most requests evaluated in one batch
+            max_pending: Most requests waiting for a batch; clients are not read
+                from while the queue is full
+        """
+        self.agent: HeuristicAgent = agent
+        self.path: str = path
+        self.batch_window: float = batch_window_ms / 1000
+        self.max_batch: int = max_batch
+        self.stats: ServerStats = ServerStats()
+        self._queue: asyncio.Queue[tuple[NDArray[np.int8], NDArray[np.int8], asyncio.Future[bytes]]] = (
+            asyncio.Queue(maxsize=max_pending)
+        )
+
+    async def serve(self, stats_interval: float | None = None) -> None:
+        """
+        Accept clients until the task is cancelled.
+
+        Args:
+            stats_interval: Print the stats every this many seconds, or None
+        """
+        self._remove_stale_socket()
+        server = await asyncio.start_unix_server(self._handle_client, path=self.path)
+        tasks = [asyncio.create_task(self._batch_loop())]
+        if stats_interval:
+            tasks.append(asyncio.create_task(self._report_loop(stats_interval)))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in tasks:
+                _ = task.cancel()
+            if os.path.exists(self.path) and stat.S_ISSOCK(os.stat(self.path).st_mode):
+                os.remove(self.path)
+
+    def _remove_stale_socket(self) -> None:
+        """
+        Remove a socket left behind at the path by a server that is gone.
+
+        Raises:
+            FileExistsError: If the path is not a socket, or a server still answers on it
+        """
+        if not os.path.exists(self.path):
+            return
+        if not stat.S_ISSOCK(os.stat(self.path).st_mode):
+            raise FileExistsError(f"{self.path} exists and is not a socket")
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except ConnectionRefusedError:
+            os.remove(self.path)
+            return
+        finally:
+            probe.close()
+        raise FileExistsError(f"Another server is listening on {self.path}")
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer the requests of one client, one at a time."""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                payload = await _read_frame(reader)
+                arrived = time.perf_counter()
+                try:
+                    grid, shape = decode_request(payload)
+                except ValueError as error:
+                    response = encode_error(str(error))
+                else:
+                    future: asyncio.Future[bytes] = loop.create_future()
+                    # Blocks while the queue is full, which stops reading from this client
+                    await self._queue.put((grid, shape, future))
+                    self.stats.peak_queue = max(self.stats.peak_queue, self._queue.qsize())
+                    try:
+                        response = await future
+                    except Exception as error:
+                        response = encode_error(f"Evaluation failed: {error!r}")
+                writer.write(_LENGTH.pack(len(response)) + response)
+                await writer.drain()
+                self.stats.latencies.record((time.perf_counter() - arrived) * 1000, True)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _batch_loop(self) -> None:
+        """Collect requests into batches and evaluate them."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except TimeoutError:
+                    break
+
+            # Only boards of the same size can be stacked into one evaluation
+            groups: dict[tuple[int, ...], list[tuple[NDArray[np.int8], NDArray[np.int8], asyncio.Future[bytes]]]] = {}
+            for request in batch:
+                groups.setdefault(request[0].shape, []).append(request)
+            for group in groups.values():
+                self._evaluate_group(group)
+            self.stats.requests += len(batch)
+
+    def _evaluate_group(self, group: list[tuple[NDArray[np.int8], NDArray[np.int8], asyncio.Future[bytes]]]) -> None:
+        """Evaluate requests with boards of one size, failing all of them if the evaluation raises."""
+        self.stats.batches += 1
+        self.stats.max_batch = max(self.stats.max_batch, len(group))
+        try:
+            results = self.agent.evaluate_placements_batch(
+                [grid for grid, _, _ in group], [shape for _, shape, _ in group]
+            )
+            for (_, _, future), evaluations in zip(group, results):
+                if not future.done():
+                    future.set_result(encode_response(evaluations))
+        except Exception as error:
+            for _, _, future in group:
+                if not future.done():
+                    future.set_exception(error)
+
+    async def _report_loop(self, interval: float) -> None:
+        """Print the stats periodically, skipping intervals without requests."""
+        reported = 0
+        while True:
+            await asyncio.sleep(interval)
+            if self.stats.requests != reported:
+                reported = self.stats.requests
+                print(format_stats(self.stats.summary()))
+
+
+def format_stats(summary: dict[str, float]) -> str:
+    """Format a ServerStats summary on one line."""
+    return (f"requests: {summary['requests']}, batches: {summary['batches']}, "
+            f"mean batch: {summary['mean_batch']:.1f}, max batch: {summary['max_batch']}, "
+            f"peak queue: {summary['peak_queue']}, latency p50/p95/p99: "
+            f"{summary['p50_ms']:.2f}/{summary['p95_ms']:.2f}/{summary['p99_ms']:.2f} ms")
+
+
+class RemoteAgent(HeuristicAgent):
+    """
+    HeuristicAgent whose placements are scored by an AgentServer.
+
+    Plans, path finding and the transposition table stay local; only the
+    evaluation of the candidate placements goes to the server, so the
+    server's weights decide. Lookahead and BFS search are not available.
+    """
+
+    def __init__(self, path: str = DEFAULT_SOCKET, **kwargs: Any):
+        """
+        Connect to a server.
+
+        Args:
+            path: Path of the server's Unix socket
+            **kwargs: Further HeuristicAgent arguments
+        """
+        super().__init__(**kwargs)
+        if self.search_mode != 'placement' or self.lookahead or self.deadline_ms is not None:
+            raise ValueError("RemoteAgent only supports the placement search without lookahead or deadline")
+        self.connection: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.connection.connect(path)
+
+    def close(self) -> None:
+        """Disconnect from the server."""
+        self.connection.close()
+
+    def _receive(self, size: int) -> bytes:
+        """Read exactly size bytes from the server."""
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.connection.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("Agent server closed the connection")
+            data.extend(chunk)
+        return bytes(data)
+
+    def _evaluate_placements(self, board: Board) -> list[MoveEvaluation]:
+        """
+        Get every distinct drop of the current piece, scored by the server.
+
+        Args:
+            board: The board with the current piece
+
+        Returns:
+            List of move evaluations
+
+        Raises:
+            ValueError: If the server could not evaluate the board
+        """
+        if board.current_piece is None or board.game_over:
+            return []
+
+        start = time.perf_counter()
+        shape = board.current_piece.shape
+        request = encode_request(board.grid, shape)
+        self.connection.sendall(_LENGTH.pack(len(request)) + request)
+        (length,) = _LENGTH.unpack(self._receive(_LENGTH.size))
+        response = self._receive(length)
+        if response[0] != STATUS_OK:
+            raise ValueError(f"Agent server rejected the board: {response[1:].decode()}")
+        records = np.frombuffer(response, dtype=PLACEMENT_DTYPE, offset=1)
+        self.last_stats.scoring_ms += (time.perf_counter() - start) * 1000
+        self.last_stats.candidates += len(records)
+
+        orientations = {orientation.rotation: orientation for orientation in piece_symmetry(shape).orientations}
+        evaluations: list[MoveEvaluation] = []
+        for record in records:
+            orientation = orientations[int(record['rotation'])]
+            evaluations.append(MoveEvaluation(
+                action_sequence=[],
+                score=float(record['score']),
+                metrics=dict(zip(FEATURE_NAMES, record['features'].tolist())),
+                placement=Placement(rotation=orientation.rotation, x=int(record['x']), y=int(record['y']),
+                                    shape=orientation.shape, cells=orientation.cells)
+            ))
+        return evaluations
+
+
+def _play_remote_episode(path: str, seed: int, max_steps: int) -> tuple[int, int, float]:
+    """
+    Play one seeded episode with a RemoteAgent in a worker process.
+
+    Returns:
+        Tuple of (steps, score, duration in seconds)
+    """
+    agent = RemoteAgent(path)
+    env = TetrisEnv()
+    _, info = env.reset(seed=seed)
+    start = time.perf_counter()
+    steps = 0
+    while steps < max_steps:
+        action, _, _, _ = agent.get_best_action(env)
+        _, _, terminated, _, info = env.step(np.int64(action.value))
+        steps += 1
+        if terminated:
+            break
+    agent.close()
+    return steps, info['score'], time.perf_counter() - start
+
+
+def main():
+    """Main function to run the server or a set of benchmark clients."""
+    parser = argparse.ArgumentParser(description='Batching agent server for many Tetris environments')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help='Run the server until interrupted')
+    _ = serve.add_argument('--socket', type=str, default=DEFAULT_SOCKET, help='Path of the Unix socket')
+    _ = serve.add_argument('--batch-window-ms', type=float, default=1.0,
+                           help='How long the first request of a batch waits for others')
+    _ = serve.add_argument('--max-batch', type=int, default=64, help='Most requests evaluated in one batch')
+    _ = serve.add_argument('--max-pending', type=int, default=256,
+                           help='Most requests waiting for a batch before clients are no longer read')
+    _ = serve.add_argument('--stats-interval', type=float, default=5.0,
+                           help='Print the stats every this many seconds (0 to disable)')
+
+    clients = commands.add_parser('clients', help='Play episodes through a running server and report throughput')
+    _ = clients.add_argument('--socket', type=str, default=DEFAULT_SOCKET, help='Path of the Unix socket')
+    _ = clients.add_argument('--clients', type=int, default=8, help='Number of client processes')
+    _ = clients.add_argument('--max-steps', type=int, default=2000, help='Step limit per episode')
+    _ = clients.add_argument('--seed', type=int, default=0, help='Base seed; client i plays seed + i')
+
+    args: Namespace = parser.parse_args()
+
+    if args.command == 'serve':
+        server = AgentServer(HeuristicAgent(), args.socket, batch_window_ms=args.batch_window_ms,
+                             max_batch=args.max_batch, max_pending=args.max_pending)
+        print(f"Serving on {args.socket}")
+        try:
+            asyncio.run(server.serve(stats_interval=args.stats_interval or None))
+        except KeyboardInterrupt:
+            pass
+        print(format_stats(server.stats.summary()))
+        return
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.clients) as pool:
+        outcomes = list(pool.map(_play_remote_episode, [args.socket] * args.clients,
+                                 [args.seed + i for i in range(args.clients)],
+                                 [args.max_steps] * args.clients))
+    duration = time.perf_counter() - start
+    steps = sum(episode_steps for episode_steps, _, _ in outcomes)
+    print(f"{args.clients} clients played {steps} steps in {duration:.2f} seconds ({steps / duration:.1f} steps/s)")
+    for i, (episode_steps, score, _) in enumerate(outcomes):
+        print(f"  Client {i}: {episode_steps} steps, score {score}")
+
+
+if __name__ == "__main__":
+    main()
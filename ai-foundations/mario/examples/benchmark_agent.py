@@ -0,0 +1,344 @@
+"""
+Headless throughput benchmark for the heuristic-based Tetris agent.
+
+Unlike test_heuristic_agent.py, this script never sleeps between moves,
+never renders, does not import tabulate and keeps no per-step metrics. Each
+episode only fills preallocated latency arrays and a few counters, so the
+numbers it reports measure the agent and the environment, not the harness.
+The agent's modules import the engine from its submodules, but Python runs
+the tetris package's __init__ first, which may load the renderer and pygame;
+that happens once at start-up, outside the timed loop.
+"""
+import sys
+import time
+import argparse
+from argparse import Namespace
+import json
+from typing import Any, TypedDict
+import numpy as np
+from numpy.typing import NDArray
+
+# Add the parent directory to the Python path
+sys.path.append('..')
+
+from tetris.environment.tetris_env import TetrisEnv
+from examples.heuristic_agent import HeuristicAgent, SEARCH_MODES
+from examples.vector_env import VectorTetrisEnv
+
+# Decision latency percentiles reported by the benchmark
+PERCENTILES: tuple[int, ...] = (50, 95, 99)
+
+# Initial number of decisions the latency arrays hold before they grow
+INITIAL_CAPACITY = 4096
+
+
+class LatencySummary(TypedDict):
+    count: int
+    mean_ms: float
+    max_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+
+class BenchmarkResult(TypedDict):
+    episodes: int
+    steps: int
+    pieces: int
+    score: int
+    lines_cleared: int
+    duration: float
+    steps_per_sec: float
+    pieces_per_sec: float
+    decision_latency: LatencySummary
+    search_latency: LatencySummary
+
+
+class LatencyRecorder:
+    """Decision latencies in a preallocated array that doubles when it is full."""
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self.latencies: NDArray[np.float64] = np.empty(capacity, dtype=np.float64)
+        self.searched: NDArray[np.bool_] = np.empty(capacity, dtype=np.bool_)
+        self.count: int = 0
+
+    def record(self, latency_ms: float, searched: bool) -> None:
+        """
+        Store the latency of one decision.
+
+        Args:
+            latency_ms: Wall time of the decision in milliseconds
+            searched: Whether the agent searched, rather than replaying its plan
+        """
+        if self.count == len(self.latencies):
+            self.latencies = np.resize(self.latencies, 2 * self.count)
+            self.searched = np.resize(self.searched, 2 * self.count)
+        self.latencies[self.count] = latency_ms
+        self.searched[self.count] = searched
+        self.count += 1
+
+    def summary(self, searches_only: bool = False) -> LatencySummary:
+        """
+        Summarize the recorded latencies.
+
+        Args:
+            searches_only: Whether to only include decisions that searched
+
+        Returns:
+            Count, mean, maximum and percentiles of the latencies
+        """
+        latencies = self.latencies[:self.count]
+        if searches_only:
+            latencies = latencies[self.searched[:self.count]]
+        if len(latencies) == 0:
+            return LatencySummary(count=0, mean_ms=0.0, max_ms=0.0, p50_ms=0.0, p95_ms=0.0, p99_ms=0.0)
+        p50, p95, p99 = np.percentile(latencies, PERCENTILES).tolist()
+        return LatencySummary(
+            count=len(latencies),
+            mean_ms=float(latencies.mean()),
+            max_ms=float(latencies.max()),
+            p50_ms=p50,
+            p95_ms=p95,
+            p99_ms=p99
+        )
+
+
+def run_benchmark_episode(agent: HeuristicAgent, env: TetrisEnv, recorder: LatencyRecorder,
+                          seed: int | None = None, max_steps: int | None = None) -> tuple[int, int, int, int]:
+    """
+    Play one episode as fast as possible.
+
+    Args:
+        agent: The Tetris agent to benchmark
+        env: The environment to play in
+        recorder: Receives the latency of every decision
+        seed: Seed for the environment's piece sequence, or None for an unseeded episode
+        max_steps: Stop the episode after this many steps, or None to play until game over
+
+    Returns:
+        Tuple of (steps, pieces placed, score, lines cleared)
+    """
+    _, info = env.reset(seed=seed)
+    agent.reset()
+
+    steps = 0
+    pieces = 0
+    piece = env.board.current_piece
+    perf_counter = time.perf_counter
+    while max_steps is None or steps < max_steps:
+        start = perf_counter()
+        best_action, _, _, stats = agent.get_best_action(env)
+        recorder.record((perf_counter() - start) * 1000, not stats.replayed)
+
+        _, _, terminated, _, info = env.step(np.int64(best_action.value))
+        steps += 1
+
+        # A new piece object is spawned whenever the previous one locks
+        if env.board.current_piece is not piece:
+            piece = env.board.current_piece
+            pieces += 1
+
+        if terminated:
+            break
+
+    return steps, pieces, info['score'], info['lines_cleared']
+
+
+def run_benchmark(weights: dict[str, float] | None = None,
+                  episodes: int = 3,
+                  seed: int | None = 0,
+                  max_steps: int | None = None,
+                  agent_options: dict[str, Any] | None = None) -> BenchmarkResult:
+    """
+    Benchmark the agent over several episodes.
+
+    Args:
+        weights: Dictionary of weights for the heuristic agent (None for the agent's defaults)
+        episodes: Number of episodes to play
+        seed: Base seed; episode i is played with seed + i. None leaves the episodes unseeded
+        max_steps: Step limit per episode, or None to play every episode until game over
+        agent_options: Further HeuristicAgent arguments
+
+    Returns:
+        Dictionary with throughput and latency results
+    """
+    agent = HeuristicAgent(weights=weights, **(agent_options or {}))
+    env = TetrisEnv()
+    recorder = LatencyRecorder()
+
+    steps = pieces = score = lines_cleared = 0
+    start_time = time.perf_counter()
+    for episode in range(episodes):
+        episode_steps, episode_pieces, episode_score, episode_lines = run_benchmark_episode(
+            agent, env, recorder,
+            seed=None if seed is None else seed + episode,
+            max_steps=max_steps
+        )
+        steps += episode_steps
+        pieces += episode_pieces
+        score += episode_score
+        lines_cleared += episode_lines
+    duration = time.perf_counter() - start_time
+
+    return BenchmarkResult(
+        episodes=episodes,
+        steps=steps,
+        pieces=pieces,
+        score=score,
+        lines_cleared=lines_cleared,
+        duration=duration,
+        steps_per_sec=steps / duration if duration else 0.0,
+        pieces_per_sec=pieces / duration if duration else 0.0,
+        decision_latency=recorder.summary(),
+        search_latency=recorder.summary(searches_only=True)
+    )
+
+
+def run_vector_benchmark(weights: dict[str, float] | None = None,
+                         num_envs: int = 16,
+                         steps: int = 2000,
+                         seed: int | None = 0,
+                         agent_options: dict[str, Any] | None = None) -> BenchmarkResult:
+    """
+    Benchmark batched decisions on a vectorized environment.
+
+    All boards are stepped together and the agent decides for all of them
+    with one get_best_actions() call, so a recorded latency covers a whole
+    batch. Episodes that end are restarted, and only finished episodes
+    count towards the score and lines.
+
+    Args:
+        weights: Dictionary of weights for the heuristic agent (None for the agent's defaults)
+        num_envs: Number of boards stepped together
+        steps: Number of lockstep steps
+        seed: Base seed of the episodes, see VectorTetrisEnv
+        agent_options: Further HeuristicAgent arguments
+
+    Returns:
+        Dictionary with throughput and latency results; steps and pieces
+        are summed over all boards
+    """
+    agent = HeuristicAgent(weights=weights, **(agent_options or {}))
+    vec_env = VectorTetrisEnv(num_envs, seed=seed)
+    recorder = LatencyRecorder()
+    _ = vec_env.reset()
+
+    pieces = score = lines_cleared = 0
+    current = [env.board.current_piece for env in vec_env.envs]
+    perf_counter = time.perf_counter
+    start_time = perf_counter()
+    for _ in range(steps):
+        start = perf_counter()
+        actions, stats = agent.get_best_actions(vec_env.envs, vec_env.grids)
+        recorder.record((perf_counter() - start) * 1000, stats.replayed < num_envs)
+
+        _, _, terminated, truncated, infos = vec_env.step(np.array([action.value for action in actions]))
+        for i, env in enumerate(vec_env.envs):
+            if env.board.current_piece is not current[i]:
+                current[i] = env.board.current_piece
+                pieces += 1
+            if terminated[i] or truncated[i]:
+                score += infos[i]['episode_score']
+                lines_cleared += infos[i]['lines_cleared']
+    duration = perf_counter() - start_time
+
+    return BenchmarkResult(
+        episodes=vec_env.episodes_finished,
+        steps=steps * num_envs,
+        pieces=pieces,
+        score=score,
+        lines_cleared=lines_cleared,
+        duration=duration,
+        steps_per_sec=steps * num_envs / duration if duration else 0.0,
+        pieces_per_sec=pieces / duration if duration else 0.0,
+        decision_latency=recorder.summary(),
+        search_latency=recorder.summary(searches_only=True)
+    )
+
+
+def print_benchmark(result: BenchmarkResult) -> None:
+    """
+    Print the benchmark results.
+
+    Args:
+        result: Results returned by run_benchmark
+    """
+    print("\n=== Benchmark Results ===")
+    print(f"Episodes: {result['episodes']}")
+    print(f"Steps: {result['steps']}")
+    print(f"Pieces: {result['pieces']}")
+    print(f"Score: {result['score']}")
+    print(f"Lines cleared: {result['lines_cleared']}")
+    print(f"Duration: {result['duration']:.2f} seconds")
+    print(f"Steps/s: {result['steps_per_sec']:.1f}")
+    print(f"Pieces/s: {result['pieces_per_sec']:.1f}")
+
+    for title, latency in (("Decision latency", result['decision_latency']),
+                           ("Search latency", result['search_latency'])):
+        print(f"\n{title} ({latency['count']} decisions):")
+        print(f"  mean: {latency['mean_ms']:.3f} ms, max: {latency['max_ms']:.3f} ms")
+        print(f"  p50: {latency['p50_ms']:.3f} ms, p95: {latency['p95_ms']:.3f} ms, p99: {latency['p99_ms']:.3f} ms")
+
+
+def main():
+    """Main function to run the benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark the heuristic Tetris agent without rendering')
+    _ = parser.add_argument('--episodes', type=int, default=3, help='Number of episodes to run')
+    _ = parser.add_argument('--seed', type=int, default=0, help='Base seed; episode i is played with seed + i')
+    _ = parser.add_argument('--max-steps', type=int, default=None,
+                            help='Step limit per episode (default: play until game over); with --num-envs, '
+                                 'the number of lockstep steps of the whole run (default: 2000)')
+    _ = parser.add_argument('--search-mode', type=str, default='placement', choices=SEARCH_MODES,
+                            help='How the agent finds final positions')
+    _ = parser.add_argument('--lookahead', action='store_true', help='Also score the best placement of the next piece')
+    _ = parser.add_argument('--beam-width', type=int, default=5, help='Number of placements expanded by the lookahead')
+    _ = parser.add_argument('--deadline-ms', type=float, default=None,
+                            help='Time budget per decision; search with increasing effort until it runs out')
+    _ = parser.add_argument('--transposition-size', type=int, default=256,
+                            help='Number of evaluated situations kept for reuse (0 to disable)')
+    _ = parser.add_argument('--prune', action='store_true',
+                            help='Skip lookahead placements whose score bound cannot beat the best found '
+                                 '(needs --lookahead or --deadline-ms)')
+    _ = parser.add_argument('--contour-table', type=str, default=None,
+                            help='Answer common surfaces from this contour table (see contour_table.py)')
+    _ = parser.add_argument('--num-envs', type=int, default=1,
+                            help='Step this many boards together with batched decisions (placement search only, no contour table)')
+    _ = parser.add_argument('--output', type=str, default=None, help='Also write the results to this JSON file')
+
+    args: Namespace = parser.parse_args()
+    if args.prune and not args.lookahead and args.deadline_ms is None:
+        parser.error('--prune requires --lookahead or --deadline-ms')
+
+    agent_options: dict[str, Any] = dict(
+        search_mode=args.search_mode,
+        lookahead=args.lookahead,
+        beam_width=args.beam_width,
+        deadline_ms=args.deadline_ms,
+        transposition_size=args.transposition_size,
+        prune=args.prune,
+        contour_table=args.contour_table
+    )
+    if args.num_envs > 1:
+        result = run_vector_benchmark(
+            num_envs=args.num_envs,
+            steps=args.max_steps or 2000,
+            seed=args.seed,
+            agent_options=agent_options
+        )
+    else:
+        result = run_benchmark(
+            episodes=args.episodes,
+            seed=args.seed,
+            max_steps=args.max_steps,
+            agent_options=agent_options
+        )
+    print_benchmark(result)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Benchmark regression suite for the heuristic-based Tetris agent.
+
+The suite times the agent on a fixed set of seeded boards and plays a fixed
+set of seeded episodes (see benchmark_agent.py). The first run, or a run
+with --update-baseline, stores the measurements in a baseline JSON file.
+Later runs compare against it and report every latency or throughput
+measurement that got worse by more than the tolerance, and every search
+counter or score that changed. The exit status is 1 when anything was
+reported, so the suite can gate a change to the agent's hot paths.
+"""
+import sys
+import os
+import time
+import argparse
+from argparse import Namespace
+import json
+from dataclasses import dataclass, field
+from typing import Any, TypedDict
+import numpy as np
+from numpy.typing import NDArray
+
+# Add the parent directory to the Python path
+sys.path.append('..')
+
+from tetris.environment.tetris_env import TetrisEnv
+from examples.heuristic_agent import HeuristicAgent
+from examples.benchmark_agent import run_benchmark
+
+DEFAULT_BASELINE = "benchmark_baseline.json"
+
+# How each measurement may move before it counts as a regression:
+# 'lower' may not grow, 'higher' may not shrink (both within the tolerance)
+# and 'exact' may not change at all
+METRIC_DIRECTIONS: dict[str, str] = {
+    'median_ms': 'lower',
+    'p95_ms': 'lower',
+    'steps_per_sec': 'higher',
+    'pieces_per_sec': 'higher',
+    'states_explored': 'exact',
+    'candidates': 'exact',
+    'score': 'exact',
+    'lines_cleared': 'exact',
+}
+
+
+@dataclass(frozen=True)
+class BoardScenario:
+    """A seeded board on which a single decision is timed."""
+    name: str
+    seed: int  # Seed of the board and of the environment's piece sequence
+    max_height: int  # Tallest column of the generated board
+    hole_rate: float  # Chance that a cell below a column's surface is left empty
+
+
+@dataclass(frozen=True)
+class AgentConfig:
+    """A named set of HeuristicAgent arguments."""
+    name: str
+    options: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class EpisodeScenario:
+    """A seeded episode played with one agent configuration."""
+    name: str
+    config: AgentConfig
+    seed: int
+    max_steps: int
+
+
+# The transposition table is off, so repeated decisions on a board are searched again
+AGENT_CONFIGS: tuple[AgentConfig, ...] = (
+    AgentConfig('placement', dict(transposition_size=0)),
+    AgentConfig('lookahead', dict(transposition_size=0, lookahead=True)),
+    AgentConfig('lookahead-prune', dict(transposition_size=0, lookahead=True, prune=True)),
+    AgentConfig('bfs', dict(transposition_size=0, search_mode='bfs')),
+)
+
+BOARD_SCENARIOS: tuple[BoardScenario, ...] = (
+    BoardScenario('empty', seed=0, max_height=0, hole_rate=0.0),
+    BoardScenario('low-flat', seed=1, max_height=4, hole_rate=0.0),
+    BoardScenario('mid-holes', seed=2, max_height=8, hole_rate=0.15),
+    BoardScenario('high-rugged', seed=3, max_height=14, hole_rate=0.1),
+    BoardScenario('high-holes', seed=4, max_height=16, hole_rate=0.3),
+)
+
+EPISODE_SCENARIOS: tuple[EpisodeScenario, ...] = (
+    EpisodeScenario('placement-episode', AgentConfig('placement'), seed=0, max_steps=2000),
+    EpisodeScenario('lookahead-episode', AgentConfig('lookahead', dict(lookahead=True, prune=True)),
+                    seed=0, max_steps=1000),
+)
+
+
+class Regression(TypedDict):
+    benchmark: str
+    metric: str
+    baseline: float
+    current: float
+    change: float
+
+
+def make_board(scenario: BoardScenario, rows: int, cols: int) -> NDArray[np.int8]:
+    """
+    Generate the board of a scenario.
+
+    Column heights are drawn at random up to the scenario's maximum height,
+    cells below the surface are left empty at the scenario's hole rate, and
+    one cell of every full row is emptied so no line is complete.
+
+    Args:
+        scenario: The board scenario
+        rows: Number of rows of the board
+        cols: Number of columns of the board
+
+    Returns:
+        The board grid
+    """
+    rng = np.random.default_rng(scenario.seed)
+    grid = np.zeros((rows, cols), dtype=np.int8)
+    heights = rng.integers(0, scenario.max_height + 1, size=cols)
+    for col, height in enumerate(heights.tolist()):
+        if height == 0:
+            continue
+        column = (rng.random(height) >= scenario.hole_rate).astype(np.int8)
+        column[0] = 1  # The surface cell itself is always filled
+        grid[rows - height:, col] = column
+    for row in np.flatnonzero(grid.all(axis=1)).tolist():
+        grid[row, rng.integers(cols)] = 0
+    return grid
+
+
+def time_decision(scenario: BoardScenario, config: AgentConfig, repeats: int) -> dict[str, float]:
+    """
+    Time the agent's first decision on a scenario board.
+
+    Every repeat uses a fresh agent and environment, so no state carries over.
+
+    Args:
+        scenario: The board scenario
+        config: Agent configuration to time
+        repeats: Number of times the decision is made
+
+    Returns:
+        Median and p95 decision time and the search counters of the decision
+    """
+    times: list[float] = []
+    states_explored = candidates = 0
+    for _ in range(repeats):
+        env = TetrisEnv()
+        _ = env.reset(seed=scenario.seed)
+        env.board.grid[:] = make_board(scenario, *env.board.grid.shape)
+        agent = HeuristicAgent(**config.options)
+
+        start = time.perf_counter()
+        _, _, _, stats = agent.get_best_action(env)
+        times.append((time.perf_counter() - start) * 1000)
+        states_explored, candidates = stats.states_explored, stats.candidates
+
+    return {
+        'median_ms': float(np.median(times)),
+        'p95_ms': float(np.percentile(times, 95)),
+        'states_explored': states_explored,
+        'candidates': candidates,
+    }
+
+
+def run_suite(repeats: int = 20, include_episodes: bool = True) -> dict[str, dict[str, float]]:
+    """
+    Run every benchmark of the suite.
+
+    Args:
+        repeats: Number of timed decisions per board scenario and configuration
+        include_episodes: Whether to play the episode scenarios as well
+
+    Returns:
+        Measurements keyed by benchmark name
+    """
+    results: dict[str, dict[str, float]] = {}
+    for scenario in BOARD_SCENARIOS:
+        for config in AGENT_CONFIGS:
+            name = f"board/{scenario.name}/{config.name}"
+            results[name] = time_decision(scenario, config, repeats)
+            print(f"{name}: {results[name]['median_ms']:.3f} ms")
+
+    if include_episodes:
+        for episode in EPISODE_SCENARIOS:
+            name = f"episode/{episode.name}"
+            result = run_benchmark(episodes=1, seed=episode.seed, max_steps=episode.max_steps,
+                                   agent_options=episode.config.options)
+            results[name] = {
+                'steps_per_sec': result['steps_per_sec'],
+                'pieces_per_sec': result['pieces_per_sec'],
+                'p95_ms': result['search_latency']['p95_ms'],
+                'score': result['score'],
+                'lines_cleared': result['lines_cleared'],
+            }
+            print(f"{name}: {result['steps_per_sec']:.1f} steps/s")
+    return results
+
+
+def compare_results(baseline: dict[str, dict[str, float]], current: dict[str, dict[str, float]],
+                    tolerance: float) -> list[Regression]:
+    """
+    Find the measurements that regressed against a baseline.
+
+    Benchmarks or metrics missing from either side are skipped.
+
+    Args:
+        baseline: Measurements of the baseline run
+        current: Measurements of this run
+        tolerance: Relative change allowed for latency and throughput metrics
+
+    Returns:
+        List of regressions
+    """
+    regressions: list[Regression] = []
+    for name, metrics in current.items():
+        for metric, value in metrics.items():
+            reference = baseline.get(name, {}).get(metric)
+            direction = METRIC_DIRECTIONS.get(metric)
+            if reference is None or direction is None:
+                continue
+            change = (value - reference) / reference if reference else 0.0
+            if ((direction == 'lower' and value > reference * (1 + tolerance))
+                    or (direction == 'higher' and value < reference * (1 - tolerance))
+                    or (direction == 'exact' and value != reference)):
+                regressions.append(Regression(
+                    benchmark=name, metric=metric, baseline=reference, current=value, change=change
+                ))
+    return regressions
+
+
+def main():
+    """Main function to run the benchmark suite."""
+    parser = argparse.ArgumentParser(description='Compare the heuristic Tetris agent against a benchmark baseline')
+    _ = parser.add_argument('--baseline', type=str, default=DEFAULT_BASELINE, help='Path of the baseline JSON file')
+    _ = parser.add_argument('--update-baseline', action='store_true',
+                            help='Store this run as the new baseline instead of comparing')
+    _ = parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Relative slowdown allowed before a timing counts as a regression')
+    _ = parser.add_argument('--repeats', type=int, default=20, help='Timed decisions per board scenario')
+    _ = parser.add_argument('--skip-episodes', action='store_true', help='Only run the board scenarios')
+
+    args: Namespace = parser.parse_args()
+
+    results = run_suite(repeats=args.repeats, include_episodes=not args.skip_episodes)
+
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+
+    regressions = compare_results(baseline, results, args.tolerance)
+    if not regressions:
+        print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+        return
+
+    print(f"\n{len(regressions)} regressions against {args.baseline} (tolerance {args.tolerance:.0%}):")
+    for regression in regressions:
+        print(f"  {regression['benchmark']} {regression['metric']}: "
+              f"{regression['baseline']:.3f} -> {regression['current']:.3f} ({regression['change']:+.1%})")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
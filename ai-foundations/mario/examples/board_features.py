@@ -0,0 +1,437 @@
+"""
+Vectorized board-feature extraction for the heuristic Tetris agent.
+
+Every function works on a stack of boards with shape (N, rows, cols), so the
+features of all candidate final positions for a piece are computed in a single
+NumPy pass instead of walking the grid cell by cell in Python.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+from numpy.typing import NDArray
+
+# Column order of the feature matrix produced by BoardFeatures.matrix()
+FEATURE_NAMES: tuple[str, ...] = ('holes', 'height', 'bumpiness', 'lines_cleared', 'well_depth')
+
+
+@dataclass
+class BoardFeatures:
+    """Heuristic features for a stack of N boards."""
+    heights: NDArray[np.int64]  # Column heights, shape (N, cols)
+    holes: NDArray[np.int64]  # Empty cells below the top of their column, shape (N,)
+    height: NDArray[np.int64]  # Maximum column height, shape (N,)
+    bumpiness: NDArray[np.int64]  # Sum of adjacent height differences, shape (N,)
+    well_depth: NDArray[np.int64]  # Total well depth, shape (N,)
+    lines_cleared: NDArray[np.int64]  # Lines cleared by the placement, shape (N,)
+
+    def __len__(self) -> int:
+        return len(self.holes)
+
+    def matrix(self) -> NDArray[np.float64]:
+        """
+        Stack the features into a matrix whose columns follow FEATURE_NAMES.
+
+        Returns:
+            Array of shape (N, len(FEATURE_NAMES))
+        """
+        return np.column_stack([getattr(self, name) for name in FEATURE_NAMES]).astype(np.float64)
+
+    def metrics(self, index: int) -> dict[str, float]:
+        """
+        Get the features of a single board as a metrics dictionary.
+
+        Args:
+            index: Index of the board in the stack
+
+        Returns:
+            Dictionary of metrics, as produced by HeuristicAgent._evaluate_position
+        """
+        return {name: float(getattr(self, name)[index]) for name in FEATURE_NAMES}
+
+
+def _as_stack(boards: NDArray[np.int8]) -> NDArray[np.int8]:
+    """Promote a single (rows, cols) board to a stack of one."""
+    return boards[np.newaxis] if boards.ndim == 2 else boards
+
+
+def clear_full_lines(boards: NDArray[np.int8]) -> tuple[NDArray[np.int8], NDArray[np.int64]]:
+    """
+    Remove full rows from every board, shifting the rows above them down.
+
+    Args:
+        boards: Stack of boards with shape (N, rows, cols)
+
+    Returns:
+        Tuple of (cleared boards, number of lines cleared per board)
+    """
+    boards = _as_stack(boards)
+    full = np.all(boards > 0, axis=2)
+    lines = full.sum(axis=1)
+    if not lines.any():
+        return boards, lines
+
+    # A stable sort on "not full" moves the full rows to the top while keeping
+    # the remaining rows in order; the moved rows are then emptied.
+    order = np.argsort(~full, axis=1, kind='stable')
+    cleared = np.take_along_axis(boards, order[:, :, np.newaxis], axis=1)
+    cleared[np.arange(boards.shape[1])[np.newaxis, :] < lines[:, np.newaxis]] = 0
+    return cleared, lines
+
+
+def column_heights(boards: NDArray[np.int8]) -> NDArray[np.int64]:
+    """
+    Calculate the height of every column of every board.
+
+    Args:
+        boards: Stack of boards with shape (N, rows, cols)
+
+    Returns:
+        Array of shape (N, cols) with the column heights
+    """
+    boards = _as_stack(boards)
+    filled = boards > 0
+    top = filled.argmax(axis=1)
+    return np.where(filled.any(axis=1), boards.shape[1] - top, 0)
+
+
+def count_holes(boards: NDArray[np.int8]) -> NDArray[np.int64]:
+    """
+    Count the holes of every board.
+
+    A hole is an empty cell with at least one filled cell above it.
+
+    Args:
+        boards: Stack of boards with shape (N, rows, cols)
+
+    Returns:
+        Array of shape (N,) with the number of holes
+    """
+    boards = _as_stack(boards)
+    filled = boards > 0
+    covered = np.logical_or.accumulate(filled, axis=1)
+    return (covered & ~filled).sum(axis=(1, 2))
+
+
+def bumpiness(heights: NDArray[np.int64]) -> NDArray[np.int64]:
+    """
+    Sum of absolute differences between adjacent column heights.
+
+    Args:
+        heights: Column heights with shape (N, cols)
+
+    Returns:
+        Array of shape (N,) with the bumpiness
+    """
+    return np.abs(np.diff(heights, axis=1)).sum(axis=1)
+
+
+def well_depth(heights: NDArray[np.int64]) -> NDArray[np.int64]:
+    """
+    Total depth of the wells of every board.
+
+    A well is a column with an adjacent column at least 2 units higher. When
+    both neighbours are higher, the depth is measured to the lower of the two.
+
+    Args:
+        heights: Column heights with shape (N, cols)
+
+    Returns:
+        Array of shape (N,) with the total well depth
+    """
+    # Pad with a negative height so the board edges never count as higher
+    padded = np.pad(heights, ((0, 0), (1, 1)), constant_values=-1)
+    left = padded[:, :-2] - heights
+    right = padded[:, 2:] - heights
+    left_higher = left >= 2
+    right_higher = right >= 2
+    depth = np.where(
+        left_higher & right_higher, np.minimum(left, right),
+        np.where(left_higher, left, np.where(right_higher, right, 0))
+    )
+    return depth.sum(axis=1)
+
+
+def extract_features(boards: NDArray[np.int8],
+                     lines_cleared: NDArray[np.int64] | None = None) -> BoardFeatures:
+    """
+    Compute all heuristic features for a stack of boards in one vectorized pass.
+
+    Args:
+        boards: Stack of boards with shape (N, rows, cols), or a single board
+        lines_cleared: Lines already cleared by each placement. If None, the
+            boards are taken to be uncleared: full rows are removed and counted.
+
+    Returns:
+        Features of every board
+    """
+    boards = _as_stack(boards)
+    if lines_cleared is None:
+        boards, lines_cleared = clear_full_lines(boards)
+
+    heights = column_heights(boards)
+    return BoardFeatures(
+        heights=heights,
+        holes=count_holes(boards),
+        height=heights.max(axis=1),
+        bumpiness=bumpiness(heights),
+        well_depth=well_depth(heights),
+        lines_cleared=np.asarray(lines_cleared, dtype=np.int64)
+    )
+
+
+def weight_vector(weights: dict[str, float]) -> NDArray[np.float64]:
+    """
+    Convert a weights dictionary into a vector aligned with FEATURE_NAMES.
+
+    Weights for unknown features are ignored and missing features weigh 0.
+
+    Args:
+        weights: Dictionary of weights for different heuristics
+
+    Returns:
+        Array of shape (len(FEATURE_NAMES),)
+    """
+    return np.array([weights.get(name, 0.0) for name in FEATURE_NAMES], dtype=np.float64)
+
+
+def _well_contribution(heights: list[int], col: int) -> int:
+    """Well depth of one column, with the same rules as well_depth()."""
+    height = heights[col]
+    left = heights[col - 1] - height if col > 0 else -1
+    right = heights[col + 1] - height if col < len(heights) - 1 else -1
+    if left >= 2 and right >= 2:
+        return min(left, right)
+    if left >= 2:
+        return left
+    if right >= 2:
+        return right
+    return 0
+
+
+class IncrementalFeatures:
+    """
+    Feature state of a board that is updated per placement instead of recomputed.
+
+    Every column is kept as an integer bitmask (bit i set when the cell at
+    height i is filled), together with the number of filled cells in each
+    row. A candidate copies its parent's per-row and per-column lists, which
+    is O(rows + cols) but only a few flat list copies, and then recomputes
+    the features of the columns the piece covers and their neighbours. When
+    lines are cleared, the cleared bits are squeezed out of every column and
+    the features are rebuilt from the column heights, which is O(cols).
+    """
+    __slots__ = ('rows', 'cols', 'columns', 'row_counts', 'heights', 'column_holes', 'wells',
+                 'holes', 'height', 'bumpiness', 'well_depth', 'lines_cleared')
+
+    def __init__(self, rows: int, cols: int, columns: list[int], row_counts: list[int], lines_cleared: int = 0):
+        """
+        Initialize the state from column bitmasks.
+
+        Args:
+            rows: Number of rows of the board
+            cols: Number of columns of the board
+            columns: Bitmask of each column, bit i is the cell at height i
+            row_counts: Number of filled cells at each height
+            lines_cleared: Lines cleared by the placement that led to this state
+        """
+        self.rows = rows
+        self.cols = cols
+        self.columns = columns
+        self.row_counts = row_counts
+        self.lines_cleared = lines_cleared
+        self._rebuild()
+
+    @classmethod
+    def from_grid(cls, grid: NDArray[np.int8]) -> 'IncrementalFeatures':
+        """
+        Build the state of a board from its grid, in O(rows x cols).
+
+        Args:
+            grid: The board grid
+
+        Returns:
+            The feature state
+        """
+        filled = grid[::-1] > 0  # Row i is now height i
+        height_bits = 1 << np.arange(grid.shape[0], dtype=np.int64)
+        return cls(
+            rows=grid.shape[0],
+            cols=grid.shape[1],
+            columns=(height_bits @ filled).tolist(),
+            row_counts=filled.sum(axis=1).tolist()
+        )
+
+    def _rebuild(self) -> None:
+        """Recompute every feature from the column bitmasks."""
+        self.heights = [column.bit_length() for column in self.columns]
+        self.column_holes = [height - column.bit_count() for height, column in zip(self.heights, self.columns)]
+        self.wells = [_well_contribution(self.heights, col) for col in range(self.cols)]
+        self.holes = sum(self.column_holes)
+        self.height = max(self.heights)
+        self.bumpiness = sum(abs(a - b) for a, b in zip(self.heights, self.heights[1:]))
+        self.well_depth = sum(self.wells)
+
+    def place(self, cells: list[tuple[int, int]], x: int, y: int) -> 'IncrementalFeatures':
+        """
+        Derive the state after locking a piece into the board.
+
+        The parent's lists are copied, O(rows + cols); the features are only
+        recomputed for the columns next to and under the piece.
+
+        Args:
+            cells: Filled (row, column) cells of the piece's shape matrix
+            x: Board column of the shape matrix's left edge
+            y: Board row of the shape matrix's top edge
+
+        Returns:
+            The feature state of the resulting board
+        """
+        rows, cols = self.rows, self.cols
+        columns = self.columns[:]
+        row_counts = self.row_counts[:]
+
+        full: list[int] = []
+        first, last = cols, -1
+        for r, c in cells:
+            level = rows - 1 - (y + r)
+            col = x + c
+            columns[col] |= 1 << level
+            row_counts[level] += 1
+            if row_counts[level] == cols:
+                full.append(level)
+            if col < first:
+                first = col
+            if col > last:
+                last = col
+
+        child = IncrementalFeatures.__new__(IncrementalFeatures)
+        child.rows, child.cols, child.row_counts = rows, cols, row_counts
+        child.lines_cleared = len(full)
+        if full:
+            # Squeeze the cleared rows out of every column, highest first
+            for level in sorted(full, reverse=True):
+                low = (1 << level) - 1
+                columns = [(column & low) | ((column >> (level + 1)) << level) for column in columns]
+                del row_counts[level]
+                row_counts.append(0)
+            child.columns = columns
+            child._rebuild()
+            return child
+
+        child.columns = columns
+        heights = child.heights = self.heights[:]
+        column_holes = child.column_holes = self.column_holes[:]
+        wells = child.wells = self.wells[:]
+        holes, height, bumpiness, well_depth = self.holes, self.height, self.bumpiness, self.well_depth
+
+        # Bumpiness and wells of the columns next to the piece change as well
+        left, right = max(first - 1, 0), min(last + 1, cols - 1)
+        for col in range(left, right):
+            bumpiness -= abs(heights[col] - heights[col + 1])
+        for col in range(first, last + 1):
+            column = columns[col]
+            heights[col] = column_height = column.bit_length()
+            if column_height > height:
+                height = column_height
+            column_holes_after = column_height - column.bit_count()
+            holes += column_holes_after - column_holes[col]
+            column_holes[col] = column_holes_after
+        for col in range(left, right):
+            bumpiness += abs(heights[col] - heights[col + 1])
+        for col in range(left, right + 1):
+            well = _well_contribution(heights, col)
+            well_depth += well - wells[col]
+            wells[col] = well
+
+        child.holes, child.height, child.bumpiness, child.well_depth = holes, height, bumpiness, well_depth
+        return child
+
+    def vector(self) -> list[float]:
+        """Get the features in FEATURE_NAMES order."""
+        return [getattr(self, name) for name in FEATURE_NAMES]
+
+    def metrics(self) -> dict[str, float]:
+        """Get the features as a metrics dictionary."""
+        return {name: float(getattr(self, name)) for name in FEATURE_NAMES}
+
+
+def score_upper_bound(state: IncrementalFeatures, weights: NDArray[np.float64], piece_cells: int,
+                      piece_width: int, piece_span: int, lines_before: int = 0) -> float:
+    """
+    Bound the best score reachable by straight-dropping one more piece onto a board.
+
+    Every feature is bounded from below and above, and the linear score takes
+    the more favourable end of each range. A straight drop cannot fill a hole,
+    so a row can only be cleared if its empty cells are open from above. When
+    rows clear, every column sinks by the same amount except those whose top
+    cells were in the cleared rows, which also lose the holes below them.
+    Apart from those columns, the bumpiness only changes around the (at most
+    piece_width) columns the piece covers.
+
+    Args:
+        state: Feature state of the board before the piece
+        weights: Weight vector aligned with FEATURE_NAMES
+        piece_cells: Number of filled cells of the piece
+        piece_width: Widest orientation of the piece, in columns
+        piece_span: Tallest orientation of the piece, in rows
+        lines_before: Lines already cleared on the way to this board
+
+    Returns:
+        Upper bound on the score of any resulting board
+    """
+    rows, cols = state.rows, state.cols
+    heights, columns = state.heights, state.columns
+    width = min(piece_width, cols)
+
+    # Rows the piece could complete: few enough empty cells, all of them open
+    clearable: set[int] = set()
+    for level, count in enumerate(state.row_counts):
+        if count < cols - piece_cells:
+            continue
+        empty = [col for col in range(cols) if not columns[col] >> level & 1]
+        if all(heights[col] <= level for col in empty) and (not empty or empty[-1] - empty[0] < width):
+            clearable.add(level)
+    lines = min(piece_cells, piece_span, len(clearable))
+
+    # Holes a clear could uncover, i.e. by how much more than the others a column can sink
+    extra = [0] * cols
+    if clearable:
+        for col in range(cols):
+            for level in range(heights[col] - 1, -1, -1):
+                if not columns[col] >> level & 1:
+                    extra[col] += 1
+                elif level not in clearable:
+                    break
+    sinking = sum(max(extra[c], extra[c + 1]) for c in range(cols - 1)) if any(extra) else 0
+
+    # The piece can at most flatten the steps next to and between its columns
+    diffs = [abs(heights[c] - heights[c + 1]) for c in range(cols - 1)]
+    flattening = max(sum(diffs[max(start - 1, 0):start + width]) for start in range(cols - width + 1))
+
+    low = dict(
+        holes=state.holes - sum(extra),
+        height=max(max(h - e for h, e in zip(heights, extra)) - lines, 0),
+        bumpiness=max(state.bumpiness - flattening - sinking, 0),
+        lines_cleared=lines_before,
+        well_depth=0
+    )
+    high = dict(
+        holes=rows * cols,
+        height=min(state.height + piece_span, rows),
+        bumpiness=(cols - 1) * rows,
+        lines_cleared=lines_before + lines,
+        well_depth=(cols - 1) * rows
+    )
+    weight = dict(zip(FEATURE_NAMES, weights.tolist()))
+    bound = sum(
+        max(weight[name] * low[name], weight[name] * high[name])
+        for name in FEATURE_NAMES if name not in ('bumpiness', 'well_depth')
+    )
+    # Each unit of well depth faces an equally large step between two columns,
+    # so the well depth never exceeds the bumpiness; bound the two together
+    bound += max(
+        weight['bumpiness'] * bumps + max(weight['well_depth'] * low['well_depth'],
+                                          weight['well_depth'] * min(high['well_depth'], bumps))
+        for bumps in (low['bumpiness'], high['bumpiness'])
+    )
+    return float(bound)
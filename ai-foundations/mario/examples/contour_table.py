@@ -0,0 +1,278 @@
+"""
+Precomputed best placements for common board surfaces.
+
+Most decisions of the greedy agent depend mainly on the top surface of the
+board, the differences between adjacent column heights. A contour table maps
+every surface whose differences lie within [-clip, clip], and every piece
+type, straight to the placement a full search picks on the hole-free board
+with that surface. Full rows are cleared, so the lowest column of a
+hole-free board is always empty, and every hole-free board with such a
+surface is exactly one of the table's boards. The agent therefore only uses
+the table on hole-free boards, and only while the stack leaves room at the
+top. The table is built offline by exhaustive search:
+
+    python contour_table.py --output agent_test_results/contour_table.bin --workers 8
+
+and loaded by HeuristicAgent(contour_table=...), which memory-maps it and
+answers a decision with one lookup. Boards with holes or a high stack,
+surfaces with a steeper step, boards of another size, pieces the table does
+not know and placements that do not fit or cannot be reached fall back to
+the full search. Steps are not clipped to the table's range, because the
+placement of a flattened surface is often a poor one on the real board.
+
+A table holds (2 * clip + 1) ** (cols - 1) entries of two bytes per piece
+type: 27 MB for a 10-column board with the default clip of 2, which takes
+a few hours on one core to build, or 270 KB with a clip of 1.
+"""
+import sys
+import os
+import struct
+import argparse
+from argparse import Namespace
+import json
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+import numpy as np
+from numpy.typing import NDArray
+
+# Add the parent directory to the Python path
+sys.path.append('..')
+
+from tetris.environment.tetris_env import TetrisEnv
+
+from examples.board_features import FEATURE_NAMES, weight_vector
+
+CONTOUR_MAGIC = b'TCTB'
+CONTOUR_VERSION = 1
+
+# Magic, version, rows, cols, clip, piece types, then the weight vector
+_HEADER = struct.Struct(f'<4sBBBBB{len(FEATURE_NAMES)}d')
+
+# Shape header of each piece type: code of its one-letter name, rows, cols
+_PIECE = struct.Struct('<BBB')
+
+# Best placement of one (piece type, contour); rotation -1 marks a contour without one
+ENTRY_DTYPE = np.dtype([('rotation', 'i1'), ('x', 'i1')])
+
+
+def piece_code(piece_type: object) -> int:
+    """Code of the one-letter name of a piece type."""
+    return ord(str(getattr(piece_type, 'value', piece_type))[0])
+
+
+def contour_boards(indices: NDArray[np.int64], rows: int, cols: int, clip: int) -> NDArray[np.int8]:
+    """
+    Build the hole-free board of each contour index.
+
+    The lowest column of each board is empty, so no row starts out full.
+
+    Args:
+        indices: Contour indices, see ContourTable.signature()
+        rows: Number of rows of the boards
+        cols: Number of columns of the boards
+        clip: Largest height difference between adjacent columns
+
+    Returns:
+        Stack of boards with shape (len(indices), rows, cols)
+    """
+    base = 2 * clip + 1
+    digits = (indices[:, np.newaxis] // base ** np.arange(cols - 1)) % base
+    heights = np.zeros((len(indices), cols), dtype=np.int64)
+    heights[:, 1:] = np.cumsum(digits - clip, axis=1)
+    heights -= heights.min(axis=1, keepdims=True)
+    heights = np.minimum(heights, rows)
+    # A cell is filled when it lies below its column's surface
+    return (np.arange(rows)[:, np.newaxis] >= rows - heights[:, np.newaxis, :]).astype(np.int8)
+
+
+class ContourTable:
+    """A contour table file, memory-mapped."""
+
+    def __init__(self, path: str):
+        """
+        Open a contour table.
+
+        Args:
+            path: Path of the table file
+        """
+        with open(path, 'rb') as f:
+            header = f.read(_HEADER.size)
+            magic, version, self.rows, self.cols, self.clip, pieces, *weights = _HEADER.unpack(header)
+            if magic != CONTOUR_MAGIC or version != CONTOUR_VERSION:
+                raise ValueError(f"{path} is not a version {CONTOUR_VERSION} contour table")
+            self.weights: NDArray[np.float64] = np.array(weights)
+            # Row of each piece type's entries and its spawn shape, by piece code
+            self.pieces: dict[int, tuple[int, NDArray[np.bool_]]] = {}
+            for index in range(pieces):
+                code, shape_rows, shape_cols = _PIECE.unpack(f.read(_PIECE.size))
+                shape = np.frombuffer(f.read(shape_rows * shape_cols), dtype=np.uint8)
+                self.pieces[code] = (index, shape.reshape(shape_rows, shape_cols) > 0)
+            offset = f.tell()
+
+        self.size: int = (2 * self.clip + 1) ** (self.cols - 1)
+        self.entries: NDArray = np.memmap(path, dtype=ENTRY_DTYPE, mode='r', offset=offset,
+                                          shape=(pieces, self.size))
+        self._powers: NDArray[np.int64] = (2 * self.clip + 1) ** np.arange(self.cols - 1)
+
+    def signature(self, heights: NDArray[np.int64] | list[int]) -> int | None:
+        """
+        Get the contour index of a board.
+
+        Args:
+            heights: Column heights of the board
+
+        Returns:
+            Index of the differences between adjacent column heights, or None
+            if a difference lies outside [-clip, clip]
+        """
+        differences = np.diff(heights) + self.clip
+        if differences.min() < 0 or differences.max() > 2 * self.clip:
+            return None
+        return int(differences @ self._powers)
+
+    def lookup(self, piece_type: object, shape: NDArray[np.int8],
+               heights: NDArray[np.int64] | list[int]) -> tuple[int, int] | None:
+        """
+        Get the stored placement for a piece on a board.
+
+        Args:
+            piece_type: Type of the falling piece
+            shape: Shape matrix of the piece in its current orientation
+            heights: Column heights of the board
+
+        Returns:
+            Tuple of (rotation, column) of the placement, or None if the table
+            has no entry or the piece is not in the orientation it was built with
+        """
+        piece = self.pieces.get(piece_code(piece_type))
+        if piece is None or len(heights) != self.cols:
+            return None
+        index, spawn_shape = piece
+        if shape.shape != spawn_shape.shape or not np.array_equal(shape > 0, spawn_shape):
+            return None
+        signature = self.signature(heights)
+        if signature is None:
+            return None
+        entry = self.entries[index, signature]
+        if entry['rotation'] < 0:
+            return None
+        return int(entry['rotation']), int(entry['x'])
+
+
+def collect_piece_shapes(env_factory: Callable[[], TetrisEnv] = TetrisEnv,
+                         resets: int = 200) -> dict[object, NDArray[np.int8]]:
+    """
+    Get the spawn shape of every piece type by resetting an environment.
+
+    Args:
+        env_factory: Creates the environment the table is meant for
+        resets: Number of seeded resets to look at
+
+    Returns:
+        Dictionary mapping each piece type seen to its shape matrix
+    """
+    env = env_factory()
+    shapes: dict[object, NDArray[np.int8]] = {}
+    for seed in range(resets):
+        _ = env.reset(seed=seed)
+        piece = env.board.current_piece
+        if piece is not None:
+            shapes.setdefault(piece.type, piece.shape)
+    return shapes
+
+
+def _build_chunk(weights: dict[str, float], shape: NDArray[np.int8], rows: int, cols: int, clip: int,
+                 start: int, stop: int) -> NDArray:
+    """Search the best placement of a piece for a range of contour indices."""
+    from examples.heuristic_agent import HeuristicAgent
+
+    agent = HeuristicAgent(weights=weights, transposition_size=0)
+    boards = contour_boards(np.arange(start, stop), rows, cols, clip)
+    entries = np.full(stop - start, -1, dtype=ENTRY_DTYPE)
+    for i, evaluations in enumerate(agent.evaluate_placements_batch(list(boards), [shape] * len(boards))):
+        if evaluations:
+            # The first best placement, as the full search would pick it
+            best = max(evaluations, key=lambda e: e.score).placement
+            entries[i] = (best.rotation, best.x)
+    return entries
+
+
+def build_contour_table(path: str, piece_shapes: dict[object, NDArray[np.int8]], weights: dict[str, float],
+                        rows: int = 20, cols: int = 10, clip: int = 2, workers: int | None = None,
+                        chunk_size: int = 4096) -> None:
+    """
+    Build a contour table by searching every contour for every piece type.
+
+    Args:
+        path: File the table is written to
+        piece_shapes: Spawn shape of each piece type, see collect_piece_shapes()
+        weights: Dictionary of weights the placements are chosen with
+        rows: Number of rows of the board
+        cols: Number of columns of the board
+        clip: Largest height difference between adjacent columns the table covers
+        workers: Number of worker processes (None for one per CPU)
+        chunk_size: Contours searched per task
+    """
+    size = (2 * clip + 1) ** (cols - 1)
+    header = _HEADER.pack(CONTOUR_MAGIC, CONTOUR_VERSION, rows, cols, clip, len(piece_shapes),
+                          *weight_vector(weights).tolist())
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as f, ProcessPoolExecutor(max_workers=workers) as pool:
+        _ = f.write(header)
+        for piece_type, shape in piece_shapes.items():
+            _ = f.write(_PIECE.pack(piece_code(piece_type), *shape.shape))
+            _ = f.write((shape > 0).astype(np.uint8).tobytes())
+        for piece_type, shape in piece_shapes.items():
+            starts = range(0, size, chunk_size)
+            chunks = pool.map(_build_chunk, *zip(*[
+                (weights, shape, rows, cols, clip, start, min(start + chunk_size, size)) for start in starts
+            ]))
+            # Chunks arrive in order and are written as they finish
+            for entries in chunks:
+                _ = f.write(entries.tobytes())
+            print(f"Piece {piece_code(piece_type):c}: {size} contours searched")
+    os.replace(temporary, path)
+
+
+def main():
+    """Main function to build a contour table."""
+    parser = argparse.ArgumentParser(description='Build a contour table of best placements by exhaustive search')
+    _ = parser.add_argument('--output', type=str, default='agent_test_results/contour_table.bin',
+                            help='File the table is written to')
+    _ = parser.add_argument('--clip', type=int, default=2,
+                            help='Largest height difference between adjacent columns the table covers')
+    _ = parser.add_argument('--weights-file', type=str, default=None,
+                            help="JSON file with the agent's weights (default: the agent's default weights)")
+    _ = parser.add_argument('--custom-env', action='store_true',
+                            help='Build the table for the custom environment without automatic downward movement')
+    _ = parser.add_argument('--workers', type=int, default=None,
+                            help='Number of worker processes (default: one per CPU)')
+
+    args: Namespace = parser.parse_args()
+
+    from examples.heuristic_agent import HeuristicAgent
+    from examples.test_heuristic_agent import CustomTetrisEnv
+
+    if args.weights_file:
+        with open(args.weights_file, 'r') as f:
+            weights: dict[str, float] = json.load(f)
+    else:
+        weights = HeuristicAgent().weights
+
+    env_factory = CustomTetrisEnv if args.custom_env else TetrisEnv
+    piece_shapes = collect_piece_shapes(env_factory)
+    env = env_factory()
+    _ = env.reset(seed=0)
+    rows, cols = env.board.grid.shape
+    print(f"Building a {rows}x{cols} contour table with clip {args.clip} for {len(piece_shapes)} piece types")
+
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    build_contour_table(args.output, piece_shapes, weights, rows=rows, cols=cols, clip=args.clip,
+                        workers=args.workers)
+    print(f"Contour table saved to {args.output} ({os.path.getsize(args.output)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
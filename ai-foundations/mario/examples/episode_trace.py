@@ -0,0 +1,226 @@
+"""
+Compact binary traces of test episodes and a replayer that needs no agent.
+
+A trace holds the seed, every action with its decision time, the type of
+every piece and the board after every piece locked, packed to one bit per
+cell (25 bytes for a 20x10 board). Reading a trace back is a few buffer
+reads, and the boards of a whole game unpack in one NumPy call, so archived
+games can be re-scored with new evaluation functions without searching
+again:
+
+    trace = load_trace("traces/episode_0000.trace")
+    scores = rescore_trace(trace, {'holes': -5.0, 'height': -0.3, ...})
+
+replay_actions() plays the recorded actions in a fresh environment to check
+that a trace still reproduces its game.
+"""
+import struct
+from array import array
+from dataclasses import dataclass
+import numpy as np
+from numpy.typing import NDArray
+
+from tetris.environment.tetris_env import TetrisEnv, Action
+from tetris.engine.board import Board
+
+from examples.board_features import extract_features, weight_vector
+
+TRACE_MAGIC = b'TTRC'
+TRACE_VERSION = 1
+
+# Magic, version, rows, cols, has seed, seed, steps, pieces
+_HEADER = struct.Struct('<4sBBBBqII')
+
+
+@dataclass
+class EpisodeTrace:
+    """A recorded episode."""
+    seed: int | None
+    rows: int
+    cols: int
+    actions: NDArray[np.uint8]  # Action value of every step
+    decision_ms: NDArray[np.float32]  # Decision time of every step
+    pieces: NDArray[np.uint8]  # Type of every piece, as the code of its one-letter name
+    lines: NDArray[np.uint8]  # Lines cleared when each piece locked
+    packed_boards: NDArray[np.uint8]  # Initial board, then the board after each piece, one bit per cell
+
+    def piece_types(self) -> list[str]:
+        """Get the names of the piece types in the order they were played."""
+        return [chr(code) for code in self.pieces.tolist()]
+
+    def boards(self) -> NDArray[np.int8]:
+        """
+        Unpack every recorded board.
+
+        Returns:
+            Array of shape (pieces + 1, rows, cols) with 1 for filled cells;
+            board 0 is the initial board and board i the one after piece i - 1
+        """
+        cells = self.rows * self.cols
+        unpacked = np.unpackbits(self.packed_boards, axis=1, count=cells)
+        return unpacked.reshape(-1, self.rows, self.cols).astype(np.int8)
+
+
+def _piece_code(board: Board) -> int:
+    """Code of the one-letter name of the board's current piece type."""
+    piece_type = board.current_piece.type
+    return ord(str(getattr(piece_type, 'value', piece_type))[0])
+
+
+class TraceRecorder:
+    """Collects one episode and writes it as a binary trace."""
+
+    def __init__(self, path: str, board: Board, seed: int | None = None):
+        """
+        Start a trace at the beginning of an episode.
+
+        Args:
+            path: File the trace is written to
+            board: The board right after the environment was reset
+            seed: Seed the environment was reset with
+        """
+        self.path: str = path
+        self.seed: int | None = seed
+        self.rows, self.cols = board.grid.shape
+        self.actions: bytearray = bytearray()
+        self.decision_ms: array = array('f')
+        self.pieces: bytearray = bytearray()
+        self.lines: bytearray = bytearray()
+        self.boards: list[bytes] = [self._pack(board)]
+        self._piece = board.current_piece
+        self._lines_cleared: int = 0
+        if board.current_piece is not None:
+            self.pieces.append(_piece_code(board))
+
+    @staticmethod
+    def _pack(board: Board) -> bytes:
+        """Pack the filled cells of a board into bits."""
+        return np.packbits(board.grid > 0).tobytes()
+
+    def record(self, action: Action, decision_ms: float, board: Board, lines_cleared: int) -> None:
+        """
+        Record one step, after the environment has applied the action.
+
+        Args:
+            action: Action taken
+            decision_ms: Time the agent took to choose it
+            board: The board after the step
+            lines_cleared: Lines cleared in the episode after the step
+        """
+        self.actions.append(action.value)
+        self.decision_ms.append(decision_ms)
+
+        # A new piece object means the previous one locked
+        if board.current_piece is not self._piece:
+            self.boards.append(self._pack(board))
+            self.lines.append(lines_cleared - self._lines_cleared)
+            self._lines_cleared = lines_cleared
+            self._piece = board.current_piece
+            if board.current_piece is not None and not board.game_over:
+                self.pieces.append(_piece_code(board))
+
+    def close(self) -> None:
+        """Write the trace file."""
+        # A piece that never locked (the episode ended first) has no board after it
+        pieces = bytes(self.pieces[:len(self.boards) - 1])
+        header = _HEADER.pack(
+            TRACE_MAGIC, TRACE_VERSION, self.rows, self.cols,
+            self.seed is not None, self.seed or 0, len(self.actions), len(pieces)
+        )
+        with open(self.path, 'wb') as f:
+            _ = f.write(header)
+            _ = f.write(self.actions)
+            _ = f.write(self.decision_ms.tobytes())
+            _ = f.write(pieces)
+            _ = f.write(bytes(self.lines))
+            _ = f.write(b''.join(self.boards))
+
+
+def load_trace(path: str) -> EpisodeTrace:
+    """
+    Read a trace file.
+
+    Args:
+        path: Path of the trace
+
+    Returns:
+        The recorded episode
+
+    Raises:
+        ValueError: If the file is not a trace of this version, or is
+            truncated or longer than its header says
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < _HEADER.size:
+        raise ValueError(f"{path} is too short for an episode trace")
+    magic, version, rows, cols, has_seed, seed, steps, pieces = _HEADER.unpack_from(data)
+    if magic != TRACE_MAGIC or version != TRACE_VERSION:
+        raise ValueError(f"{path} is not a version {TRACE_VERSION} episode trace")
+
+    board_bytes = (rows * cols + 7) // 8
+    # Actions, decision times, pieces, lines and boards
+    size = _HEADER.size + steps * 5 + pieces * 2 + (pieces + 1) * board_bytes
+    if len(data) != size:
+        raise ValueError(f"{path} has {len(data)} bytes, its header describes {size}")
+
+    offset = _HEADER.size
+
+    def take(dtype: type, count: int) -> NDArray:
+        nonlocal offset
+        values = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        offset += values.nbytes
+        return values
+
+    return EpisodeTrace(
+        seed=seed if has_seed else None,
+        rows=rows,
+        cols=cols,
+        actions=take(np.uint8, steps),
+        decision_ms=take(np.float32, steps),
+        pieces=take(np.uint8, pieces),
+        lines=take(np.uint8, pieces),
+        packed_boards=take(np.uint8, (pieces + 1) * board_bytes).reshape(pieces + 1, board_bytes)
+    )
+
+
+def rescore_trace(trace: EpisodeTrace, weights: dict[str, float]) -> NDArray[np.float64]:
+    """
+    Score the board after every piece of a trace with other weights.
+
+    Args:
+        trace: The recorded episode
+        weights: Dictionary of weights for different heuristics
+
+    Returns:
+        Array with the score of the position each piece produced
+    """
+    features = extract_features(trace.boards()[1:], trace.lines.astype(np.int64))
+    return features.matrix() @ weight_vector(weights)
+
+
+def replay_actions(trace: EpisodeTrace, env: TetrisEnv) -> bool:
+    """
+    Play the recorded actions in an environment and compare the boards.
+
+    Args:
+        trace: The recorded episode; it must have a seed
+        env: A fresh environment of the kind the episode was played in
+
+    Returns:
+        True if every piece locked into the recorded board
+    """
+    if trace.seed is None:
+        raise ValueError("Only traces of seeded episodes can be replayed")
+    _ = env.reset(seed=trace.seed)
+    boards = trace.boards()
+    piece = env.board.current_piece
+    locked = 0
+    for action in trace.actions.tolist():
+        _ = env.step(np.int64(action))
+        if env.board.current_piece is not piece:
+            piece = env.board.current_piece
+            locked += 1
+            if locked < len(boards) and not np.array_equal(env.board.grid > 0, boards[locked] > 0):
+                return False
+    return locked >= len(boards) - 1
@@ -0,0 +1,336 @@
+"""
+Self-play dataset of candidate placements for fitting evaluators offline.
+
+Seeded HeuristicAgent games run headless on a process pool. For the first
+search of every piece, each candidate placement becomes one row: its
+features (the agent's metrics of the resulting board), a few extras about
+the move and the board it was made on, and labels that are only known once
+the episode is over, such as the lines the game still cleared after the
+decision. Rows are collected in preallocated column buffers and written to
+fixed-size .npz shards as the buffers fill, so memory stays flat however
+many games are played:
+
+    python generate_dataset.py --episodes 1000 --output datasets/selfplay
+
+A manifest.json next to the shards lists the columns, the shards and the
+settings of the run; load_dataset() concatenates the shards again.
+"""
+import sys
+import os
+import argparse
+from argparse import Namespace
+import json
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import Any
+import numpy as np
+from numpy.typing import NDArray
+
+# Add the parent directory to the Python path
+sys.path.append('..')
+
+from tetris.environment.tetris_env import TetrisEnv
+
+from examples.board_features import FEATURE_NAMES, column_heights, count_holes
+from examples.contour_table import piece_code
+from examples.heuristic_agent import HeuristicAgent
+
+MANIFEST_FILE = "manifest.json"
+
+# Columns of every row with their types: the features of the candidate,
+# then extras about the move and its board, then the outcome labels
+DATASET_COLUMNS: dict[str, str] = {
+    **{name: 'float32' for name in FEATURE_NAMES},
+    'heuristic_score': 'float32',  # Score of the candidate under the agent's weights
+    'rotation': 'int8',
+    'x': 'int8',
+    'y': 'int8',
+    'piece_type': 'uint8',  # Code of the one-letter name of the piece type
+    'board_height': 'int16',  # Highest column before the piece was placed
+    'board_holes': 'int16',  # Holes before the piece was placed
+    'candidates': 'int16',  # Candidates of the decision
+    'episode': 'int32',
+    'piece': 'int32',  # Number of the piece in the episode
+    'chosen': 'bool',  # Whether the agent picked this candidate
+    'lines_to_end': 'int32',  # Lines the episode cleared from this decision on
+    'pieces_to_end': 'int32',  # Pieces the episode still played, this one included
+    'game_over': 'bool',  # Whether the episode ended by topping out rather than at the step limit
+}
+
+
+def play_dataset_episode(weights: dict[str, float] | None, agent_options: dict[str, Any],
+                         episode: int, seed: int, max_steps: int | None) -> dict[str, NDArray]:
+    """
+    Play one seeded episode and collect the candidates of every piece.
+
+    Args:
+        weights: Dictionary of weights for the heuristic agent
+        agent_options: Further HeuristicAgent arguments
+        episode: Number of the episode in the dataset
+        seed: Seed of the episode
+        max_steps: Step limit of the episode, or None to play until game over
+
+    Returns:
+        One array per column of DATASET_COLUMNS, one entry per candidate
+    """
+    agent = HeuristicAgent(weights=weights, **agent_options)
+    env = TetrisEnv()
+    _ = env.reset(seed=seed)
+
+    # Per decision: (first row, rows, piece number, lines cleared before it)
+    decisions: list[tuple[int, int, int, int]] = []
+    rows: dict[str, list] = {name: [] for name in DATASET_COLUMNS}
+    pieces = 0
+    lines = 0
+    piece = env.board.current_piece
+    searched = None  # Piece whose candidates were collected last
+    steps = 0
+    terminated = False
+    while not terminated and (max_steps is None or steps < max_steps):
+        board = env.board
+        action, _, _, stats = agent.get_best_action(env)
+        if not stats.replayed and board.current_piece is not None and board.current_piece is not searched:
+            searched = board.current_piece
+            candidates = [e for e in agent.last_evaluations if e.placement is not None]
+            height = int(column_heights(board.grid).max())
+            holes = int(count_holes(board.grid)[0])
+            code = piece_code(board.current_piece.type)
+            choice = agent.last_choice.placement if agent.last_choice is not None else None
+            decisions.append((len(rows['rotation']), len(candidates), pieces, lines))
+            for evaluation in candidates:
+                placement = evaluation.placement
+                for name in FEATURE_NAMES:
+                    rows[name].append(evaluation.metrics[name])
+                rows['heuristic_score'].append(evaluation.score)
+                rows['rotation'].append(placement.rotation)
+                rows['x'].append(placement.x)
+                rows['y'].append(placement.y)
+                rows['piece_type'].append(code)
+                rows['board_height'].append(height)
+                rows['board_holes'].append(holes)
+                rows['candidates'].append(len(candidates))
+                rows['chosen'].append(placement is choice)
+
+        _, _, terminated, _, info = env.step(np.int64(action.value))
+        steps += 1
+        lines = info['lines_cleared']
+        if env.board.current_piece is not piece:
+            piece = env.board.current_piece
+            pieces += 1
+
+    # Labels from the outcome of the whole episode
+    count = len(rows['rotation'])
+    columns = {name: np.array(values, dtype=DATASET_COLUMNS[name]) for name, values in rows.items()}
+    columns['episode'] = np.full(count, episode, dtype=DATASET_COLUMNS['episode'])
+    columns['piece'] = np.empty(count, dtype=DATASET_COLUMNS['piece'])
+    columns['lines_to_end'] = np.empty(count, dtype=DATASET_COLUMNS['lines_to_end'])
+    columns['pieces_to_end'] = np.empty(count, dtype=DATASET_COLUMNS['pieces_to_end'])
+    columns['game_over'] = np.full(count, bool(terminated), dtype=DATASET_COLUMNS['game_over'])
+    for first, size, number, cleared in decisions:
+        columns['piece'][first:first + size] = number
+        columns['lines_to_end'][first:first + size] = lines - cleared
+        columns['pieces_to_end'][first:first + size] = pieces - number
+    return columns
+
+
+class ShardWriter:
+    """Rows of the dataset, buffered and written out in fixed-size .npz shards."""
+
+    def __init__(self, path: str, shard_size: int = 65536, compress: bool = False,
+                 metadata: dict[str, Any] | None = None):
+        """
+        Create an empty dataset, replacing any earlier shards in the directory.
+
+        Args:
+            path: Directory the shards and the manifest are written to
+            shard_size: Number of rows per shard; only the last shard may be smaller
+            compress: Whether to compress the shards
+            metadata: Further fields for the manifest, e.g. the settings of the run
+        """
+        if shard_size < 1:
+            raise ValueError(f"Shard writer needs a shard size of at least 1, got {shard_size}")
+        self.path: str = path
+        self.shard_size: int = shard_size
+        self.compress: bool = compress
+        self.metadata: dict[str, Any] = metadata or {}
+        self.shards: list[dict[str, Any]] = []
+        self.rows: int = 0  # Rows written to shards
+        self.buffered: int = 0  # Rows waiting in the buffers
+        self.episodes: int = 0
+        self.columns: dict[str, NDArray] = {
+            name: np.empty(shard_size, dtype=dtype) for name, dtype in DATASET_COLUMNS.items()
+        }
+
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            if name.endswith('.npz') or name == MANIFEST_FILE:
+                os.remove(os.path.join(path, name))
+
+    def __len__(self) -> int:
+        return self.rows + self.buffered
+
+    def append(self, columns: dict[str, NDArray]) -> None:
+        """
+        Add the rows of one episode, writing every shard that fills up.
+
+        Args:
+            columns: One array per column of DATASET_COLUMNS, all of the same length
+        """
+        count = len(columns['episode'])
+        start = 0
+        while start < count:
+            take = min(count - start, self.shard_size - self.buffered)
+            for name, buffer in self.columns.items():
+                buffer[self.buffered:self.buffered + take] = columns[name][start:start + take]
+            self.buffered += take
+            start += take
+            if self.buffered == self.shard_size:
+                self.flush()
+        self.episodes += 1
+
+    def flush(self) -> None:
+        """Write the buffered rows to a new shard and update the manifest."""
+        if self.buffered:
+            file = f"shard_{len(self.shards):05d}.npz"
+            save = np.savez_compressed if self.compress else np.savez
+            save(os.path.join(self.path, file),
+                 **{name: buffer[:self.buffered] for name, buffer in self.columns.items()})
+            self.shards.append({'file': file, 'rows': self.buffered})
+            self.rows += self.buffered
+            self.buffered = 0
+
+        manifest = {
+            **self.metadata,
+            'rows': self.rows,
+            'episodes': self.episodes,
+            'shard_size': self.shard_size,
+            'columns': DATASET_COLUMNS,
+            'feature_columns': list(FEATURE_NAMES),
+            'shards': self.shards,
+        }
+        temporary = os.path.join(self.path, f"{MANIFEST_FILE}.tmp")
+        with open(temporary, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temporary, os.path.join(self.path, MANIFEST_FILE))
+
+    def close(self) -> None:
+        """Write out the remaining rows."""
+        self.flush()
+
+
+def load_dataset(path: str, columns: list[str] | None = None) -> dict[str, NDArray]:
+    """
+    Read the shards listed in a dataset's manifest.
+
+    Args:
+        path: Directory of the dataset
+        columns: Columns to read (default: all)
+
+    Returns:
+        One array per column, with the rows of all shards
+    """
+    with open(os.path.join(path, MANIFEST_FILE), 'r') as f:
+        manifest = json.load(f)
+
+    names = columns or list(manifest['columns'])
+    parts: dict[str, list[NDArray]] = {name: [] for name in names}
+    for shard in manifest['shards']:
+        with np.load(os.path.join(path, shard['file'])) as data:
+            for name in names:
+                parts[name].append(data[name])
+    return {
+        name: np.concatenate(arrays) if arrays else np.empty(0, dtype=manifest['columns'][name])
+        for name, arrays in parts.items()
+    }
+
+
+def generate_dataset(path: str, episodes: int, weights: dict[str, float] | None = None,
+                     agent_options: dict[str, Any] | None = None, seed: int = 0,
+                     max_steps: int | None = 2000, workers: int | None = None,
+                     shard_size: int = 65536, compress: bool = False) -> ShardWriter:
+    """
+    Play seeded episodes on a process pool and write their candidates to shards.
+
+    Episodes are written in order as they finish, and only a few more than
+    there are workers are in flight at once, so the main process never holds
+    more than a handful of episodes and one shard.
+
+    Args:
+        path: Directory of the dataset
+        episodes: Number of episodes to play
+        weights: Dictionary of weights for the heuristic agent
+        agent_options: Further HeuristicAgent arguments
+        seed: Base seed; episode i is played with seed + i
+        max_steps: Step limit per episode, or None to play until game over
+        workers: Number of worker processes (None for one per CPU)
+        shard_size: Number of rows per shard
+        compress: Whether to compress the shards
+
+    Returns:
+        The closed writer, with the row, shard and episode counts
+    """
+    agent_options = agent_options or {}
+    writer = ShardWriter(path, shard_size, compress, metadata={
+        'created': datetime.now().isoformat(),
+        'weights': weights or HeuristicAgent().weights,
+        'agent_options': agent_options,
+        'seed': seed,
+        'max_steps': max_steps,
+    })
+    in_flight = 2 * (workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque[Future[dict[str, NDArray]]] = deque()
+        for episode in range(episodes):
+            pending.append(pool.submit(play_dataset_episode, weights, agent_options, episode,
+                                       seed + episode, max_steps))
+            if len(pending) >= in_flight:
+                writer.append(pending.popleft().result())
+        while pending:
+            writer.append(pending.popleft().result())
+    writer.close()
+    return writer
+
+
+def main():
+    """Main function to generate a self-play dataset."""
+    parser = argparse.ArgumentParser(description='Write the candidate placements of self-play games to .npz shards')
+    _ = parser.add_argument('--output', type=str, default='agent_test_results/selfplay_dataset',
+                            help='Directory the shards and the manifest are written to')
+    _ = parser.add_argument('--episodes', type=int, default=100, help='Number of episodes to play')
+    _ = parser.add_argument('--seed', type=int, default=0, help='Base seed; episode i is played with seed + i')
+    _ = parser.add_argument('--max-steps', type=int, default=2000,
+                            help='Step limit per episode (0 to play until game over)')
+    _ = parser.add_argument('--workers', type=int, default=None,
+                            help='Number of worker processes (default: one per CPU)')
+    _ = parser.add_argument('--shard-size', type=int, default=65536, help='Number of rows per shard')
+    _ = parser.add_argument('--compress', action='store_true', help='Compress the shards')
+    _ = parser.add_argument('--weights-file', type=str, default=None,
+                            help="JSON file with the agent's weights (default: the agent's default weights)")
+    _ = parser.add_argument('--lookahead', action='store_true', help='Also score the best placement of the next piece')
+    _ = parser.add_argument('--beam-width', type=int, default=5, help='Number of placements expanded by the lookahead')
+
+    args: Namespace = parser.parse_args()
+
+    weights: dict[str, float] | None = None
+    if args.weights_file:
+        with open(args.weights_file, 'r') as f:
+            weights = json.load(f)
+
+    writer = generate_dataset(
+        args.output,
+        episodes=args.episodes,
+        weights=weights,
+        agent_options=dict(lookahead=args.lookahead, beam_width=args.beam_width),
+        seed=args.seed,
+        max_steps=args.max_steps or None,
+        workers=args.workers,
+        shard_size=args.shard_size,
+        compress=args.compress
+    )
+    print(f"Wrote {writer.rows} candidates of {writer.episodes} episodes to {len(writer.shards)} shards "
+          f"in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,15 +5,54 @@ This agent uses simulation to evaluate all possible final positions for each pie
 and selects the best move based on heuristic evaluation.
 """
 import time
+from collections import deque
 import numpy as np
-import copy
-from typing import Callable 
-from dataclasses import dataclass
+from numpy.typing import NDArray
+from typing import Callable
+from dataclasses import dataclass, replace, fields, asdict
 
 # Import Tetris environment
-from tetris import TetrisEnv, Action
+from tetris.environment.tetris_env import TetrisEnv, Action
 from tetris.engine.board import Board
 
+from examples.board_features import (
+    FEATURE_NAMES, BoardFeatures, IncrementalFeatures, extract_features, column_heights, weight_vector,
+    score_upper_bound
+)
+from examples.placement import (
+    Placement, list_placements, drop_placement, place_pieces, place_pieces_on, find_action_path, piece_symmetry
+)
+from examples.sim_board import SimBoard, BitBoard, rows_to_grids
+from examples.transposition_table import TranspositionTable
+from examples.contour_table import ContourTable
+
+# Ways of finding the final positions of a piece
+SEARCH_MODES = ('placement', 'bfs')
+
+# Effort levels of a deadline-bounded decision, in the order they are tried
+EFFORT_LEVELS = ('greedy', 'lookahead', 'wide_beam')
+
+# How much wider the beam of the last effort level is than beam_width
+WIDE_BEAM_FACTOR = 4
+
+# Only boards with at most this many filled cells go into the transposition
+# table; fuller boards rarely come up twice and would evict the ones that do
+TRANSPOSITION_MAX_CELLS = 12
+
+# The contour table is only used on hole-free boards whose stack leaves at
+# least this many rows free at the top, see _contour_move()
+CONTOUR_FREE_ROWS = 4
+
+# Board methods used to simulate each non-dropping action (on a Board or SimBoard)
+BOARD_ACTIONS: dict[Action, Callable[[Board | SimBoard], bool | None]] = {
+    Action.NOOP: lambda b: True,
+    Action.LEFT: lambda b: b.move_left(),
+    Action.RIGHT: lambda b: b.move_right(),
+    Action.ROTATE_CW: lambda b: b.rotate(clockwise=True),
+    Action.ROTATE_CCW: lambda b: b.rotate(clockwise=False),
+    Action.SOFT_DROP: lambda b: b.move_down(),
+}
+
 
 @dataclass
 class MoveEvaluation:
@@ -21,6 +60,90 @@ class MoveEvaluation:
     action_sequence: list[Action]  # Sequence of actions to reach this position
     score: float  # Heuristic score
     metrics: dict[str, float]  # Detailed metrics for analysis
+    placement: Placement | None = None  # Final position, when found by placement enumeration
+    features: IncrementalFeatures | None = None  # Feature state of the resulting board
+    path_checked: bool = False  # Whether the action sequence was replayed on a copy of the real board
+
+
+@dataclass
+class DecisionStats:
+    """
+    Where the time of get_best_action calls went.
+    
+    Timers are read around whole phases, never per search state, so filling
+    the stats costs a handful of clock reads per decision. Stats of several
+    decisions are summed with add().
+    """
+    decisions: int = 1  # get_best_action calls covered
+    replayed: int = 0  # Calls answered from the plan for the current piece
+    transposition_hits: int = 0  # Searches answered from the transposition table
+    contour_hits: int = 0  # Searches answered from the contour table
+    total_ms: float = 0.0  # Wall time of the calls
+    copy_ms: float = 0.0  # Building search boards and feature states from the grid
+    hash_ms: float = 0.0  # Fingerprinting boards for the transposition table and the BFS
+    expansion_ms: float = 0.0  # Enumerating placements or exploring the BFS
+    features_ms: float = 0.0  # Deriving the features of the final positions
+    scoring_ms: float = 0.0  # Weighting the features
+    lookahead_ms: float = 0.0  # Rescoring placements by the next piece
+    selection_ms: float = 0.0  # Building and verifying the action path of the chosen move
+    candidates: int = 0  # Final positions evaluated
+    states_explored: int = 0  # BFS states taken from the frontier
+    duplicates_skipped: int = 0  # BFS states skipped because they were visited before
+    errors: int = 0  # Actions that raised during the BFS
+    peak_frontier: int = 0  # Largest BFS frontier
+    pruned_states: int = 0  # Lookahead placements skipped by branch and bound
+    
+    def add(self, other: 'DecisionStats') -> None:
+        """
+        Add the stats of other decisions to these, keeping the largest peak frontier.
+        
+        Args:
+            other: Stats to add
+        """
+        for field in fields(self):
+            if field.name == 'peak_frontier':
+                self.peak_frontier = max(self.peak_frontier, other.peak_frontier)
+            else:
+                setattr(self, field.name, getattr(self, field.name) + getattr(other, field.name))
+    
+    def as_dict(self) -> dict[str, float]:
+        """Get the stats as a dictionary."""
+        return asdict(self)
+
+
+class SearchNode:
+    """
+    State in the action-sequence search.
+    
+    Nodes point at the node they were reached from instead of holding a copy
+    of the whole action sequence, which is only rebuilt for final positions.
+    """
+    __slots__ = ('parent', 'action', 'state')
+    
+    def __init__(self, parent: 'SearchNode | None', action: Action | None, state: int):
+        self.parent = parent
+        self.action = action  # Action that led here from the parent
+        self.state = state  # Packed piece state, see SimBoard.piece_key()
+    
+    def action_sequence(self) -> list[Action]:
+        """Rebuild the actions leading from the root to this node."""
+        actions: list[Action] = []
+        node = self
+        while node.parent is not None:
+            actions.append(node.action)
+            node = node.parent
+        actions.reverse()
+        return actions
+
+
+@dataclass
+class PiecePlan:
+    """Chosen action sequence for the current piece, replayed over several calls."""
+    evaluation: MoveEvaluation  # Evaluation the plan was made for
+    grid: bytes  # Board grid the plan expects while it is replayed
+    piece_type: object  # Type of the piece the plan moves
+    states: list[tuple[int, int]]  # Expected piece (x, rotation) before each action
+    next_index: int = 1  # Index of the next action to return
 
 
 class HeuristicAgent:
@@ -31,14 +154,53 @@ class HeuristicAgent:
     and selects the best move based on heuristic evaluation.
     """
     
-    def __init__(self, weights: dict[str, float] | None = None, debug: bool = False):
+    def __init__(self, weights: dict[str, float] | None = None, debug: bool = False,
+                 search_mode: str = 'placement', cache_plan: bool = True,
+                 lookahead: bool = False, beam_width: int = 5,
+                 deadline_ms: float | None = None, transposition_size: int = 256,
+                 prune: bool = False, contour_table: str | None = None):
         """
         Initialize the agent with heuristic weights.
         
         Args:
             weights: Dictionary of weights for different heuristics
             debug: Whether to print debug information
+            search_mode: 'placement' to enumerate drops directly from the piece
+                shapes, or 'bfs' to search over action sequences
+            cache_plan: Whether to replay the chosen action sequence on later
+                calls instead of searching again for every move of a piece
+            lookahead: Whether to score placements by the best placement of
+                the next piece as well (two-ply search)
+            beam_width: Number of best first-ply placements expanded by the
+                lookahead
+            deadline_ms: Time budget per decision. When set, the agent runs the
+                effort levels in EFFORT_LEVELS one after another (greedy, then
+                lookahead, then a wider beam), whether or not lookahead is
+                enabled. A level only starts if its estimated cost fits in the
+                remaining time, so the decision returns by the deadline unless
+                the greedy search alone overruns it
+            transposition_size: Number of evaluated (board, piece) situations
+                kept for reuse across decisions and episodes; 0 disables the
+                transposition table
+            prune: Whether the lookahead skips first-ply placements whose
+                score bound cannot beat the best two-ply score found so far
+                (branch and bound). The best-scoring placement is the same
+                either way; if it cannot be reached, the next one is chosen
+                among the expanded placements only, which can differ from an
+                unpruned search. Needs the lookahead, either enabled or run
+                within a deadline
+            contour_table: Path of a contour table built for these weights (see
+                contour_table.py); common surfaces are then answered with one
+                lookup instead of a search. Only the placement search without
+                lookahead or deadline can use it
         """
+        if search_mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode {search_mode!r}, expected one of {SEARCH_MODES}")
+        if beam_width < 1:
+            raise ValueError(f"Beam width must be at least 1, got {beam_width}")
+        if prune and not lookahead and deadline_ms is None:
+            raise ValueError("Pruning needs the lookahead, enable lookahead or set a deadline")
+        
         # Default weights if none provided
         self.weights: dict[str, float] = weights or {
             'holes': -4.0,           # Penalty for creating holes
@@ -48,8 +210,61 @@ class HeuristicAgent:
             'well_depth': 0.5,       # Reward for creating wells for I pieces
         }
         self.debug: bool = debug
+        self.search_mode: str = search_mode
+        self.cache_plan: bool = cache_plan
+        self.lookahead: bool = lookahead
+        self.beam_width: int = beam_width
+        self.deadline_ms: float | None = deadline_ms
+        self.prune: bool = prune
+        # Best placements of common surfaces, memory-mapped
+        self.contour_table: ContourTable | None = None
+        if contour_table is not None:
+            if search_mode != 'placement' or lookahead or deadline_ms is not None:
+                raise ValueError("A contour table only supports the placement search without lookahead or deadline")
+            self.contour_table = ContourTable(contour_table)
+            if not np.array_equal(self.contour_table.weights, weight_vector(self.weights)):
+                raise ValueError(f"Contour table {contour_table} was built for other weights")
+        # Stats of the last call to get_best_action
+        self.last_stats: DecisionStats = DecisionStats(decisions=0)
+        # Effort level reached by the last search, see EFFORT_LEVELS
+        self.last_effort: str | None = None
+        # Running averages of the time to score one next-piece placement in
+        # the lookahead and of one path search, in seconds, so deadline
+        # searches can estimate what still fits
+        self._child_cost: float | None = None
+        self._path_cost: float | None = None
+        # Candidates of the last search and the one chosen from them; calls
+        # answered from the plan leave them as they are
+        self.last_evaluations: list[MoveEvaluation] = []
+        self.last_choice: MoveEvaluation | None = None
+        self._plan: PiecePlan | None = None
+        # Candidate evaluations of situations seen before, see _cached_evaluations()
+        self.transposition_table: TranspositionTable[list[MoveEvaluation]] | None = (
+            TranspositionTable(transposition_size) if transposition_size > 0 else None
+        )
+        # Feature state of the board expected after the last chosen placement,
+        # and that board's filled cells, so the next decision can start from it
+        self._feature_state: IncrementalFeatures | None = None
+        self._feature_grid: bytes | None = None
+        # Shape of each piece type seen so far, for boards that only name the next piece
+        self._piece_shapes: dict[object, NDArray[np.int8]] = {}
+        # Plan of each board of the last get_best_actions call
+        self._batch_plans: list[PiecePlan | None] = []
     
-    def get_best_action(self, env: TetrisEnv) -> tuple[Action, float, dict[str, float]]:
+    def reset(self) -> None:
+        """
+        Forget the state of the current game, e.g. when a new episode starts.
+        
+        The transposition table is kept, since its entries only depend on the
+        situation they were evaluated in.
+        """
+        self._plan = None
+        self._feature_state = None
+        self._feature_grid = None
+        self._piece_shapes = {}
+        self._batch_plans = []
+    
+    def get_best_action(self, env: TetrisEnv) -> tuple[Action, float, dict[str, float], DecisionStats]:
         """
         Determine the best action to take in the current state.
         
@@ -57,21 +272,56 @@ class HeuristicAgent:
             env: The Tetris environment
             
         Returns:
-            Tuple of (best action, decision time in ms, metrics)
+            Tuple of (best action, decision time in ms, metrics, stats of this decision)
         """
         start_time = time.time()
+        stats = self.last_stats = DecisionStats()
         
-        # Get all possible final positions
-        evaluations = self._evaluate_all_positions(env)
+        # Keep following the plan for this piece while the board still matches it
+        if self.cache_plan:
+            planned = self._next_planned_action(env.board)
+            if planned is not None:
+                stats.replayed = 1
+                stats.total_ms = (time.time() - start_time) * 1000
+                return planned, stats.total_ms, self._plan.evaluation.metrics, stats
+        
+        # Answer common surfaces from the contour table, or get all possible final positions
+        best_eval = self._contour_move(env.board)
+        evaluations = [best_eval] if best_eval is not None else self._cached_evaluations(env)
         
-        if not evaluations:
+        # Find the best evaluation that can be reached, preferring the
+        # lookahead ranking of the beam when it is enabled
+        self.last_effort = EFFORT_LEVELS[0]
+        if self.deadline_ms is not None:
+            best_eval, self.last_effort = self._search_until_deadline(
+                env.board, evaluations, start_time, start_time + self.deadline_ms / 1000
+            )
+        elif self.lookahead:
+            lookahead_start = time.perf_counter()
+            ranking = self._lookahead(env.board, evaluations, self.beam_width) or []
+            stats.lookahead_ms += (time.perf_counter() - lookahead_start) * 1000
+            best_eval = self._select_best(env.board, ranking)
+            if best_eval is not None:
+                self.last_effort = EFFORT_LEVELS[1]
+        if best_eval is None:
+            best_eval = self._select_best(env.board, evaluations)
+        
+        if best_eval is None and self.search_mode != 'bfs':
+            # No placement could be reached directly, so search the action sequences
+            if self.debug:
+                print("No placement reachable directly, falling back to BFS")
+            evaluations = self._search_action_sequences(env)
+            best_eval = self._select_best(env.board, evaluations)
+        
+        self.last_evaluations = evaluations
+        self.last_choice = best_eval
+        
+        if best_eval is None:
             # If no valid moves, just do a hard drop
             if self.debug:
                 print("No valid moves found, using HARD_DROP")
-            return Action.HARD_DROP, (time.time() - start_time) * 1000, {}
-        
-        # Find the best evaluation
-        best_eval = max(evaluations, key=lambda e: e.score)
+            stats.total_ms = (time.time() - start_time) * 1000
+            return Action.HARD_DROP, stats.total_ms, {}, stats
         
         if self.debug:
             print(f"Best action sequence: {[a.name for a in best_eval.action_sequence]}")
@@ -83,13 +333,511 @@ class HeuristicAgent:
             sorted_evals = sorted(evaluations, key=lambda e: e.score, reverse=True)[:3]
             for i, eval in enumerate(sorted_evals):
                 print(f"Evaluation {i+1}:")
-                print(f"  Action sequence: {[a.name for a in eval.action_sequence]}")
+                if eval.placement is not None:
+                    print(f"  Placement: rotation {eval.placement.rotation}, column {eval.placement.x}")
+                else:
+                    print(f"  Action sequence: {[a.name for a in eval.action_sequence]}")
                 print(f"  Score: {eval.score}")
                 print(f"  Metrics: {eval.metrics}")
         
+        if self.deadline_ms is not None:
+            best_eval = replace(best_eval, metrics={
+                **best_eval.metrics, 'effort_level': float(EFFORT_LEVELS.index(self.last_effort))
+            })
+        if self.prune:
+            best_eval = replace(best_eval, metrics={**best_eval.metrics, 'pruned_states': float(stats.pruned_states)})
+        
+        if self.cache_plan:
+            self._plan = self._make_plan(env.board, best_eval)
+        
+        if best_eval.features is not None and best_eval.placement.grid is not None:
+            self._feature_state = best_eval.features
+            self._feature_grid = (best_eval.placement.grid > 0).tobytes()
+        
+        piece = env.board.current_piece
+        if piece is not None:
+            self._piece_shapes.setdefault(getattr(piece.type, 'value', piece.type), piece.shape)
+        
         # Return the first action in the best sequence
-        decision_time_ms = (time.time() - start_time) * 1000
-        return best_eval.action_sequence[0], decision_time_ms, best_eval.metrics
+        stats.total_ms = (time.time() - start_time) * 1000
+        return best_eval.action_sequence[0], stats.total_ms, best_eval.metrics, stats
+    
+    def get_best_actions(self, envs: list[TetrisEnv],
+                         grids: NDArray[np.int8] | None = None) -> tuple[list[Action], DecisionStats]:
+        """
+        Determine the best action for several environments at once.
+        
+        The boards that need a new decision are evaluated together: their
+        candidate placements are stacked into one array and scored with one
+        feature pass and one features-by-weights product. Each environment
+        keeps its own plan, indexed by its position in envs, so the list
+        should hold the same environments in the same order on every call.
+        Only the one-ply placement search is batched, without a contour table.
+        
+        Args:
+            envs: The Tetris environments
+            grids: Grids of their boards stacked as (N, rows, cols), e.g.
+                VectorTetrisEnv.grids; the pending boards are taken from it
+                with one indexing step. Read from the boards if None
+            
+        Returns:
+            Tuple of (best action for each environment, stats of the call)
+        """
+        if self.search_mode != 'placement' or self.lookahead or self.deadline_ms is not None:
+            raise ValueError("Batched decisions only support the placement search without lookahead or deadline")
+        if self.contour_table is not None:
+            raise ValueError("Batched decisions do not support a contour table")
+        
+        start_time = time.time()
+        stats = self.last_stats = DecisionStats(decisions=len(envs))
+        if len(self._batch_plans) != len(envs):
+            self._batch_plans = [None] * len(envs)
+        
+        # Replay the plans that still match their boards
+        actions: list[Action] = [Action.HARD_DROP] * len(envs)
+        pending: list[int] = []
+        for i, env in enumerate(envs):
+            plan = self._batch_plans[i]
+            planned = self._replay_plan(plan, env.board) if self.cache_plan and plan is not None else None
+            if planned is None:
+                self._batch_plans[i] = None
+                pending.append(i)
+            else:
+                actions[i] = planned
+                stats.replayed += 1
+        
+        # Search the other boards in one batch
+        batch = self.evaluate_placements_batch(
+            grids[pending] if grids is not None else [envs[i].board.grid for i in pending],
+            [None if envs[i].board.game_over or envs[i].board.current_piece is None
+             else envs[i].board.current_piece.shape for i in pending]
+        )
+        for i, evaluations in zip(pending, batch):
+            board = envs[i].board
+            best_eval = self._select_best(board, evaluations)
+            if best_eval is None:
+                best_eval = self._select_best(board, self._search_action_sequences(envs[i]))
+            if best_eval is None:
+                continue
+            actions[i] = best_eval.action_sequence[0]
+            if self.cache_plan:
+                self._batch_plans[i] = self._make_plan(board, best_eval)
+        
+        stats.total_ms = (time.time() - start_time) * 1000
+        return actions, stats
+    
+    def evaluate_placements_batch(self, grids: list[NDArray[np.int8]] | NDArray[np.int8],
+                                  shapes: list[NDArray[np.int8] | None]) -> list[list[MoveEvaluation]]:
+        """
+        Evaluate every distinct drop of a piece on several boards at once.
+        
+        Args:
+            grids: The board grids, without the falling pieces, as a list or
+                stacked into one (N, rows, cols) array
+            shapes: Shape matrix of each board's piece, or None for a board without one
+            
+        Returns:
+            List of move evaluations for each board, without action sequences
+        """
+        stats = self.last_stats
+        start = time.perf_counter()
+        placements: list[Placement] = []
+        counts: list[int] = []
+        for grid, shape in zip(grids, shapes):
+            if shape is None:
+                counts.append(0)
+                continue
+            board_placements = list_placements(column_heights(grid)[0], grid.shape[0], shape)
+            placements.extend(board_placements)
+            counts.append(len(board_placements))
+        expanded = time.perf_counter()
+        stats.expansion_ms += (expanded - start) * 1000
+        if not placements:
+            return [[] for _ in grids]
+        
+        # One stack with a copy of its board for every candidate
+        stack = grids if isinstance(grids, np.ndarray) else np.stack(grids)
+        results, lines = place_pieces_on(np.repeat(stack, counts, axis=0), placements)
+        copied = time.perf_counter()
+        features = extract_features(results, lines)
+        derived = time.perf_counter()
+        scores = self._score_features(features)
+        stats.copy_ms += (copied - expanded) * 1000
+        stats.features_ms += (derived - copied) * 1000
+        stats.scoring_ms += (time.perf_counter() - derived) * 1000
+        stats.candidates += len(placements)
+        
+        evaluations: list[list[MoveEvaluation]] = []
+        offset = 0
+        for count in counts:
+            evaluations.append([
+                MoveEvaluation(action_sequence=[], score=float(scores[j]), metrics=features.metrics(j),
+                               placement=placements[j])
+                for j in range(offset, offset + count)
+            ])
+            offset += count
+        return evaluations
+    
+    def _make_plan(self, board: Board, evaluation: MoveEvaluation) -> PiecePlan | None:
+        """
+        Record the piece states an action sequence passes through.
+        
+        Args:
+            board: The board with the current piece
+            evaluation: The chosen evaluation
+            
+        Returns:
+            Plan for replaying the remaining actions, or None if there are none
+        """
+        if len(evaluation.action_sequence) < 2 or board.current_piece is None:
+            return None
+        
+        sim_board = board.copy()
+        states: list[tuple[int, int]] = []
+        for action in evaluation.action_sequence[:-1]:
+            piece = sim_board.current_piece
+            states.append((piece.x, piece.rotation))
+            _ = BOARD_ACTIONS[action](sim_board)
+        piece = sim_board.current_piece
+        states.append((piece.x, piece.rotation))
+        
+        return PiecePlan(
+            evaluation=evaluation,
+            grid=board.grid.tobytes(),
+            piece_type=board.current_piece.type,
+            states=states
+        )
+    
+    def _next_planned_action(self, board: Board) -> Action | None:
+        """
+        Get the next action of the current plan if the board still matches it.
+        
+        The plan is dropped once it is finished, when a new piece appears or
+        when the piece is not where the plan expects it (e.g. a blocked move).
+        Gravity only changes the row of the piece, so the row is not checked.
+        
+        Args:
+            board: The board with the current piece
+            
+        Returns:
+            The next planned action, or None if the agent has to search again
+        """
+        if self._plan is None:
+            return None
+        action = self._replay_plan(self._plan, board)
+        if action is None:
+            self._plan = None
+        return action
+    
+    def _replay_plan(self, plan: PiecePlan, board: Board) -> Action | None:
+        """
+        Take the next action of a plan if the board still matches it.
+        
+        Args:
+            plan: The plan to follow
+            board: The board with the current piece
+            
+        Returns:
+            The next planned action, or None if the plan is finished or no
+            longer fits the board
+        """
+        piece = board.current_piece
+        index = plan.next_index
+        if (index >= len(plan.evaluation.action_sequence)
+                or piece is None
+                or piece.type != plan.piece_type
+                or (piece.x, piece.rotation) != plan.states[index]
+                or board.grid.tobytes() != plan.grid):
+            if self.debug and index < len(plan.evaluation.action_sequence):
+                print("Board no longer matches the plan, searching again")
+            return None
+        
+        plan.next_index += 1
+        return plan.evaluation.action_sequence[index]
+    
+    def _select_best(self, board: Board, evaluations: list[MoveEvaluation],
+                     deadline: float | None = None) -> MoveEvaluation | None:
+        """
+        Pick the highest scoring evaluation whose position can be reached.
+        
+        Evaluations from placement enumeration get their action sequence here,
+        so the path finder only runs for the placements that are considered.
+        Action sequences found on a simulation board (BFS) are replayed on a
+        copy of the real board first, so a sequence the real board moves
+        differently is skipped in favour of the next evaluation.
+        
+        Args:
+            board: The board with the current piece
+            evaluations: Evaluations to choose from
+            deadline: Time (as returned by time.time()) after which no further
+                path search is started
+            
+        Returns:
+            The best reachable evaluation, or None if there is none or the
+            deadline passed first
+        """
+        start = time.perf_counter()
+        try:
+            for evaluation in sorted(evaluations, key=lambda e: e.score, reverse=True):
+                if evaluation.action_sequence and not evaluation.path_checked and evaluation.placement is not None:
+                    if self._replay_matches(board, evaluation):
+                        evaluation.path_checked = True
+                        return evaluation
+                    if self.debug:
+                        print(f"Action sequence {[a.name for a in evaluation.action_sequence]} "
+                              "does not reach its position on the real board, skipping")
+                    continue
+                if evaluation.action_sequence or evaluation.placement is None:
+                    return evaluation
+                
+                if deadline is not None and time.time() >= deadline:
+                    return None
+                
+                path_start = time.perf_counter()
+                if evaluation.placement.grid is None:
+                    # Build the resulting board so the path finder can verify the drop
+                    _ = place_pieces(board.grid, [evaluation.placement])
+                path = find_action_path(board, evaluation.placement)
+                path_cost = time.perf_counter() - path_start
+                self._path_cost = path_cost if self._path_cost is None else (self._path_cost + path_cost) / 2
+                if path is not None:
+                    evaluation.action_sequence = path
+                    evaluation.path_checked = True
+                    return evaluation
+                
+                if self.debug:
+                    print(f"Placement {evaluation.placement.rotation}/{evaluation.placement.x} not reachable, skipping")
+            return None
+        finally:
+            self.last_stats.selection_ms += (time.perf_counter() - start) * 1000
+    
+    def _replay_matches(self, board: Board, evaluation: MoveEvaluation) -> bool:
+        """
+        Replay an action sequence on a copy of the board and compare the result.
+        
+        A sequence that ends before the piece locks (e.g. with a soft drop onto
+        the stack) is finished with a hard drop, which locks the piece in place.
+        
+        Args:
+            board: The board with the current piece
+            evaluation: Evaluation with an action sequence and a placement with its resulting grid
+            
+        Returns:
+            True if the sequence locks the piece into the evaluated position
+        """
+        if evaluation.placement.grid is None:
+            return False
+        replay = board.copy()
+        piece = replay.current_piece
+        try:
+            for action in evaluation.action_sequence:
+                if action == Action.HARD_DROP:
+                    _ = replay.hard_drop()
+                    break
+                if BOARD_ACTIONS[action](replay) is False:
+                    return False
+            if replay.current_piece is piece:
+                _ = replay.hard_drop()
+        except Exception:
+            return False
+        return np.array_equal(replay.grid > 0, evaluation.placement.grid > 0)
+    
+    def _next_piece_shape(self, board: Board) -> NDArray[np.int8] | None:
+        """
+        Get the shape matrix of the next piece, in any orientation.
+        
+        Boards that only name the next piece are served from the shapes of
+        the pieces the agent has already played.
+        
+        Args:
+            board: The board
+            
+        Returns:
+            The shape matrix, or None if it is not known
+        """
+        next_piece = getattr(board, 'next_piece', None)
+        if next_piece is None:
+            return None
+        shape = getattr(next_piece, 'shape', None)
+        if shape is not None:
+            return np.asarray(shape)
+        piece_type = getattr(next_piece, 'type', next_piece)
+        return self._piece_shapes.get(getattr(piece_type, 'value', piece_type))
+    
+    def _search_until_deadline(self, board: Board, evaluations: list[MoveEvaluation],
+                               start_time: float, deadline: float) -> tuple[MoveEvaluation | None, str]:
+        """
+        Choose a reachable evaluation with increasing effort within the deadline.
+        
+        The greedy choice and its action path are found first, so there is
+        always an answer. A lookahead level is only started if its estimated
+        cost fits in the remaining time: the next piece's placements for each
+        expanded placement, plus one path search for its choice, at the
+        average cost measured so far (before the first lookahead, a placement
+        costs as much as one of the greedy search). A level that still runs
+        out of time is dropped in favour of the choice of the level before.
+        
+        Args:
+            board: The board with the current piece
+            evaluations: First-ply evaluations (the greedy level)
+            start_time: Time (as returned by time.time()) the decision started
+            deadline: Time (as returned by time.time()) by which to return
+            
+        Returns:
+            Tuple of (choice of the last level that finished, or None if no
+            evaluation is reachable, name of that level)
+        """
+        greedy_cost = (time.time() - start_time) / max(len(evaluations), 1)
+        best, level = self._select_best(board, evaluations), EFFORT_LEVELS[0]
+        next_shape = self._next_piece_shape(board)
+        if best is None or next_shape is None:
+            return best, level
+        
+        cols = board.grid.shape[1]
+        next_placements = sum(cols - len(o.columns) + 1 for o in piece_symmetry(next_shape).orientations)
+        for name, beam_width in ((EFFORT_LEVELS[1], self.beam_width),
+                                 (EFFORT_LEVELS[2], self.beam_width * WIDE_BEAM_FACTOR)):
+            path_cost = self._path_cost or 0.0
+            child_cost = self._child_cost or greedy_cost
+            expanded = min(beam_width, len(evaluations)) * next_placements
+            if time.time() + expanded * child_cost + path_cost >= deadline:
+                break
+            lookahead_start = time.perf_counter()
+            rescored = self._lookahead(board, evaluations, beam_width, deadline - path_cost)
+            elapsed = time.perf_counter() - lookahead_start
+            self.last_stats.lookahead_ms += elapsed * 1000
+            if not rescored:
+                # Out of time, or the next piece is unknown
+                break
+            child_cost = elapsed / (len(rescored) * next_placements)
+            self._child_cost = child_cost if self._child_cost is None else (self._child_cost + child_cost) / 2
+            choice = self._select_best(board, rescored, deadline)
+            if choice is None:
+                break
+            best, level = choice, name
+        
+        if self.debug:
+            print(f"Reached effort level {level!r} before the deadline")
+        return best, level
+    
+    def _lookahead(self, board: Board, evaluations: list[MoveEvaluation], beam_width: int,
+                   deadline: float | None = None) -> list[MoveEvaluation] | None:
+        """
+        Rescore the best placements by the best placement of the next piece.
+        
+        Only the beam_width highest scoring first-ply placements are expanded,
+        so the cost is bounded by about beam_width times the placements of one
+        piece. Second-ply features are derived incrementally from the feature
+        state of each first-ply board.
+        
+        With pruning enabled, a placement is only expanded if the bound from
+        score_upper_bound() beats the best two-ply score found so far. Pruned
+        placements are left out of the result, so the choice only falls back
+        to truly scored placements, and to the greedy ranking after them. The
+        highest two-ply score is the same as without pruning, but when that
+        placement is unreachable the fallback may differ.
+        
+        Args:
+            board: The board with the current piece
+            evaluations: First-ply evaluations
+            beam_width: Number of first-ply placements to expand
+            deadline: Time (as returned by time.time()) after which to give up
+            
+        Returns:
+            Rescored copies of the expanded evaluations; empty if the next
+            piece is unknown, or None if the deadline passed first
+        """
+        next_shape = self._next_piece_shape(board)
+        if next_shape is None:
+            return []
+        
+        beam = [
+            e for e in sorted(evaluations, key=lambda e: e.score, reverse=True)
+            if e.features is not None or (e.placement is not None and e.placement.grid is not None)
+        ][:beam_width]
+        
+        if self.prune:
+            orientations = piece_symmetry(next_shape).orientations
+            piece_cells = len(orientations[0].cells)
+            piece_width = max(len(o.columns) for o in orientations)
+            piece_span = max(max(r for r, _ in o.cells) - o.top + 1 for o in orientations)
+        
+        weights = weight_vector(self.weights)
+        rows = board.grid.shape[0]
+        expanded = 0
+        best = float('-inf')
+        rescored: list[MoveEvaluation] = []
+        for evaluation in beam:
+            if deadline is not None and time.time() >= deadline:
+                return None
+            state = evaluation.features or IncrementalFeatures.from_grid(evaluation.placement.grid)
+            # Lines cleared by both pieces count towards the final position
+            first_lines = int(evaluation.metrics['lines_cleared'])
+            if self.prune:
+                bound = score_upper_bound(state, weights, piece_cells, piece_width, piece_span, first_lines)
+                if bound <= best:
+                    self.last_stats.pruned_states += 1
+                    continue
+            
+            children = [state.place(p.cells, p.x, p.y) for p in list_placements(state.heights, rows, next_shape)]
+            expanded += len(children)
+            # A placement after which the next piece cannot be placed is a loss
+            score = float(self._score_states(children, first_lines).max()) if children else float('-inf')
+            best = max(best, score)
+            rescored.append(replace(evaluation, score=score))
+        
+        if not expanded:
+            return []
+        
+        if self.debug:
+            print(f"Lookahead rescored {len(rescored)} placements with {expanded} next-piece placements, "
+                  f"pruned {self.last_stats.pruned_states}")
+        
+        return rescored
+    
+    def _cached_evaluations(self, env: TetrisEnv) -> list[MoveEvaluation]:
+        """
+        Evaluate all final positions, or reuse them if the situation was seen before.
+        
+        The situation is keyed on the filled cells of the board, the type and
+        position of the falling piece, the search mode and the weight vector.
+        Cached evaluations keep the action sequences built for them. Only
+        early-game boards (see TRANSPOSITION_MAX_CELLS) are looked up and stored.
+        
+        Args:
+            env: The Tetris environment
+            
+        Returns:
+            List of move evaluations
+        """
+        table = self.transposition_table
+        piece = env.board.current_piece
+        if table is None or piece is None:
+            return self._evaluate_all_positions(env)
+        
+        start = time.perf_counter()
+        filled = env.board.grid > 0
+        if np.count_nonzero(filled) > TRANSPOSITION_MAX_CELLS:
+            self.last_stats.hash_ms += (time.perf_counter() - start) * 1000
+            return self._evaluate_all_positions(env)
+        
+        key = (
+            filled.tobytes(),
+            getattr(piece.type, 'value', piece.type), piece.x, piece.y, piece.rotation,
+            self.search_mode,
+            tuple(self.weights.get(name, 0.0) for name in FEATURE_NAMES)
+        )
+        evaluations = table.get(key)
+        self.last_stats.hash_ms += (time.perf_counter() - start) * 1000
+        if evaluations is not None:
+            self.last_stats.transposition_hits += 1
+            if self.debug:
+                print(f"Transposition hit, reusing {len(evaluations)} evaluations")
+            return evaluations
+        
+        evaluations = self._evaluate_all_positions(env)
+        table.put(key, evaluations)
+        return evaluations
     
     def _evaluate_all_positions(self, env: TetrisEnv) -> list[MoveEvaluation]:
         """
@@ -101,18 +849,160 @@ class HeuristicAgent:
         Returns:
             List of move evaluations
         """
-        # Create a copy of the environment for simulation
-        sim_env = copy.deepcopy(env)
+        if self.search_mode == 'bfs':
+            return self._search_action_sequences(env)
+        return self._evaluate_placements(env.board)
+    
+    def _evaluate_placements(self, board: Board) -> list[MoveEvaluation]:
+        """
+        Evaluate every distinct (rotation, column) drop of the current piece.
+        
+        The features of each drop are derived from the feature state of the
+        current board, touching only the columns the piece covers. Action
+        sequences are left empty; they are built by _select_best only for
+        the placements that win the evaluation.
+        
+        Args:
+            board: The board with the current piece
+            
+        Returns:
+            List of move evaluations
+        """
+        if board.current_piece is None or board.game_over:
+            return []
+        
+        stats = self.last_stats
+        start = time.perf_counter()
+        state = self._board_feature_state(board)
+        copied = time.perf_counter()
+        placements = list_placements(state.heights, state.rows, board.current_piece.shape)
+        expanded = time.perf_counter()
+        stats.copy_ms += (copied - start) * 1000
+        stats.expansion_ms += (expanded - copied) * 1000
+        if not placements:
+            return []
+        
+        children = [state.place(p.cells, p.x, p.y) for p in placements]
+        derived = time.perf_counter()
+        scores = self._score_states(children)
+        stats.features_ms += (derived - expanded) * 1000
+        stats.scoring_ms += (time.perf_counter() - derived) * 1000
+        stats.candidates += len(children)
+        
+        if self.debug:
+            print(f"Enumerated {len(placements)} placements")
+        
+        return [
+            MoveEvaluation(action_sequence=[], score=float(score), metrics=child.metrics(),
+                           placement=placement, features=child)
+            for placement, child, score in zip(placements, children, scores)
+        ]
+    
+    def _contour_move(self, board: Board) -> MoveEvaluation | None:
+        """
+        Look up the placement of the current piece in the contour table.
+        
+        Full rows are cleared, so the lowest column of a hole-free board is
+        empty and the board is exactly one of the table's boards: the stored
+        placement is the one the full search picks. Boards with holes differ
+        from the table's boards below their surface, and high stacks come
+        close to where the table's boards were cut off and pieces spawn, so
+        both are left to the full search.
+        
+        Args:
+            board: The board with the current piece
+            
+        Returns:
+            The evaluation of the stored placement with its action sequence,
+            or None if there is no table, the board has holes or a high
+            stack, there is no entry, or the placement does not fit or cannot
+            be reached on this board
+        """
+        piece = board.current_piece
+        if self.contour_table is None or piece is None or board.game_over:
+            return None
+        
+        start = time.perf_counter()
+        state = self._board_feature_state(board)
+        if state.holes or state.height > state.rows - CONTOUR_FREE_ROWS:
+            self.last_stats.hash_ms += (time.perf_counter() - start) * 1000
+            return None
+        entry = self.contour_table.lookup(piece.type, piece.shape, state.heights)
+        placement = drop_placement(state.heights, state.rows, piece.shape, *entry) if entry is not None else None
+        self.last_stats.hash_ms += (time.perf_counter() - start) * 1000
+        if placement is None:
+            return None
+        
+        child = state.place(placement.cells, placement.x, placement.y)
+        evaluation = MoveEvaluation(action_sequence=[], score=float(self._score_states([child])[0]),
+                                    metrics=child.metrics(), placement=placement, features=child)
+        if self._select_best(board, [evaluation]) is None:
+            return None
+        self.last_stats.contour_hits += 1
+        self.last_stats.candidates += 1
+        return evaluation
+    
+    def _board_feature_state(self, board: Board) -> IncrementalFeatures:
+        """
+        Get the feature state of the board, reusing the one kept from the last decision.
         
-        # List to store all evaluations
-        evaluations: list[MoveEvaluation] = []
+        The kept state is the one derived for the last chosen placement. It is
+        only rebuilt from the grid when the board turned out differently, e.g.
+        after a new episode or a move that did not go as planned.
         
-        # Track visited states to avoid duplicates
+        Args:
+            board: The board
+            
+        Returns:
+            The feature state of the board without the falling piece
+        """
+        if self._feature_state is None or (board.grid > 0).tobytes() != self._feature_grid:
+            self._feature_state = IncrementalFeatures.from_grid(board.grid)
+            self._feature_grid = (board.grid > 0).tobytes()
+        return self._feature_state
+    
+    def _search_action_sequences(self, env: TetrisEnv) -> list[MoveEvaluation]:
+        """
+        Find final positions with a BFS over action sequences.
+        
+        This is slower than placement enumeration but also finds positions
+        that need moves after the piece has started to drop.
+        
+        Args:
+            env: The Tetris environment
+            
+        Returns:
+            List of move evaluations
+        """
+        stats = self.last_stats
+        start = time.perf_counter()
+        
+        # Simulate moves in place on a bitboard instead of copying the environment
+        sim_board = BitBoard.from_board(env.board)
+        copied = time.perf_counter()
+        stats.copy_ms += (copied - start) * 1000
+        if sim_board is None or env.board.game_over:
+            return []
+        
+        # Final positions found by the search; they are evaluated together at the end
+        final_nodes: list[SearchNode] = []
+        final_placements: list[Placement] = []
+        final_rows: list[list[int]] = []
+        final_lines: list[int] = []
+        
+        # Track visited states to avoid duplicates. Each key packs the board
+        # fingerprint (computed once per decision) with the cells covered by
+        # the piece, so rotations that look the same count as one state.
         visited_states: set[int] = set()
+        fingerprint_key = (hash(sim_board.fingerprint) & 0xFFFFFFFF) << 24
+        hashed = time.perf_counter()
+        stats.hash_ms += (hashed - copied) * 1000
         
-        # Queue for BFS traversal of possible moves
-        # Each entry is (action_sequence, board_state)
-        queue: list[tuple[list[Action], Board]] = [([], sim_env.board)]
+        # Cells covered by each final position, so one is only evaluated once
+        final_keys: set[int] = set()
+        
+        # Frontier for BFS traversal of possible moves
+        frontier: deque[SearchNode] = deque([SearchNode(None, None, sim_board.piece_key())])
         
         # Limit the number of states to explore to avoid infinite loops
         max_states = 1000
@@ -124,43 +1014,39 @@ class HeuristicAgent:
         # Track errors for debugging
         error_counts = {action.name: 0 for action in Action}
         
-        while queue and states_explored < max_states:
-            action_sequence, current_board = queue.pop(0)
+        peak_frontier = 1
+        duplicates = 0
+        
+        while frontier and states_explored < max_states:
+            if len(frontier) > peak_frontier:
+                peak_frontier = len(frontier)
+            node = frontier.popleft()
             states_explored += 1
             
             if self.debug:
-                print(f"Exploring state {states_explored} with action sequence: {[a.name for a in action_sequence]}")
+                print(f"Exploring state {states_explored} with action sequence: {[a.name for a in node.action_sequence()]}")
             
             # Skip if we've already visited this state
-            board_hash = self._hash_board_state(current_board.grid, current_board)
-            if board_hash in visited_states:
+            sim_board.restore_key(node.state)
+            state_key = fingerprint_key | sim_board.canonical_key()
+            if state_key in visited_states:
+                duplicates += 1
                 if self.debug:
                     print("  Skipping already visited state")
                 continue
             
-            visited_states.add(board_hash)
+            visited_states.add(state_key)
+            checkpoint = sim_board.checkpoint()
 
-            action_funcs: list[tuple[Action, Callable[[Board], bool | None]]] = [
-                (Action.NOOP, lambda b: True),      
-                (Action.LEFT, lambda b: b.move_left()),
-                (Action.RIGHT, lambda b: b.move_right()),
-                (Action.ROTATE_CW, lambda b: b.rotate(clockwise=True)),
-                (Action.ROTATE_CCW, lambda b: b.rotate(clockwise=False)),
-                (Action.SOFT_DROP, lambda b: b.move_down())
-            ]
-            
             # Try each possible action
-            for action, action_func in action_funcs:
-                # Create a copy of the board
-                next_board = current_board.copy()
-                
+            for action, action_func in BOARD_ACTIONS.items():
                 # Execute the action
                 try:
                     if self.debug:
                         print(f"  Trying action: {action.name}")
                     
-                    # Use the board method directly
-                    result = action_func(next_board)
+                    # Apply the action in place; it is undone below
+                    result = action_func(sim_board)
                     
                     # Skip if the action didn't change the state
                     if not result:
@@ -168,130 +1054,117 @@ class HeuristicAgent:
                             print(f"    Action {action.name} had no effect, skipping")
                         continue
                     
-                    # Skip if the game ended
-                    if next_board.game_over:
-                        if self.debug:
-                            print("    Game terminated, skipping")
-                        continue
-                    
-                    # Skip if we've already visited this state
-                    next_hash = self._hash_board_state(next_board.grid, next_board)
-                    if next_hash == board_hash:
+                    next_state = sim_board.piece_key()
+                    if next_state == node.state:
                         if self.debug:
                             print("    State didn't change, skipping")
                         continue
                     
-                    # Add to queue for further exploration
-                    queue.append((action_sequence + [action], next_board))
+                    # Add to the frontier for further exploration
+                    child = SearchNode(node, action, next_state)
+                    frontier.append(child)
                     action_counts[action.name] += 1
                     
                     if self.debug:
-                        print(f"    Added to queue with new sequence: {[a.name for a in action_sequence + [action]]}")
+                        print(f"    Added to queue with new sequence: {[a.name for a in child.action_sequence()]}")
                     
                     # If this was a SOFT_DROP, also evaluate it as a potential final position
                     if action == Action.SOFT_DROP:
                         # Check if the piece would land on the next move down
-                        test_board = next_board.copy()
-                        if not test_board.move_down():  # Piece would land next
-                            # Create a new board for the final state
-                            final_board = next_board.copy()
-                            # Hard drop to place the piece
-                            final_board.hard_drop()
-                            
-                            # Evaluate this final position
-                            info = {
-                                'score': final_board.score,
-                                'lines_cleared': final_board.lines_cleared,
-                                'prev_lines_cleared': current_board.lines_cleared
-                            }
-                            metrics = self._evaluate_position(final_board.grid, info)
-                            score = self._calculate_score(metrics)
-                            
-                            # Add to evaluations
-                            evaluations.append(MoveEvaluation(
-                                action_sequence=action_sequence + [action],
-                                score=score,
-                                metrics=metrics
-                            ))
-                            
+                        if not sim_board.move_down() and sim_board.canonical_key() not in final_keys:
+                            # Record this final position for evaluation
+                            final_keys.add(sim_board.canonical_key())
+                            rows, lines = sim_board.locked_rows()
+                            final_nodes.append(child)
+                            final_placements.append(self._sim_placement(sim_board))
+                            final_rows.append(rows)
+                            final_lines.append(lines)
+
                             if self.debug:
-                                print(f"    Piece would land after SOFT_DROP, added evaluation with score {score}")
+                                print("    Piece would land after SOFT_DROP, added final position")
                 except Exception as e:
                     error_counts[action.name] += 1
                     if self.debug:
                         print(f"    Error executing action {action.name}: {e}")
                     continue
+                finally:
+                    sim_board.rewind(checkpoint)
             
             # Try hard drop to get a final position
             try:
                 if self.debug:
                     print("  Trying HARD_DROP")
                 
-                # Create a copy of the board for the final state
-                final_board = current_board.copy()
-                
-                # Get the state before the hard drop
-                prev_state = final_board.grid.copy()
-                
-                # Execute the hard drop
-                final_board.hard_drop()
-                
-                # If the piece was placed (board changed)
-                if not np.array_equal(final_board.grid, prev_state):
-                    # Evaluate this final position
-                    info = {
-                        'score': final_board.score,
-                        'lines_cleared': final_board.lines_cleared,
-                        'prev_lines_cleared': current_board.lines_cleared
-                    }
-                    metrics = self._evaluate_position(final_board.grid, info)
-                    score = self._calculate_score(metrics)
-                    
-                    # Add to evaluations
-                    evaluations.append(MoveEvaluation(
-                        action_sequence=action_sequence + [Action.HARD_DROP],
-                        score=score,
-                        metrics=metrics
-                    ))
-                    action_counts[Action.HARD_DROP.name] += 1
-                    
-                    if self.debug:
-                        print(f"    Added evaluation with score {score}")
-                else:
+                # Drop the piece as far as it goes and record this final position
+                _ = sim_board.drop()
+                if sim_board.canonical_key() in final_keys:
                     if self.debug:
-                        print("    HARD_DROP didn't change the state, skipping")
+                        print("    Final position already found, skipping")
+                    continue
+                final_keys.add(sim_board.canonical_key())
+                rows, lines = sim_board.locked_rows()
+                final_nodes.append(SearchNode(node, Action.HARD_DROP, sim_board.piece_key()))
+                final_placements.append(self._sim_placement(sim_board))
+                final_rows.append(rows)
+                final_lines.append(lines)
+                action_counts[Action.HARD_DROP.name] += 1
+
+                if self.debug:
+                    print("    Added final position")
             except Exception as e:
                 error_counts[Action.HARD_DROP.name] += 1
                 if self.debug:
                     print(f"    Error executing HARD_DROP: {e}")
+            finally:
+                sim_board.rewind(checkpoint)
+        
+        explored = time.perf_counter()
+        stats.expansion_ms += (explored - hashed) * 1000
+        stats.states_explored += states_explored
+        stats.duplicates_skipped += duplicates
+        stats.errors += sum(error_counts.values())
+        stats.peak_frontier = max(stats.peak_frontier, peak_frontier)
+        stats.candidates += len(final_rows)
         
         if self.debug:
-            print(f"Explored {states_explored} states, found {len(evaluations)} valid final positions")
+            print(f"Explored {states_explored} states, found {len(final_rows)} valid final positions")
             print(f"Action counts during exploration: {action_counts}")
             print(f"Error counts during exploration: {error_counts}")
-        
-        return evaluations
+
+        if not final_rows:
+            return []
+
+        # Unpack the final bitboards and evaluate them in one vectorized pass
+        boards = rows_to_grids(np.array(final_rows, dtype=np.int64), sim_board.cols)
+        features = extract_features(boards, np.array(final_lines))
+        derived = time.perf_counter()
+        scores = self._score_features(features)
+        stats.features_ms += (derived - explored) * 1000
+        stats.scoring_ms += (time.perf_counter() - derived) * 1000
+        for placement, result in zip(final_placements, boards):
+            placement.grid = result
+        return [
+            MoveEvaluation(
+                action_sequence=node.action_sequence(),
+                score=float(score),
+                metrics=features.metrics(i),
+                placement=placement
+            )
+            for i, (node, placement, score) in enumerate(zip(final_nodes, final_placements, scores))
+        ]
     
-    def _hash_board_state(self, board: np.ndarray[tuple[int, ...], np.dtype[np.int8]], current_board: Board | None = None) -> int:
+    def _sim_placement(self, sim_board: SimBoard) -> Placement:
         """
-        Create a hash of the board state including the current piece position and shape.
+        Describe the piece position of a simulation board as a placement.
         
         Args:
-            board: The board grid
-            current_board: The Board object containing the current piece
+            sim_board: Simulation board with the piece at its final position
             
         Returns:
-            Hash value representing the state
-        """
-        # If we have a board object with a current piece, include its position and shape in the hash
-        if current_board and current_board.current_piece:
-            piece = current_board.current_piece
-            # Combine the board state with piece information
-            piece_info = f"{piece.x},{piece.y},{piece.rotation}"
-            return hash(board.tobytes() + piece_info.encode())
-        else:
-            # Fall back to just the board grid
-            return hash(board.tobytes())
+            The placement
+        """
+        piece = sim_board.current_piece
+        return Placement(rotation=piece.rotation, x=piece.x, y=piece.y, shape=piece.shape)
     
     def _evaluate_position(self, 
                            new_board: np.ndarray[tuple[int, ...], np.dtype[np.int8]], 
@@ -306,118 +1179,36 @@ class HeuristicAgent:
         Returns:
             Dictionary of metrics
         """
-        # Count holes (empty cells with filled cells above them)
-        holes = self._count_holes(new_board)
-        
-        # Calculate height and bumpiness
-        bumpiness, heights = self._get_bumpiness_and_heights(new_board)
-        max_height = max(heights) if heights else 0
-        
         # Count lines cleared
         lines_cleared: int = info.get('lines_cleared', 0) - info.get('prev_lines_cleared', 0)
         
-        # Detect wells (columns with adjacent higher columns)
-        well_depth = self._calculate_well_depth(heights)
-        
-        return {
-            'holes': float(holes),
-            'height': float(max_height),
-            'bumpiness': float(bumpiness),
-            'lines_cleared': float(lines_cleared),
-            'well_depth': float(well_depth)
-        }
+        features = extract_features(new_board, np.array([lines_cleared]))
+        return features.metrics(0)
     
-    def _calculate_score(self, metrics: dict[str, float]) -> float:
+    def _score_features(self, features: BoardFeatures) -> NDArray[np.float64]:
         """
-        Calculate the overall score based on metrics and weights.
+        Score a batch of positions with a single features-by-weights product.
         
         Args:
-            metrics: Dictionary of metrics
+            features: Features of the positions to score
             
         Returns:
-            Overall score
+            Array with the overall score of each position
         """
-        return sum(metrics[key] * self.weights[key] for key in self.weights if key in metrics)
+        return features.matrix() @ weight_vector(self.weights)
     
-    def _count_holes(self, board: np.ndarray[tuple[int, ...], np.dtype[np.int8]]) -> int:
+    def _score_states(self, states: list[IncrementalFeatures], extra_lines: int = 0) -> NDArray[np.float64]:
         """
-        Count the number of holes in the board.
-        
-        A hole is an empty cell with at least one filled cell above it.
+        Score a list of incremental feature states with the agent's weights.
         
         Args:
-            board: The board state
+            states: Feature states of the candidate boards
+            extra_lines: Lines cleared earlier on the way to the boards
             
         Returns:
-            Number of holes
-        """
-        holes = 0
-        # For each column
-        for col in range(board.shape[1]):
-            # Find the highest filled cell
-            for row in range(board.shape[0]):
-                if board[row, col] > 0:  # Found a filled cell
-                    # Count empty cells below it
-                    for r in range(row + 1, board.shape[0]):
-                        if board[r, col] == 0:
-                            holes += 1
-                    break
-        return holes
-    
-    def _get_bumpiness_and_heights(self, board: np.ndarray[tuple[int, ...], np.dtype[np.int8]]) -> tuple[float, list[int]]:
+            Array of shape (len(states),) with the scores
         """
-        Calculate the bumpiness and heights of the board.
-        
-        Bumpiness is the sum of absolute differences between adjacent column heights.
-        
-        Args:
-            board: The board state
-            
-        Returns:
-            Tuple of (bumpiness, list of column heights)
-        """
-        heights: list[int] = []
-        # For each column
-        for col in range(board.shape[1]):
-            # Find the highest filled cell
-            for row in range(board.shape[0]):
-                if board[row, col] > 0:
-                    heights.append(board.shape[0] - row)
-                    break
-            else:
-                heights.append(0)  # Empty column
-        
-        # Calculate bumpiness
-        bumpiness = 0
-        for i in range(len(heights) - 1):
-            bumpiness += abs(heights[i] - heights[i + 1])
-        
-        return bumpiness, heights
-    
-    def _calculate_well_depth(self, heights: list[int]) -> float:
-        """
-        Calculate the depth of wells in the board.
-        
-        A well is a column with adjacent columns at least 2 units higher.
-        
-        Args:
-            heights: List of column heights
-            
-        Returns:
-            Total well depth
-        """
-        well_depth = 0
-        for i in range(len(heights)):
-            # Check if this column is a well
-            left_higher = i > 0 and heights[i-1] - heights[i] >= 2
-            right_higher = i < len(heights)-1 and heights[i+1] - heights[i] >= 2
-            
-            if left_higher and right_higher:
-                # Deep well (both sides higher)
-                well_depth += min(heights[i-1], heights[i+1]) - heights[i]
-            elif left_higher:
-                well_depth += heights[i-1] - heights[i]
-            elif right_higher:
-                well_depth += heights[i+1] - heights[i]
-        
-        return well_depth 
\ No newline at end of file
+        matrix = np.array([state.vector() for state in states], dtype=np.float64)
+        if extra_lines:
+            matrix[:, FEATURE_NAMES.index('lines_cleared')] += extra_lines
+        return matrix @ weight_vector(self.weights)
@@ -0,0 +1,162 @@
+"""
+Streaming columnar recorder for the per-step metrics of test episodes.
+
+Instead of one dict per step that is kept until the episode ends, every
+field is a column in a preallocated typed array. When the arrays are full
+they are appended to one raw binary file per column and reused, so memory
+stays bounded however long the run is. A small manifest describes the
+columns, and load_metrics() memory-maps them for analysis:
+
+    columns = load_metrics("agent_test_results/run/episode_0000")
+    columns['decision_time_ms'].mean()
+"""
+import os
+import json
+import numpy as np
+from numpy.typing import NDArray
+
+from tetris.environment.tetris_env import Action
+
+MANIFEST_FILE = "manifest.json"
+
+# Columns every step has, with their types; agent metrics are added as
+# float32 columns the first time they appear
+FIXED_COLUMNS: dict[str, str] = {
+    'step': 'int32',
+    'action': 'int8',  # Action value, see the manifest's 'actions' for the names
+    'reward': 'float32',
+    'score': 'int32',
+    'lines_cleared': 'int32',
+    'decision_time_ms': 'float32',
+}
+METRIC_DTYPE = 'float32'
+
+
+class MetricsRecorder:
+    """
+    Per-step metrics of one episode, streamed to a directory of column files.
+
+    A step holds the same fields as an entry of EpisodeResult['metrics_history']:
+    the fixed columns followed by the agent's metrics, where a metric with the
+    name of a fixed column takes its place.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 1024):
+        """
+        Create an empty recording, replacing any earlier one in the directory.
+
+        Args:
+            path: Directory the column files are written to
+            chunk_size: Number of steps buffered before they are written out
+        """
+        if chunk_size < 1:
+            raise ValueError(f"Recorder needs a chunk size of at least 1, got {chunk_size}")
+        self.path: str = path
+        self.chunk_size: int = chunk_size
+        self.rows: int = 0  # Steps written to the column files
+        self.buffered: int = 0  # Steps waiting in the buffers
+        self.columns: dict[str, NDArray] = {}
+        self.dtypes: dict[str, str] = {}
+
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            if name.endswith('.bin') or name == MANIFEST_FILE:
+                os.remove(os.path.join(path, name))
+        for name, dtype in FIXED_COLUMNS.items():
+            self._add_column(name, dtype)
+
+    def __len__(self) -> int:
+        return self.rows + self.buffered
+
+    def _add_column(self, name: str, dtype: str) -> None:
+        """Start a column, filling the steps recorded before it with NaN (or 0 for ints)."""
+        self.dtypes[name] = dtype
+        fill = np.nan if np.dtype(dtype).kind == 'f' else 0
+        self.columns[name] = np.full(self.chunk_size, fill, dtype=dtype)
+        if self.rows:
+            np.full(self.rows, fill, dtype=dtype).tofile(self._column_file(name))
+
+    def _column_file(self, name: str) -> str:
+        """Path of the binary file of a column."""
+        return os.path.join(self.path, f"{name}.bin")
+
+    def record(self, step: int, action: Action, reward: float, score: int, lines_cleared: int,
+               decision_time_ms: float, metrics: dict[str, float]) -> None:
+        """
+        Record one step.
+
+        Args:
+            step: Number of the step in the episode
+            action: Action taken
+            reward: Reward received for the action
+            score: Score after the action
+            lines_cleared: Lines cleared in the episode after the action
+            decision_time_ms: Time the agent took to choose the action
+            metrics: The agent's metrics of the chosen move
+        """
+        i = self.buffered
+        columns = self.columns
+        columns['step'][i] = step
+        columns['action'][i] = action.value
+        columns['reward'][i] = reward
+        columns['score'][i] = score
+        columns['lines_cleared'][i] = lines_cleared
+        columns['decision_time_ms'][i] = decision_time_ms
+        for name, value in metrics.items():
+            if name not in columns:
+                self._add_column(name, METRIC_DTYPE)
+            columns[name][i] = value
+
+        self.buffered += 1
+        if self.buffered == self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Append the buffered steps to the column files and update the manifest."""
+        count = self.buffered
+        for name, column in self.columns.items():
+            with open(self._column_file(name), 'ab') as f:
+                column[:count].tofile(f)
+            # Metrics missing from a step read as NaN rather than a stale value
+            if np.dtype(self.dtypes[name]).kind == 'f' and name not in FIXED_COLUMNS:
+                column.fill(np.nan)
+        self.rows += count
+        self.buffered = 0
+
+        manifest = {
+            'rows': self.rows,
+            'columns': self.dtypes,
+            'actions': {action.value: action.name for action in Action},
+        }
+        with open(os.path.join(self.path, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+    def close(self) -> None:
+        """Write out the remaining steps."""
+        self.flush()
+
+
+def load_metrics(path: str) -> dict[str, NDArray]:
+    """
+    Memory-map the columns of a recording.
+
+    Only the steps listed in the manifest are mapped, so a recording that is
+    still being written can be read as well.
+
+    Args:
+        path: Directory of the recording
+
+    Returns:
+        Read-only array per column, one entry per step
+    """
+    with open(os.path.join(path, MANIFEST_FILE), 'r') as f:
+        manifest = json.load(f)
+
+    rows = manifest['rows']
+    columns: dict[str, NDArray] = {}
+    for name, dtype in manifest['columns'].items():
+        if rows == 0:
+            columns[name] = np.empty(0, dtype=dtype)
+        else:
+            columns[name] = np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype, mode='r', shape=(rows,))
+    return columns
@@ -0,0 +1,242 @@
+"""
+Cross-entropy weight optimizer for the heuristic-based Tetris agent.
+
+Each generation samples a population of weight vectors from a Gaussian,
+plays every candidate headless on a process pool (see run_weight_tests in
+test_heuristic_agent.py) and refits the Gaussian to the best fraction of
+the population. All candidates play the same seeded episodes, so they are
+compared on the same piece sequences.
+
+The optimizer state, including the random generator, is written to a
+checkpoint after every generation. Running the script again with --resume
+continues from the last finished generation, so a tuning job can be stopped
+and restarted at any time.
+"""
+import sys
+import os
+import argparse
+from argparse import Namespace
+import json
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Any
+import numpy as np
+
+# Add the parent directory to the Python path
+sys.path.append('..')
+
+from examples.heuristic_agent import SEARCH_MODES
+from examples.test_heuristic_agent import RESULTS_DIR, run_weight_tests
+
+# Weights the optimizer tunes, in the order of the sampled vectors
+WEIGHT_NAMES: tuple[str, ...] = ('holes', 'height', 'bumpiness', 'lines_cleared', 'well_depth')
+
+# Starting mean of the search distribution, the agent's default weights
+INITIAL_WEIGHTS: dict[str, float] = {
+    'holes': -4.0,
+    'height': -0.5,
+    'bumpiness': -1.0,
+    'lines_cleared': 3.0,
+    'well_depth': 0.5,
+}
+
+# Aggregated result the optimizer maximizes
+OBJECTIVES: tuple[str, ...] = ('avg_score', 'avg_lines', 'avg_steps')
+
+
+@dataclass
+class OptimizerState:
+    """Everything needed to continue an optimization run."""
+    mean: list[float]
+    std: list[float]
+    generation: int = 0
+    best_weights: dict[str, float] | None = None
+    best_fitness: float = float('-inf')
+    rng_state: dict[str, Any] | None = None  # State of the sampling generator's bit generator
+    history: list[dict[str, Any]] = field(default_factory=list)
+
+
+def vector_to_weights(vector: np.ndarray) -> dict[str, float]:
+    """Turn a sampled vector into a weights dictionary."""
+    return {name: float(value) for name, value in zip(WEIGHT_NAMES, vector.tolist())}
+
+
+def save_checkpoint(state: OptimizerState, path: str) -> None:
+    """
+    Write the optimizer state to a checkpoint file.
+
+    The state is written to a temporary file first and then moved into place,
+    so an interrupted write never leaves a broken checkpoint behind.
+
+    Args:
+        state: State to save
+        path: Path of the checkpoint file
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w') as f:
+        json.dump(asdict(state), f, indent=2)
+    os.replace(temporary, path)
+
+
+def load_checkpoint(path: str) -> OptimizerState:
+    """
+    Read the optimizer state from a checkpoint file.
+
+    Args:
+        path: Path of the checkpoint file
+
+    Returns:
+        The saved state
+    """
+    with open(path, 'r') as f:
+        return OptimizerState(**json.load(f))
+
+
+def optimize_weights(state: OptimizerState,
+                     generations: int,
+                     population: int = 16,
+                     elite_fraction: float = 0.25,
+                     min_std: float = 0.05,
+                     objective: str = 'avg_score',
+                     episodes: int = 2,
+                     max_steps: int | None = 2000,
+                     seed: int = 0,
+                     workers: int | None = None,
+                     agent_options: dict[str, Any] | None = None,
+                     checkpoint: str | None = None) -> OptimizerState:
+    """
+    Run the cross-entropy method until the state has reached a generation count.
+
+    Args:
+        state: State to continue from (a fresh or a loaded one)
+        generations: Generation count to stop at
+        population: Number of weight vectors evaluated per generation
+        elite_fraction: Fraction of the population the distribution is refitted to
+        min_std: Lower limit of the standard deviation, so the search keeps exploring
+        objective: Aggregated result to maximize, one of OBJECTIVES
+        episodes: Number of episodes per candidate
+        max_steps: Step limit per episode, or None to play until game over
+        seed: Base seed of the episodes; every candidate plays the same ones
+        workers: Number of worker processes (None for one per CPU)
+        agent_options: Further HeuristicAgent arguments
+        checkpoint: Path the state is saved to after every generation, or None
+
+    Returns:
+        The state after the last generation
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective {objective!r}, expected one of {OBJECTIVES}")
+    elites = max(1, int(round(population * elite_fraction)))
+
+    rng = np.random.default_rng(seed)
+    if state.rng_state is not None:
+        rng.bit_generator.state = state.rng_state
+
+    while state.generation < generations:
+        mean, std = np.array(state.mean), np.array(state.std)
+        samples = rng.normal(mean, std, size=(population, len(WEIGHT_NAMES)))
+        samples[0] = mean  # Always evaluate the current mean as well
+        weight_sets = [vector_to_weights(sample) for sample in samples]
+
+        results = run_weight_tests(weight_sets, episodes=episodes, workers=workers, seed=seed,
+                                   agent_options=agent_options, max_steps=max_steps)
+        fitness = np.array([result[objective] for result in results])
+
+        # Refit the distribution to the elite candidates
+        order = np.argsort(-fitness, kind='stable')
+        elite_samples = samples[order[:elites]]
+        state.mean = elite_samples.mean(axis=0).tolist()
+        state.std = np.maximum(elite_samples.std(axis=0), min_std).tolist()
+
+        best = int(order[0])
+        if fitness[best] > state.best_fitness:
+            state.best_fitness = float(fitness[best])
+            state.best_weights = weight_sets[best]
+
+        state.generation += 1
+        state.rng_state = rng.bit_generator.state
+        state.history.append({
+            'generation': state.generation,
+            'best_fitness': float(fitness[best]),
+            'mean_fitness': float(fitness.mean()),
+            'best_weights': weight_sets[best],
+            'mean': state.mean,
+            'std': state.std,
+        })
+        if checkpoint:
+            save_checkpoint(state, checkpoint)
+
+        print(f"Generation {state.generation}/{generations}: "
+              f"best {objective} {fitness[best]:.1f}, mean {fitness.mean():.1f}, "
+              f"best so far {state.best_fitness:.1f}")
+
+    return state
+
+
+def main():
+    """Main function to run the weight optimizer."""
+    parser = argparse.ArgumentParser(description='Optimize the heuristic weights with the cross-entropy method')
+    _ = parser.add_argument('--generations', type=int, default=20, help='Number of generations to run')
+    _ = parser.add_argument('--population', type=int, default=16, help='Weight vectors evaluated per generation')
+    _ = parser.add_argument('--elite-fraction', type=float, default=0.25,
+                            help='Fraction of the population the distribution is refitted to')
+    _ = parser.add_argument('--initial-std', type=float, default=1.0,
+                            help='Starting standard deviation of every weight')
+    _ = parser.add_argument('--min-std', type=float, default=0.05, help='Lower limit of the standard deviation')
+    _ = parser.add_argument('--objective', type=str, default='avg_score', choices=OBJECTIVES,
+                            help='Aggregated result to maximize')
+    _ = parser.add_argument('--episodes', type=int, default=2, help='Number of episodes per candidate')
+    _ = parser.add_argument('--max-steps', type=int, default=2000,
+                            help='Step limit per episode (0 to play until game over)')
+    _ = parser.add_argument('--seed', type=int, default=0,
+                            help='Seed of the sampling and base seed of the episodes')
+    _ = parser.add_argument('--workers', type=int, default=None,
+                            help='Number of worker processes (default: one per CPU)')
+    _ = parser.add_argument('--search-mode', type=str, default='placement', choices=SEARCH_MODES,
+                            help='How the agent finds final positions')
+    _ = parser.add_argument('--lookahead', action='store_true', help='Also score the best placement of the next piece')
+    _ = parser.add_argument('--beam-width', type=int, default=5, help='Number of placements expanded by the lookahead')
+    _ = parser.add_argument('--checkpoint', type=str, default=os.path.join(RESULTS_DIR, 'weight_optimizer.json'),
+                            help='Path of the checkpoint file')
+    _ = parser.add_argument('--resume', action='store_true', help='Continue from the checkpoint file if it exists')
+
+    args: Namespace = parser.parse_args()
+
+    if args.resume and os.path.exists(args.checkpoint):
+        state = load_checkpoint(args.checkpoint)
+        print(f"Resuming from generation {state.generation} of {args.checkpoint}")
+    else:
+        state = OptimizerState(
+            mean=[INITIAL_WEIGHTS[name] for name in WEIGHT_NAMES],
+            std=[args.initial_std] * len(WEIGHT_NAMES)
+        )
+
+    started = datetime.now()
+    state = optimize_weights(
+        state,
+        generations=args.generations,
+        population=args.population,
+        elite_fraction=args.elite_fraction,
+        min_std=args.min_std,
+        objective=args.objective,
+        episodes=args.episodes,
+        max_steps=args.max_steps or None,
+        seed=args.seed,
+        workers=args.workers,
+        agent_options=dict(search_mode=args.search_mode, lookahead=args.lookahead, beam_width=args.beam_width),
+        checkpoint=args.checkpoint
+    )
+
+    print(f"\nFinished after {datetime.now() - started}")
+    print(f"Best {args.objective}: {state.best_fitness:.1f}")
+    print("Best weights:")
+    for name, value in (state.best_weights or {}).items():
+        print(f"  {name}: {value:.3f}")
+    print(f"\nState saved to {args.checkpoint}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+Analytic placement enumeration for the heuristic Tetris agent.
+
+Instead of searching over action sequences, every distinct (rotation, column)
+drop of the current piece is computed directly from the piece's shape matrices
+and the column heights of the board. Only the placement that wins the
+evaluation needs an action sequence, which a cheap path finder builds and
+verifies on a copy of the board.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+from numpy.typing import NDArray
+
+from tetris.environment.tetris_env import Action
+from tetris.engine.board import Board
+
+from examples.board_features import clear_full_lines
+
+# Rotation actions used to reach each number of clockwise quarter turns
+ROTATION_ACTIONS: tuple[tuple[Action, ...], ...] = (
+    (),
+    (Action.ROTATE_CW,),
+    (Action.ROTATE_CW, Action.ROTATE_CW),
+    (Action.ROTATE_CCW,),
+)
+
+# Rotations ordered by the number of actions needed to reach them
+ROTATION_ORDER: tuple[int, ...] = (0, 1, 3, 2)
+
+
+@dataclass
+class Placement:
+    """A final resting position of the current piece."""
+    rotation: int  # Clockwise quarter turns from the piece's current orientation
+    x: int  # Board column of the shape matrix's left edge
+    y: int  # Board row of the shape matrix's top edge after the drop
+    shape: NDArray[np.int8]  # Shape matrix in this orientation
+    grid: NDArray[np.int8] | None = None  # Resulting board after line clears
+    cells: list[tuple[int, int]] | None = None  # Filled (row, column) cells of the shape matrix
+
+
+def piece_orientations(shape: NDArray[np.int8]) -> list[NDArray[np.int8]]:
+    """
+    Get the shape matrix of a piece after 0 to 3 clockwise quarter turns.
+
+    Args:
+        shape: Shape matrix of the piece in its current orientation
+
+    Returns:
+        List of four shape matrices, indexed by the number of turns
+    """
+    return [np.ascontiguousarray(np.rot90(shape, -turns)) for turns in range(4)]
+
+
+@dataclass(frozen=True)
+class Orientation:
+    """A distinct orientation of a piece, with the data needed to drop it."""
+    rotation: int  # Clockwise quarter turns from the piece's current orientation
+    shape: NDArray[np.int8]  # Shape matrix in this orientation
+    cells: list[tuple[int, int]]  # Filled (row, column) cells of the shape matrix
+    columns: NDArray[np.int64]  # Shape columns that hold a filled cell
+    top: int  # Topmost shape row that holds a filled cell
+    bottom: NDArray[np.int64]  # Lowest filled row of each column in columns
+
+
+@dataclass(frozen=True)
+class PieceSymmetry:
+    """The distinct orientations of a piece and how its other rotations map onto them."""
+    orientations: list[Orientation]  # Distinct orientations, by rotation
+    # Per rotation: (distinct rotation, dx, dy) such that the piece at (x, y) in
+    # that rotation covers the same cells as the distinct one at (x + dx, y + dy)
+    canonical: tuple[tuple[int, int, int], ...]
+
+
+# Symmetry of every shape seen so far, keyed by the shape's size and filled cells
+_SYMMETRY_CACHE: dict[tuple[tuple[int, ...], bytes], PieceSymmetry] = {}
+
+
+def piece_symmetry(shape: NDArray[np.int8]) -> PieceSymmetry:
+    """
+    Work out which rotations of a piece are distinct, once per shape.
+
+    The O piece looks the same in every rotation and I, S and Z only have
+    two distinct orientations. Rotations whose filled cells match a cheaper
+    rotation up to a shift are mapped onto it, so their drops are not
+    enumerated or searched twice.
+
+    Args:
+        shape: Shape matrix of the piece in its current orientation
+
+    Returns:
+        The piece's symmetry, shared between calls
+    """
+    key = (shape.shape, (shape > 0).tobytes())
+    symmetry = _SYMMETRY_CACHE.get(key)
+    if symmetry is not None:
+        return symmetry
+
+    shapes = piece_orientations(shape)
+    orientations: list[Orientation] = []
+    canonical: dict[int, tuple[int, int, int]] = {}
+    for rotation in ROTATION_ORDER:
+        oriented = shapes[rotation]
+        filled = oriented > 0
+        columns = np.flatnonzero(filled.any(axis=0))
+        top = int(np.flatnonzero(filled.any(axis=1))[0])
+        trimmed = _trim(oriented)
+        for orientation in orientations:
+            if np.array_equal(trimmed, _trim(orientation.shape)):
+                canonical[rotation] = (
+                    orientation.rotation,
+                    int(columns[0] - orientation.columns[0]),
+                    top - orientation.top
+                )
+                break
+        else:
+            canonical[rotation] = (rotation, 0, 0)
+            orientations.append(Orientation(
+                rotation=rotation,
+                shape=oriented,
+                cells=list(zip(*(index.tolist() for index in np.nonzero(filled)))),
+                columns=columns,
+                top=top,
+                # Lowest filled cell of every occupied shape column
+                bottom=filled.shape[0] - 1 - np.argmax(filled[::-1, columns], axis=0)
+            ))
+
+    symmetry = _SYMMETRY_CACHE[key] = PieceSymmetry(
+        orientations=sorted(orientations, key=lambda orientation: orientation.rotation),
+        canonical=tuple(canonical[rotation] for rotation in range(4))
+    )
+    return symmetry
+
+
+def _trim(shape: NDArray[np.int8]) -> NDArray[np.bool_]:
+    """Cut the empty rows and columns around the filled cells of a shape."""
+    filled = shape > 0
+    rows = np.flatnonzero(filled.any(axis=1))
+    cols = np.flatnonzero(filled.any(axis=0))
+    return filled[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+
+
+def _left_edge(shape: NDArray[np.int8]) -> int:
+    """Index of the leftmost column of a shape that holds a filled cell."""
+    return int(np.flatnonzero((shape > 0).any(axis=0))[0])
+
+
+def list_placements(heights: NDArray[np.int64] | list[int], rows: int,
+                    shape: NDArray[np.int8]) -> list[Placement]:
+    """
+    List every distinct (rotation, column) drop of a piece onto a board.
+
+    The landing row of each drop follows from the column heights and the
+    bottom profile of the shape, so no moves have to be simulated and the
+    grid itself is not needed. Rotations that look like a cheaper one are
+    skipped, see piece_symmetry().
+
+    Args:
+        heights: Column heights of the board
+        rows: Number of rows of the board
+        shape: Shape matrix of the piece in its current orientation
+
+    Returns:
+        List of placements, without resulting grids
+    """
+    # First empty row above each column's surface, counted from the top
+    surface = rows - np.asarray(heights)
+    cols = len(surface)
+
+    placements: list[Placement] = []
+    for orientation in piece_symmetry(shape).orientations:
+        columns = orientation.columns
+        xs = np.arange(-columns[0], cols - columns[-1])
+        # The piece stops as soon as any of its columns meets the surface
+        landing = np.min(surface[xs[:, np.newaxis] + columns] - 1 - orientation.bottom, axis=1)
+        for x, y in zip(xs.tolist(), landing.tolist()):
+            if y + orientation.top >= 0:
+                placements.append(Placement(
+                    rotation=orientation.rotation, x=x, y=y, shape=orientation.shape, cells=orientation.cells
+                ))
+    return placements
+
+
+def drop_placement(heights: NDArray[np.int64] | list[int], rows: int, shape: NDArray[np.int8],
+                   rotation: int, x: int) -> Placement | None:
+    """
+    Get the drop of a piece in one rotation and column, as listed by list_placements().
+
+    Args:
+        heights: Column heights of the board
+        rows: Number of rows of the board
+        shape: Shape matrix of the piece in its current orientation
+        rotation: Clockwise quarter turns of the drop; must be one of the
+            distinct rotations of piece_symmetry()
+        x: Board column of the shape matrix's left edge
+
+    Returns:
+        The placement, or None if the piece does not fit there
+    """
+    surface = rows - np.asarray(heights)
+    for orientation in piece_symmetry(shape).orientations:
+        if orientation.rotation != rotation:
+            continue
+        columns = orientation.columns + x
+        if columns[0] < 0 or columns[-1] >= len(surface):
+            return None
+        y = int(np.min(surface[columns] - 1 - orientation.bottom))
+        if y + orientation.top < 0:
+            return None
+        return Placement(rotation=rotation, x=x, y=y, shape=orientation.shape, cells=orientation.cells)
+    return None
+
+
+def place_pieces(grid: NDArray[np.int8],
+                 placements: list[Placement]) -> tuple[NDArray[np.int8], NDArray[np.int64]]:
+    """
+    Lock each placement into its own copy of the grid and clear full lines.
+
+    The resulting board is also stored on each placement.
+
+    Args:
+        grid: The board grid, without the falling piece
+        placements: Final positions of the piece
+
+    Returns:
+        Tuple of (stack of resulting boards, number of lines cleared by each placement)
+    """
+    return place_pieces_on(np.repeat(grid[np.newaxis], len(placements), axis=0), placements)
+
+
+def place_pieces_on(boards: NDArray[np.int8],
+                    placements: list[Placement]) -> tuple[NDArray[np.int8], NDArray[np.int64]]:
+    """
+    Lock each placement into its own board of a stack and clear full lines.
+
+    Unlike place_pieces(), the placements may belong to different boards, so
+    the candidates of many games are built in one pass. The stack is
+    modified in place; the resulting board is also stored on each placement.
+
+    Args:
+        boards: Stack of boards without the falling pieces, one per placement,
+            with shape (len(placements), rows, cols)
+        placements: Final positions of the pieces
+
+    Returns:
+        Tuple of (stack of resulting boards, number of lines cleared by each placement)
+    """
+    if not placements:
+        return np.empty((0, *boards.shape[1:]), dtype=boards.dtype), np.empty(0, dtype=np.int64)
+
+    # Gather the cells of all pieces and write them with one indexed assignment
+    board_index: list[int] = []
+    row_index: list[int] = []
+    col_index: list[int] = []
+    values: list[int] = []
+    for i, placement in enumerate(placements):
+        cells = placement.cells
+        if cells is None:
+            cells = list(zip(*(index.tolist() for index in np.nonzero(placement.shape))))
+        value = int(placement.shape[cells[0]])
+        for r, c in cells:
+            board_index.append(i)
+            row_index.append(placement.y + r)
+            col_index.append(placement.x + c)
+            values.append(value)
+    boards[board_index, row_index, col_index] = values
+    boards, lines = clear_full_lines(boards)
+    for placement, result in zip(placements, boards):
+        placement.grid = result
+    return boards, lines
+
+
+def find_action_path(board: Board, placement: Placement) -> list[Action] | None:
+    """
+    Build the action sequence that moves the current piece into a placement.
+
+    The piece is rotated first, then shifted sideways and hard dropped. Every
+    step is replayed on a copy of the board, so the path is only returned if
+    the board accepts it and the drop produces the placement's grid.
+
+    Args:
+        board: The board with the current piece
+        placement: The placement to reach
+
+    Returns:
+        List of actions ending with HARD_DROP, or None if the placement cannot
+        be reached this way
+    """
+    sim_board = board.copy()
+    actions: list[Action] = []
+
+    for action in ROTATION_ACTIONS[placement.rotation]:
+        if not sim_board.rotate(clockwise=action == Action.ROTATE_CW):
+            return None
+        actions.append(action)
+
+    piece = sim_board.current_piece
+    if piece is None or not np.array_equal(_trim(piece.shape), _trim(placement.shape)):
+        return None
+
+    # Line up the leftmost filled columns rather than the matrix origins, so
+    # a board that re-centres pieces on rotation is still handled
+    offset = (placement.x + _left_edge(placement.shape)) - (piece.x + _left_edge(piece.shape))
+    move, action = (sim_board.move_right, Action.RIGHT) if offset > 0 else (sim_board.move_left, Action.LEFT)
+    for _ in range(abs(offset)):
+        if not move():
+            return None
+        actions.append(action)
+
+    _ = sim_board.hard_drop()
+    actions.append(Action.HARD_DROP)
+
+    if placement.grid is not None and not np.array_equal(sim_board.grid > 0, placement.grid > 0):
+        return None
+    return actions
@@ -0,0 +1,205 @@
+"""
+Successive-halving race between heuristic weight candidates.
+
+Every candidate first plays a few episodes. The worst fraction is dropped,
+the survivors' episode budget is doubled and the race repeats until one
+candidate is left or the budget limit is reached. A candidate's episodes
+are never replayed: a round only plays the episodes the survivors have not
+played yet, and all candidates play the same seeded episodes, so their
+averages are always comparable. Most of the compute goes to the candidates
+that are still in the race, which makes it practical to screen hundreds of
+weight sets.
+"""
+import sys
+import os
+import argparse
+from argparse import Namespace
+import json
+from datetime import datetime
+from typing import Any, TypedDict
+import numpy as np
+
+# Add the parent directory to the Python path
+sys.path.append('..')
+
+from examples.heuristic_agent import SEARCH_MODES
+from examples.test_heuristic_agent import RESULTS_DIR, run_weight_tests
+from examples.optimize_weights import WEIGHT_NAMES, INITIAL_WEIGHTS
+
+# Episode result the race ranks candidates by
+OBJECTIVES: tuple[str, ...] = ('score', 'lines_cleared', 'steps')
+
+
+class CandidateRecord(TypedDict):
+    index: int  # Position of the candidate in the list of weight sets
+    weights: dict[str, float]
+    episodes: int  # Episodes played so far
+    fitness: float  # Mean objective over those episodes
+
+
+class RaceRound(TypedDict):
+    round: int
+    episodes: int  # Episode budget of each candidate in this round
+    candidates: list[CandidateRecord]  # Candidates that played this round, best first
+    eliminated: list[int]  # Indices of the candidates dropped after this round
+
+
+def sample_candidates(count: int, spread: float, seed: int = 0) -> list[dict[str, float]]:
+    """
+    Draw weight sets around the agent's default weights.
+
+    Args:
+        count: Number of weight sets
+        spread: Standard deviation of the normal noise added to every weight
+        seed: Seed of the sampling
+
+    Returns:
+        The default weights followed by count - 1 random weight sets
+    """
+    rng = np.random.default_rng(seed)
+    mean = np.array([INITIAL_WEIGHTS[name] for name in WEIGHT_NAMES])
+    samples = rng.normal(mean, spread, size=(count, len(WEIGHT_NAMES)))
+    samples[0] = mean
+    return [{name: float(value) for name, value in zip(WEIGHT_NAMES, sample.tolist())} for sample in samples]
+
+
+def race_weights(weight_sets: list[dict[str, float]],
+                 initial_episodes: int = 1,
+                 keep_fraction: float = 0.5,
+                 max_episodes: int = 16,
+                 objective: str = 'score',
+                 max_steps: int | None = 2000,
+                 seed: int = 0,
+                 workers: int | None = None,
+                 agent_options: dict[str, Any] | None = None,
+                 cache: bool = False) -> list[RaceRound]:
+    """
+    Race weight candidates by successive halving.
+
+    Args:
+        weight_sets: Weight candidates
+        initial_episodes: Episodes every candidate plays in the first round
+        keep_fraction: Fraction of the candidates that survive a round
+        max_episodes: Episode budget after which the race stops
+        objective: Episode result to maximize, one of OBJECTIVES
+        max_steps: Step limit per episode, or None to play until game over
+        seed: Base seed; episode i of every candidate is played with seed + i
+        workers: Number of worker processes (None for one per CPU)
+        agent_options: Further HeuristicAgent arguments
+        cache: Whether to reuse episodes from the episode cache of the test harness
+
+    Returns:
+        The rounds of the race; the first candidate of the last round is the winner
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective {objective!r}, expected one of {OBJECTIVES}")
+    if not 0 < keep_fraction < 1:
+        raise ValueError(f"Keep fraction must be between 0 and 1, got {keep_fraction}")
+
+    # Objective of every episode each candidate has played, in episode order
+    outcomes: list[list[float]] = [[] for _ in weight_sets]
+    alive = list(range(len(weight_sets)))
+    rounds: list[RaceRound] = []
+    budget = initial_episodes
+
+    while True:
+        played = len(outcomes[alive[0]])
+        results = run_weight_tests([weight_sets[i] for i in alive], episodes=budget - played,
+                                   workers=workers, seed=seed + played,
+                                   agent_options=agent_options, max_steps=max_steps, cache=cache)
+        for i, result in zip(alive, results):
+            outcomes[i].extend(float(episode[objective]) for episode in result['episode_results'])
+
+        # Stable sort, so ties keep the order of the weight sets
+        ranked = sorted(alive, key=lambda i: -float(np.mean(outcomes[i])))
+        survivors = max(1, int(len(ranked) * keep_fraction))
+        finished = len(ranked) == 1 or budget >= max_episodes
+        eliminated = [] if finished else ranked[survivors:]
+
+        rounds.append(RaceRound(
+            round=len(rounds) + 1,
+            episodes=budget,
+            candidates=[
+                CandidateRecord(index=i, weights=weight_sets[i], episodes=budget, fitness=float(np.mean(outcomes[i])))
+                for i in ranked
+            ],
+            eliminated=eliminated
+        ))
+        print(f"Round {len(rounds)}: {len(ranked)} candidates, {budget} episodes each, "
+              f"best mean {objective} {np.mean(outcomes[ranked[0]]):.1f}")
+
+        if finished:
+            return rounds
+        alive = sorted(ranked[:survivors])
+        budget = min(budget * 2, max_episodes)
+
+
+def main():
+    """Main function to run a weight race."""
+    parser = argparse.ArgumentParser(description='Screen heuristic weight candidates by successive halving')
+    _ = parser.add_argument('--weights-file', type=str, default=None,
+                            help='JSON file with a list of weight dictionaries to race')
+    _ = parser.add_argument('--candidates', type=int, default=64,
+                            help='Number of random candidates to race when no weights file is given')
+    _ = parser.add_argument('--spread', type=float, default=1.0,
+                            help='Standard deviation of the random candidates around the default weights')
+    _ = parser.add_argument('--initial-episodes', type=int, default=1,
+                            help='Episodes every candidate plays in the first round')
+    _ = parser.add_argument('--keep-fraction', type=float, default=0.5,
+                            help='Fraction of the candidates that survive a round')
+    _ = parser.add_argument('--max-episodes', type=int, default=16,
+                            help='Episode budget after which the race stops')
+    _ = parser.add_argument('--objective', type=str, default='score', choices=OBJECTIVES,
+                            help='Episode result to maximize')
+    _ = parser.add_argument('--max-steps', type=int, default=2000,
+                            help='Step limit per episode (0 to play until game over)')
+    _ = parser.add_argument('--seed', type=int, default=0,
+                            help='Seed of the random candidates and base seed of the episodes')
+    _ = parser.add_argument('--workers', type=int, default=None,
+                            help='Number of worker processes (default: one per CPU)')
+    _ = parser.add_argument('--search-mode', type=str, default='placement', choices=SEARCH_MODES,
+                            help='How the agent finds final positions')
+    _ = parser.add_argument('--lookahead', action='store_true', help='Also score the best placement of the next piece')
+    _ = parser.add_argument('--beam-width', type=int, default=5, help='Number of placements expanded by the lookahead')
+    _ = parser.add_argument('--test-name', type=str, default='weight_race', help='Name for the race')
+    _ = parser.add_argument('--cache', action='store_true',
+                            help='Reuse episodes played before with the same weights, options and agent code')
+
+    args: Namespace = parser.parse_args()
+
+    if args.weights_file:
+        with open(args.weights_file, 'r') as f:
+            weight_sets: list[dict[str, float]] = json.load(f)
+    else:
+        weight_sets = sample_candidates(args.candidates, args.spread, args.seed)
+
+    rounds = race_weights(
+        weight_sets,
+        initial_episodes=args.initial_episodes,
+        keep_fraction=args.keep_fraction,
+        max_episodes=args.max_episodes,
+        objective=args.objective,
+        max_steps=args.max_steps or None,
+        seed=args.seed,
+        workers=args.workers,
+        agent_options=dict(search_mode=args.search_mode, lookahead=args.lookahead, beam_width=args.beam_width),
+        cache=args.cache
+    )
+
+    winner = rounds[-1]['candidates'][0]
+    print(f"\nWinner: candidate {winner['index']} with mean {args.objective} {winner['fitness']:.1f} "
+          f"over {winner['episodes']} episodes")
+    for name, value in winner['weights'].items():
+        print(f"  {name}: {value:.3f}")
+
+    # Save the full elimination history
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filepath = os.path.join(RESULTS_DIR, f"{args.test_name}_{timestamp}.json")
+    with open(filepath, 'w') as f:
+        json.dump({'objective': args.objective, 'seed': args.seed, 'rounds': rounds}, f, indent=2)
+    print(f"\nRace history saved to {filepath}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Content-addressed store of episode results for the agent test harness.
+
+A seeded episode is fully determined by the agent's weights and options,
+the seed, the environment variant, the step limit, the agent's and the
+harness's code and the version of the Tetris engine, so its result can be
+reused instead of playing it again. Episodes searched within a deadline
+depend on timing as well and are never cached. Every result is stored
+under the SHA-256 of those inputs, and an append-only JSON Lines index maps
+the keys to their files with a few fields for browsing. The index is read
+once when the cache is opened, so lookups stay O(1) with thousands of
+results.
+"""
+import os
+import json
+import hashlib
+from importlib.metadata import version, PackageNotFoundError
+from datetime import datetime
+from typing import Any
+
+import tetris
+
+import examples.heuristic_agent
+import examples.board_features
+import examples.placement
+import examples.sim_board
+import examples.transposition_table
+
+INDEX_FILE = "index.jsonl"
+
+# Modules whose code decides how the agent plays
+AGENT_MODULES = (
+    examples.heuristic_agent,
+    examples.board_features,
+    examples.placement,
+    examples.sim_board,
+    examples.transposition_table,
+)
+
+# Harness that plays the episodes; hashed by path, since it imports this module
+HARNESS_FILES = (
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_heuristic_agent.py'),
+)
+
+_agent_hash: str | None = None
+
+
+def agent_code_hash() -> str:
+    """
+    Hash the source code of the agent's modules and the harness, once per process.
+
+    Returns:
+        Hex SHA-256 of the source files
+    """
+    global _agent_hash
+    if _agent_hash is None:
+        digest = hashlib.sha256()
+        for path in [module.__file__ for module in AGENT_MODULES] + list(HARNESS_FILES):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        _agent_hash = digest.hexdigest()
+    return _agent_hash
+
+
+def engine_version() -> str | None:
+    """
+    Get the version of the installed Tetris engine.
+
+    Returns:
+        Version of the tetris distribution, or the package's __version__ if
+        it is not installed as a distribution, or None if neither is known
+    """
+    try:
+        return version('tetris')
+    except PackageNotFoundError:
+        return getattr(tetris, '__version__', None)
+
+
+def episode_key(weights: dict[str, float], seed: int, use_custom_env: bool,
+                agent_options: dict[str, Any] | None = None, max_steps: int | None = None) -> str:
+    """
+    Get the cache key of a seeded episode.
+
+    Args:
+        weights: Dictionary of weights for the heuristic agent
+        seed: Seed of the episode
+        use_custom_env: Whether the episode is played in the custom environment
+        agent_options: Further HeuristicAgent arguments
+        max_steps: Step limit of the episode
+
+    Returns:
+        Hex SHA-256 of the inputs that determine the episode
+    """
+    inputs = {
+        'weights': weights,
+        'seed': seed,
+        'env': 'custom' if use_custom_env else 'default',
+        'agent_options': agent_options or {},
+        'max_steps': max_steps,
+        'agent': agent_code_hash(),
+        'engine': engine_version(),
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+class EpisodeCache:
+    """Episode results stored by key in a directory, with a JSON Lines index."""
+
+    def __init__(self, root: str):
+        """
+        Open a cache directory, creating it if needed.
+
+        Args:
+            root: Directory of the cache
+        """
+        self.root: str = root
+        self.hits: int = 0
+        self.misses: int = 0
+        # File of each stored key, relative to root
+        self.index: dict[str, str] = {}
+
+        os.makedirs(root, exist_ok=True)
+        index_path = os.path.join(root, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, 'r') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.index[entry['key']] = entry['file']
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.index
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """
+        Look up an episode result.
+
+        Args:
+            key: Key from episode_key()
+
+        Returns:
+            The stored result, or None if the episode is not cached
+        """
+        file = self.index.get(key)
+        if file is None or not os.path.exists(os.path.join(self.root, file)):
+            self.misses += 1
+            return None
+        with open(os.path.join(self.root, file), 'r') as f:
+            result = json.load(f)
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result: dict[str, Any], **fields: Any) -> None:
+        """
+        Store an episode result and add it to the index.
+
+        Args:
+            key: Key from episode_key()
+            result: The episode result
+            **fields: Further fields for the index entry, e.g. weights and seed
+        """
+        # Two-character subdirectories keep directory listings short
+        file = os.path.join(key[:2], f"{key}.json")
+        path = os.path.join(self.root, file)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump(result, f)
+        os.replace(temporary, path)
+
+        if key not in self.index:
+            entry = {'key': key, 'file': file, 'created': datetime.now().isoformat(), **fields}
+            with open(os.path.join(self.root, INDEX_FILE), 'a') as f:
+                f.write(json.dumps(entry) + "\n")
+        self.index[key] = file
@@ -0,0 +1,320 @@
+"""
+Lightweight simulation board for the heuristic agent's look-ahead.
+
+SimBoard mirrors the movement API of tetris.engine.board.Board, but applies
+moves in place and records them in a move log. The search steps back with an
+O(1) undo instead of copying the grid and the Board object for every action.
+The grid is shared with the real board and never written to.
+
+BitBoard is the same board with each row packed into an integer bitmask, so
+collision tests are AND operations, full lines are a compare against the
+full-row mask and the board fingerprint is a tuple of ints. The np.ndarray
+grid stays available for the evaluator.
+"""
+import numpy as np
+from numpy.typing import NDArray
+
+from tetris.engine.board import Board
+
+from examples.placement import piece_orientations, piece_symmetry
+
+
+def grid_to_rows(grid: NDArray[np.int8]) -> tuple[int, ...]:
+    """
+    Pack each row of a grid into an integer bitmask.
+
+    Bit c of a row is set when column c is filled.
+
+    Args:
+        grid: The board grid
+
+    Returns:
+        Tuple with one bitmask per row, top row first
+    """
+    column_bits = 1 << np.arange(grid.shape[1], dtype=np.int64)
+    return tuple(((grid > 0) @ column_bits).tolist())
+
+
+def rows_to_grids(rows: NDArray[np.int64], cols: int) -> NDArray[np.int8]:
+    """
+    Unpack row bitmasks back into boards.
+
+    Args:
+        rows: Row bitmasks with shape (..., rows)
+        cols: Number of columns of the board
+
+    Returns:
+        Boards with shape (..., rows, cols) holding 1 for filled cells
+    """
+    return ((rows[..., np.newaxis] >> np.arange(cols)) & 1).astype(np.int8)
+
+
+class SimPiece:
+    """Position and orientation of the falling piece on a SimBoard."""
+    __slots__ = ('type', 'x', 'y', 'rotation', 'shape')
+
+    def __init__(self, type: object, x: int, y: int, rotation: int, shape: NDArray[np.int8]):
+        self.type = type
+        self.x = x
+        self.y = y
+        self.rotation = rotation  # Clockwise quarter turns from the starting orientation
+        self.shape = shape
+
+
+class SimBoard:
+    """
+    Board used by the agent's search, with in-place moves and an undo log.
+
+    Only the falling piece moves; the grid stays as it was when the search
+    started, so each logged move is just the previous (x, y, rotation).
+    """
+
+    def __init__(self, grid: NDArray[np.int8], piece_type: object, shape: NDArray[np.int8], x: int, y: int):
+        """
+        Initialize the simulation board.
+
+        Args:
+            grid: The board grid without the falling piece (not copied)
+            piece_type: Type of the falling piece
+            shape: Shape matrix of the piece in its current orientation
+            x: Column of the shape matrix's left edge
+            y: Row of the shape matrix's top edge
+        """
+        self.grid: NDArray[np.int8] = grid
+        self.rows: int = grid.shape[0]
+        self.cols: int = grid.shape[1]
+        self.shapes: list[NDArray[np.int8]] = piece_orientations(shape)
+        # Filled cells of each orientation, relative to the shape matrix origin
+        self.cells: list[list[tuple[int, int]]] = [
+            list(zip(*(index.tolist() for index in np.nonzero(oriented)))) for oriented in self.shapes
+        ]
+        # Per rotation: (distinct rotation, dx, dy), see PieceSymmetry.canonical
+        self.canonical: tuple[tuple[int, int, int], ...] = piece_symmetry(shape).canonical
+        self.current_piece: SimPiece = SimPiece(piece_type, x, y, 0, self.shapes[0])
+        self._log: list[tuple[int, int, int]] = []
+
+    @classmethod
+    def from_board(cls, board: Board) -> 'SimBoard | None':
+        """
+        Create a simulation board for the current piece of a Board.
+
+        Args:
+            board: The real board
+
+        Returns:
+            The simulation board, or None if there is no falling piece
+        """
+        piece = board.current_piece
+        if piece is None:
+            return None
+        return cls(board.grid, piece.type, piece.shape, piece.x, piece.y)
+
+    def fits(self, x: int, y: int, rotation: int) -> bool:
+        """
+        Check whether the piece fits at a position without colliding.
+
+        Args:
+            x: Column of the shape matrix's left edge
+            y: Row of the shape matrix's top edge
+            rotation: Orientation index
+
+        Returns:
+            True if every cell is inside the board and on an empty square
+        """
+        grid = self.grid
+        for r, c in self.cells[rotation]:
+            row, col = y + r, x + c
+            if col < 0 or col >= self.cols or row >= self.rows:
+                return False
+            if row >= 0 and grid[row, col] > 0:
+                return False
+        return True
+
+    def _move(self, dx: int, dy: int, turns: int) -> bool:
+        """Apply a move if the piece fits afterwards, logging the old position."""
+        piece = self.current_piece
+        x, y, rotation = piece.x + dx, piece.y + dy, (piece.rotation + turns) % 4
+        if not self.fits(x, y, rotation):
+            return False
+        self._log.append((piece.x, piece.y, piece.rotation))
+        piece.x, piece.y, piece.rotation = x, y, rotation
+        piece.shape = self.shapes[rotation]
+        return True
+
+    def move_left(self) -> bool:
+        """Move the piece one column left."""
+        return self._move(-1, 0, 0)
+
+    def move_right(self) -> bool:
+        """Move the piece one column right."""
+        return self._move(1, 0, 0)
+
+    def move_down(self) -> bool:
+        """Move the piece one row down. Unlike Board, a blocked piece is not locked."""
+        return self._move(0, 1, 0)
+
+    def rotate(self, clockwise: bool = True) -> bool:
+        """Rotate the piece a quarter turn in place."""
+        return self._move(0, 0, 1 if clockwise else -1)
+
+    def drop(self) -> int:
+        """
+        Move the piece down as far as it goes, logged as a single move.
+
+        Returns:
+            Number of rows the piece dropped
+        """
+        piece = self.current_piece
+        y = piece.y
+        while self.fits(piece.x, y + 1, piece.rotation):
+            y += 1
+        distance = y - piece.y
+        if distance:
+            _ = self._move(0, distance, 0)
+        return distance
+
+    def restore(self, state: tuple[int, int, int]) -> None:
+        """
+        Put the piece into a state given as (x, y, rotation).
+
+        The move log is cleared, since it no longer leads to this state.
+
+        Args:
+            state: Piece state as (x, y, rotation)
+        """
+        piece = self.current_piece
+        piece.x, piece.y, piece.rotation = state
+        piece.shape = self.shapes[piece.rotation]
+        self._log.clear()
+
+    def piece_key(self) -> int:
+        """
+        Pack the piece state into one non-negative int.
+
+        Coordinates are offset by 4 (the largest shape matrix) so they are
+        never negative; hash(-1) == hash(-2) in Python, so negative values
+        would make neighbouring states collide.
+
+        Returns:
+            The packed (x, y, rotation)
+        """
+        piece = self.current_piece
+        return ((piece.x + 4) << 16) | ((piece.y + 4) << 8) | piece.rotation
+
+    def canonical_key(self) -> int:
+        """
+        Pack the cells covered by the piece into one non-negative int.
+
+        Like piece_key(), but rotations that look the same (e.g. any rotation
+        of the O piece) are mapped onto one distinct orientation, so states
+        that cover the same cells get the same key.
+
+        Returns:
+            The packed (x, y, rotation) of the equivalent distinct orientation
+        """
+        piece = self.current_piece
+        rotation, dx, dy = self.canonical[piece.rotation]
+        return ((piece.x + dx + 4) << 16) | ((piece.y + dy + 4) << 8) | rotation
+
+    def restore_key(self, key: int) -> None:
+        """
+        Put the piece back into a state returned by piece_key().
+
+        Args:
+            key: The packed piece state
+        """
+        self.restore((((key >> 16) & 0xFF) - 4, ((key >> 8) & 0xFF) - 4, key & 0xFF))
+
+    def checkpoint(self) -> int:
+        """Get a marker of the current position in the move log."""
+        return len(self._log)
+
+    def undo(self) -> None:
+        """Take back the last logged move."""
+        piece = self.current_piece
+        piece.x, piece.y, piece.rotation = self._log.pop()
+        piece.shape = self.shapes[piece.rotation]
+
+    def rewind(self, checkpoint: int) -> None:
+        """
+        Take back every move made after a checkpoint.
+
+        Args:
+            checkpoint: Marker returned by checkpoint()
+        """
+        if len(self._log) <= checkpoint:
+            return
+        piece = self.current_piece
+        piece.x, piece.y, piece.rotation = self._log[checkpoint]
+        piece.shape = self.shapes[piece.rotation]
+        del self._log[checkpoint:]
+
+
+class BitBoard(SimBoard):
+    """
+    Simulation board that tests collisions on row bitmasks.
+
+    The grid is packed once when the board is created; every later collision
+    test and the board fingerprint only use Python ints.
+    """
+
+    def __init__(self, grid: NDArray[np.int8], piece_type: object, shape: NDArray[np.int8], x: int, y: int):
+        super().__init__(grid, piece_type, shape, x, y)
+        self.fingerprint: tuple[int, ...] = grid_to_rows(grid)
+        self.full_row: int = (1 << self.cols) - 1
+        # Per orientation: (first filled column, last filled column, [(row offset, row bitmask)])
+        self.masks: list[tuple[int, int, list[tuple[int, int]]]] = []
+        for oriented in self.shapes:
+            filled = oriented > 0
+            shape_cols = np.flatnonzero(filled.any(axis=0))
+            row_masks = [
+                (r, sum(1 << c for c in np.flatnonzero(filled[r]).tolist()))
+                for r in np.flatnonzero(filled.any(axis=1)).tolist()
+            ]
+            self.masks.append((int(shape_cols[0]), int(shape_cols[-1]), row_masks))
+
+    @staticmethod
+    def _shift(mask: int, x: int) -> int:
+        """Move a shape row bitmask to board column x (x may be negative)."""
+        return mask << x if x >= 0 else mask >> -x
+
+    def fits(self, x: int, y: int, rotation: int) -> bool:
+        """
+        Check whether the piece fits at a position without colliding.
+
+        Args:
+            x: Column of the shape matrix's left edge
+            y: Row of the shape matrix's top edge
+            rotation: Orientation index
+
+        Returns:
+            True if every cell is inside the board and on an empty square
+        """
+        first_col, last_col, row_masks = self.masks[rotation]
+        if x + first_col < 0 or x + last_col >= self.cols:
+            return False
+        rows = self.fingerprint
+        for r, mask in row_masks:
+            row = y + r
+            if row >= self.rows:
+                return False
+            if row >= 0 and rows[row] & self._shift(mask, x):
+                return False
+        return True
+
+    def locked_rows(self) -> tuple[list[int], int]:
+        """
+        Lock the piece where it is and clear full lines, on a copy of the rows.
+
+        Returns:
+            Tuple of (row bitmasks of the resulting board, number of lines cleared)
+        """
+        piece = self.current_piece
+        rows = list(self.fingerprint)
+        for r, mask in self.masks[piece.rotation][2]:
+            row = piece.y + r
+            if row >= 0:
+                rows[row] |= self._shift(mask, piece.x)
+        kept = [row for row in rows if row != self.full_row]
+        lines = len(rows) - len(kept)
+        return [0] * lines + kept, lines
@@ -9,6 +9,7 @@ import time
 import os
 import argparse
 from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 from numpy.typing import NDArray
 import json
@@ -24,7 +25,10 @@ except ImportError:
 sys.path.append('..')
 
 from tetris import TetrisEnv, Action, TetrisRenderer
-from examples.heuristic_agent import HeuristicAgent
+from examples.heuristic_agent import HeuristicAgent, DecisionStats, SEARCH_MODES
+from examples.metrics_recorder import MetricsRecorder
+from examples.result_cache import EpisodeCache, episode_key
+from examples.episode_trace import TraceRecorder
 
 # Define a protocol for TetrisRenderer to help with type checking
 class TetrisRendererProtocol(Protocol):
@@ -64,6 +68,9 @@ class CustomTetrisEnv(TetrisEnv):
 # Directory for storing test results
 RESULTS_DIR = "agent_test_results"
 
+# Directory of the episode result cache, see result_cache
+CACHE_DIR = os.path.join(RESULTS_DIR, "episode_cache")
+
 # Define a TypedDict for episode results
 class EpisodeResult(TypedDict):
     score: int
@@ -72,7 +79,9 @@ class EpisodeResult(TypedDict):
     total_reward: float
     duration: float
     metrics_history: list[dict[str, float | int | str]]
+    recording: str | None  # Directory of the streamed per-step metrics, see metrics_recorder
     action_counts: dict[str, int]
+    decision_stats: dict[str, float]
 
 # Define a TypedDict for aggregated results
 class AggregatedResults(TypedDict):
@@ -86,13 +95,19 @@ class AggregatedResults(TypedDict):
     max_lines: int
     episode_results: list[EpisodeResult]
     action_counts: dict[str, int]
+    transposition: dict[str, float]
+    decision_stats: dict[str, float]
 
 def run_test_episode(agent: HeuristicAgent, 
                     delay: float = 0.01, 
                     render: bool = True,
                     verbose: bool = False,
                     use_custom_env: bool = False,
-                    debug: bool = False) -> EpisodeResult:
+                    debug: bool = False,
+                    seed: int | None = None,
+                    record_dir: str | None = None,
+                    max_steps: int | None = None,
+                    trace_path: str | None = None) -> EpisodeResult:
     """
     Run a single test episode with the agent.
     
@@ -103,6 +118,11 @@ def run_test_episode(agent: HeuristicAgent,
         verbose: Whether to print detailed move information
         use_custom_env: Whether to use the custom environment
         debug: Whether to enable debug mode
+        seed: Seed for the environment's piece sequence, or None for an unseeded episode
+        record_dir: Directory to stream the per-step metrics to instead of
+            keeping them in metrics_history, or None to keep them in memory
+        max_steps: End the episode after this many steps, or None to play until game over
+        trace_path: File to write a binary trace of the episode to (see episode_trace), or None
         
     Returns:
         Dictionary with episode results
@@ -111,8 +131,9 @@ def run_test_episode(agent: HeuristicAgent,
     env = CustomTetrisEnv() if use_custom_env else TetrisEnv()
     renderer: TetrisRendererProtocol | None = TetrisRenderer() if render else None
     
-    # Reset environment
-    obs, info = env.reset()
+    # Reset environment and forget any plan left over from the previous episode
+    obs, info = env.reset(seed=seed)
+    agent.reset()
     
     # Debug: Print initial state
     if debug:
@@ -148,7 +169,7 @@ def run_test_episode(agent: HeuristicAgent,
                 print(f"New Shape after Rotate:\n{shape_array}")
                 
             # Reset the piece position and rotation for the actual test
-            _, _ = env.reset()
+            _, _ = env.reset(seed=seed)
     
     total_reward = 0
     steps = 0
@@ -156,12 +177,16 @@ def run_test_episode(agent: HeuristicAgent,
     
     # Metrics tracking
     metrics_history: list[dict[str, float | int | str]] = []
+    recorder = MetricsRecorder(record_dir) if record_dir else None
+    tracer = TraceRecorder(trace_path, env.board, seed) if trace_path else None
     action_counts = {action.name: 0 for action in Action}
+    decision_stats = DecisionStats(decisions=0)
     
     # Episode loop
     while True:
         # Get the best action from the agent
-        best_action, decision_time_ms, metrics = agent.get_best_action(env)
+        best_action, decision_time_ms, metrics, stats = agent.get_best_action(env)
+        decision_stats.add(stats)
         
         # Debug: Print the current state before taking the action
         if debug:
@@ -187,6 +212,8 @@ def run_test_episode(agent: HeuristicAgent,
         obs, reward, terminated, _, info = env.step(np.int64(best_action.value))
         total_reward += reward
         steps += 1
+        if tracer is not None:
+            tracer.record(best_action, decision_time_ms, env.board, info['lines_cleared'])
         
         # Debug: Print the state after taking the action
         if debug:
@@ -202,16 +229,20 @@ def run_test_episode(agent: HeuristicAgent,
             print(f"Terminated: {terminated}")
         
         # Store metrics for this step
-        step_data = {
-            'step': steps,
-            'action': best_action.name,
-            'reward': float(reward),
-            'score': info['score'],
-            'lines_cleared': info['lines_cleared'],
-            'decision_time_ms': decision_time_ms,
-            **metrics
-        }
-        metrics_history.append(step_data)
+        if recorder is not None:
+            recorder.record(steps, best_action, float(reward), info['score'], info['lines_cleared'],
+                            decision_time_ms, metrics)
+        else:
+            step_data = {
+                'step': steps,
+                'action': best_action.name,
+                'reward': float(reward),
+                'score': info['score'],
+                'lines_cleared': info['lines_cleared'],
+                'decision_time_ms': decision_time_ms,
+                **metrics
+            }
+            metrics_history.append(step_data)
         
         # Render current state
         if renderer:
@@ -226,18 +257,23 @@ def run_test_episode(agent: HeuristicAgent,
             )
         
         # Add delay to make it viewable
-        time.sleep(delay)
+        if delay > 0:
+            time.sleep(delay)
         
         # Check if episode is done
-        if terminated:
+        if terminated or (max_steps is not None and steps >= max_steps):
             break
     
     # Calculate episode duration
     duration = time.time() - start_time
     
-    # Close renderer
+    # Close renderer and write out the remaining recorded steps
     if renderer:
         renderer.close()
+    if recorder is not None:
+        recorder.close()
+    if tracer is not None:
+        tracer.close()
     
     # Return episode results
     return {
@@ -247,17 +283,298 @@ def run_test_episode(agent: HeuristicAgent,
         'total_reward': total_reward,
         'duration': duration,
         'metrics_history': metrics_history,
-        'action_counts': action_counts
+        'recording': record_dir,
+        'action_counts': action_counts,
+        'decision_stats': decision_stats.as_dict()
     }
 
 
+class EpisodeTask(TypedDict):
+    """Everything a worker process needs to play one episode."""
+    weights: dict[str, float]
+    agent_options: dict[str, Any]
+    seed: int | None
+    delay: float
+    use_custom_env: bool
+    record_dir: str | None
+    max_steps: int | None
+    trace_path: str | None
+
+
+def recording_dir(record_dir: str | None, episode: int, config: int | None = None,
+                  suffix: str = "") -> str | None:
+    """
+    Get the path an episode's per-step metrics or trace are written to.
+    
+    Args:
+        record_dir: Directory of the run's recordings, or None to keep metrics in memory
+        episode: Index of the episode
+        config: Index of the weight configuration, if the run tests several
+        suffix: Appended to the episode's name, e.g. a file extension
+        
+    Returns:
+        The episode's recording path, or None if the run is not recorded
+    """
+    if record_dir is None:
+        return None
+    if config is not None:
+        record_dir = os.path.join(record_dir, f"config_{config:03d}")
+    os.makedirs(record_dir, exist_ok=True)
+    return os.path.join(record_dir, f"episode_{episode:04d}{suffix}")
+
+
+def episode_seeds(seed: int | None, episodes: int) -> list[int | None]:
+    """
+    Derive a deterministic seed for every episode from a base seed.
+    
+    Args:
+        seed: Base seed, or None for unseeded episodes
+        episodes: Number of episodes
+        
+    Returns:
+        One seed per episode (all None if no base seed is given)
+    """
+    return [None if seed is None else seed + episode for episode in range(episodes)]
+
+
+def task_cache_key(task: EpisodeTask) -> str | None:
+    """
+    Get the cache key of an episode task.
+    
+    Args:
+        task: The episode to play
+        
+    Returns:
+        The key, or None if the episode cannot be cached because it is
+        unseeded, its metrics or trace are recorded, the agent plays from a
+        contour table, whose contents the key does not cover, or the agent
+        searches within a deadline, so its moves depend on timing
+    """
+    if task['seed'] is None or task['record_dir'] is not None or task['trace_path'] is not None:
+        return None
+    options = task['agent_options']
+    if options.get('contour_table') is not None or options.get('deadline_ms') is not None:
+        return None
+    return episode_key(task['weights'], task['seed'], task['use_custom_env'],
+                       task['agent_options'], task['max_steps'])
+
+
+def store_episode(cache: EpisodeCache, key: str, task: EpisodeTask, result: EpisodeResult) -> None:
+    """
+    Add an episode result to the cache, indexed by its weights, seed and outcome.
+    
+    Args:
+        cache: The episode cache
+        key: Key of the episode, see task_cache_key()
+        task: The episode that was played
+        result: Its result
+    """
+    cache.put(key, dict(result), weights=task['weights'], seed=task['seed'],
+              env='custom' if task['use_custom_env'] else 'default',
+              score=result['score'], lines_cleared=result['lines_cleared'], steps=result['steps'])
+
+
+def _run_episode_task(task: EpisodeTask) -> tuple[EpisodeResult, dict[str, float]]:
+    """
+    Play one episode in a worker process with a fresh agent.
+    
+    Args:
+        task: The episode to play
+        
+    Returns:
+        Tuple of (episode result, transposition table counters of the agent)
+    """
+    agent = HeuristicAgent(weights=task['weights'], **task['agent_options'])
+    result = run_test_episode(
+        agent=agent,
+        delay=task['delay'],
+        render=False,
+        use_custom_env=task['use_custom_env'],
+        seed=task['seed'],
+        record_dir=task['record_dir'],
+        max_steps=task['max_steps'],
+        trace_path=task['trace_path']
+    )
+    return result, agent.transposition_table.stats.as_dict() if agent.transposition_table else {}
+
+
+def print_episode_summary(episode: int, episodes: int, result: EpisodeResult) -> None:
+    """
+    Print the summary of one episode.
+    
+    Args:
+        episode: Index of the episode
+        episodes: Number of episodes in the run
+        result: Result of the episode
+    """
+    print(f"\nEpisode {episode + 1}/{episodes} Summary:")
+    print(f"  Score: {result['score']}")
+    print(f"  Lines cleared: {result['lines_cleared']}")
+    print(f"  Steps: {result['steps']}")
+    print(f"  Duration: {result['duration']:.2f} seconds")
+
+
+def merge_transposition_stats(all_stats: list[dict[str, float]]) -> dict[str, float]:
+    """
+    Combine the transposition table counters of several agents.
+    
+    Args:
+        all_stats: Counters of each agent, as produced by TranspositionStats.as_dict()
+        
+    Returns:
+        Summed counters with the overall hit rate, or {} if no agent had a table
+    """
+    all_stats = [stats for stats in all_stats if stats]
+    if not all_stats:
+        return {}
+    merged = {name: sum(stats[name] for stats in all_stats) for name in ('hits', 'misses', 'evictions', 'size')}
+    lookups = merged['hits'] + merged['misses']
+    merged['hit_rate'] = merged['hits'] / lookups if lookups else 0.0
+    return merged
+
+
+def aggregate_results(weights: dict[str, float], all_results: list[EpisodeResult],
+                      transposition: dict[str, float]) -> AggregatedResults:
+    """
+    Aggregate the results of several episodes played with the same weights.
+    
+    Args:
+        weights: Dictionary of weights for the heuristic agent
+        all_results: Results of the episodes, in episode order
+        transposition: Transposition table counters of the agents
+        
+    Returns:
+        Dictionary with aggregated results
+    """
+    episodes = len(all_results)
+    
+    # Aggregate action counts
+    action_counts = {action.name: 0 for action in Action}
+    for result in all_results:
+        for action, count in result['action_counts'].items():
+            action_counts[action] = action_counts.get(action, 0) + count
+    
+    # Aggregate decision stats
+    decision_stats = DecisionStats(decisions=0)
+    for result in all_results:
+        decision_stats.add(DecisionStats(**result['decision_stats']))
+    
+    return AggregatedResults(
+        weights=weights,
+        episodes=episodes,
+        avg_score=sum(r['score'] for r in all_results) / episodes,
+        avg_lines=sum(r['lines_cleared'] for r in all_results) / episodes,
+        avg_steps=sum(r['steps'] for r in all_results) / episodes,
+        avg_duration=sum(r['duration'] for r in all_results) / episodes,
+        max_score=max(r['score'] for r in all_results),
+        max_lines=max(r['lines_cleared'] for r in all_results),
+        episode_results=all_results,
+        action_counts=action_counts,
+        transposition=transposition,
+        decision_stats=decision_stats.as_dict()
+    )
+
+
+def run_weight_tests(weight_sets: list[dict[str, float]],
+                     episodes: int = 3,
+                     delay: float = 0.0,
+                     use_custom_env: bool = False,
+                     workers: int | None = None,
+                     seed: int | None = None,
+                     agent_options: dict[str, Any] | None = None,
+                     record_dir: str | None = None,
+                     max_steps: int | None = None,
+                     cache: bool = False,
+                     trace_dir: str | None = None) -> list[AggregatedResults]:
+    """
+    Run the episodes of several weight configurations on a process pool.
+    
+    Every (weights, episode) pair is a separate task with its own agent, so
+    episodes of all configurations are spread over the workers. Episode i
+    of every configuration is played with seed + i, so a run with a seed
+    gives the same results as the sequential run_weight_test with that seed.
+    Rendering is not available in worker processes.
+    
+    Args:
+        weight_sets: Weight configurations to test
+        episodes: Number of episodes per configuration
+        delay: Delay between moves in seconds
+        use_custom_env: Whether to use the custom environment
+        workers: Number of worker processes (None for one per CPU)
+        seed: Base seed of the episodes, or None for unseeded episodes
+        agent_options: Further HeuristicAgent arguments, shared by all configurations
+        record_dir: Directory to stream the per-step metrics to, one subdirectory
+            per episode (and per configuration if there are several)
+        max_steps: Step limit per episode, or None to play every episode until game over
+        cache: Whether to reuse seeded episodes from CACHE_DIR and store the ones played
+        trace_dir: Directory to write a binary trace of every episode to, laid out like record_dir
+        
+    Returns:
+        Aggregated results of each configuration, in the order of weight_sets
+    """
+    seeds = episode_seeds(seed, episodes)
+    tasks: list[EpisodeTask] = [
+        EpisodeTask(weights=weights, agent_options=agent_options or {}, seed=episode_seed,
+                    delay=delay, use_custom_env=use_custom_env,
+                    record_dir=recording_dir(record_dir, episode, index if len(weight_sets) > 1 else None),
+                    max_steps=max_steps,
+                    trace_path=recording_dir(trace_dir, episode, index if len(weight_sets) > 1 else None, ".trace"))
+        for index, weights in enumerate(weight_sets)
+        for episode, episode_seed in enumerate(seeds)
+    ]
+    
+    # Take what is cached and only play the remaining episodes
+    episode_cache = EpisodeCache(CACHE_DIR) if cache else None
+    keys: list[str | None] = [task_cache_key(task) if episode_cache is not None else None for task in tasks]
+    outcomes: list[tuple[EpisodeResult, dict[str, float]] | None] = [None] * len(tasks)
+    if episode_cache is not None:
+        for i, key in enumerate(keys):
+            cached = episode_cache.get(key) if key else None
+            if cached is not None:
+                outcomes[i] = (cast(EpisodeResult, cached), {})
+    
+    pending = [i for i, outcome in enumerate(outcomes) if outcome is None]
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for i, outcome in zip(pending, pool.map(_run_episode_task, [tasks[i] for i in pending])):
+                outcomes[i] = outcome
+                key = keys[i]
+                if episode_cache is not None and key:
+                    store_episode(episode_cache, key, tasks[i], outcome[0])
+    if episode_cache is not None:
+        print(f"Reused {len(tasks) - len(pending)} of {len(tasks)} episodes from {CACHE_DIR}")
+    
+    completed = cast(list[tuple[EpisodeResult, dict[str, float]]], outcomes)
+    all_results: list[AggregatedResults] = []
+    for index, weights in enumerate(weight_sets):
+        config_outcomes = completed[index * episodes:(index + 1) * episodes]
+        all_results.append(aggregate_results(
+            weights,
+            [result for result, _ in config_outcomes],
+            merge_transposition_stats([stats for _, stats in config_outcomes])
+        ))
+    return all_results
+
+
 def run_weight_test(weights: dict[str, float], 
                    episodes: int = 3, 
                    delay: float = 0.01,
                    render: bool = True,
                    verbose: bool = False,
                    debug: bool = False,
-                   use_custom_env: bool = False) -> AggregatedResults:
+                   use_custom_env: bool = False,
+                   search_mode: str = 'placement',
+                   lookahead: bool = False,
+                   beam_width: int = 5,
+                   deadline_ms: float | None = None,
+                   transposition_size: int = 256,
+                   prune: bool = False,
+                   workers: int = 1,
+                   seed: int | None = None,
+                   record_dir: str | None = None,
+                   cache: bool = False,
+                   trace_dir: str | None = None,
+                   contour_table: str | None = None) -> AggregatedResults:
     """
     Run multiple episodes with the given weights and return aggregated results.
     
@@ -269,58 +586,84 @@ def run_weight_test(weights: dict[str, float],
         verbose: Whether to print detailed move information
         debug: Whether to enable debug mode for the agent
         use_custom_env: Whether to use the custom environment
+        search_mode: How the agent finds final positions ('placement' or 'bfs')
+        lookahead: Whether the agent also scores the best placement of the next piece
+        beam_width: Number of placements the lookahead expands
+        deadline_ms: Time budget per decision; the agent searches with increasing effort until it runs out
+        transposition_size: Number of evaluated situations the agent keeps for reuse (0 to disable)
+        prune: Whether the lookahead skips placements whose score bound cannot beat the best found
+        workers: Number of processes to spread the episodes over; 1 runs them
+            here one after another, which is needed for rendering and debugging
+        seed: Base seed; episode i is played with seed + i. None leaves the episodes unseeded
+        record_dir: Directory to stream the per-step metrics to, one subdirectory
+            per episode, instead of keeping them in the results
+        cache: Whether to reuse seeded episodes from CACHE_DIR and store the ones played
+        trace_dir: Directory to write a binary trace of every episode to
+        contour_table: Path of a contour table the agent answers common surfaces from
         
     Returns:
         Dictionary with aggregated results
     """
-    # Create agent with the given weights
-    agent = HeuristicAgent(weights=weights, debug=debug)
+    agent_options: dict[str, Any] = dict(
+        search_mode=search_mode, lookahead=lookahead, beam_width=beam_width,
+        deadline_ms=deadline_ms, transposition_size=transposition_size, prune=prune,
+        contour_table=contour_table
+    )
+    
+    if workers > 1:
+        if render or verbose or debug:
+            print("Rendering, verbose and debug output are not available with several workers")
+        results = run_weight_tests([weights], episodes=episodes, delay=delay, use_custom_env=use_custom_env,
+                                   workers=workers, seed=seed, agent_options=agent_options,
+                                   record_dir=record_dir, cache=cache, trace_dir=trace_dir)[0]
+        for episode, result in enumerate(results['episode_results']):
+            print_episode_summary(episode, episodes, result)
+        return results
     
     # Track results across episodes
     all_results: list[EpisodeResult] = []
+    transposition_stats: list[dict[str, float]] = []
+    episode_cache = EpisodeCache(CACHE_DIR) if cache else None
     
-    for episode in range(episodes):
+    for episode, episode_seed in enumerate(episode_seeds(seed, episodes)):
         print(f"\n--- Episode {episode + 1}/{episodes} ---")
         
-        # Run episode
-        result = run_test_episode(
-            agent=agent,
-            delay=delay,
-            render=render,
-            verbose=verbose,
-            use_custom_env=use_custom_env,
-            debug=debug
-        )
+        # Reuse the episode if it has been played before
+        task = EpisodeTask(weights=weights, agent_options=agent_options, seed=episode_seed, delay=delay,
+                           use_custom_env=use_custom_env, record_dir=recording_dir(record_dir, episode),
+                           max_steps=None, trace_path=recording_dir(trace_dir, episode, suffix=".trace"))
+        key = task_cache_key(task) if episode_cache is not None else None
+        cached = episode_cache.get(key) if episode_cache is not None and key else None
+        
+        if cached is not None:
+            print(f"Reusing cached episode {key}")
+            result = cast(EpisodeResult, cached)
+        else:
+            # Run episode with a fresh agent, as the workers do, so both paths play the same games
+            agent = HeuristicAgent(weights=weights, debug=debug, **agent_options)
+            result = run_test_episode(
+                agent=agent,
+                delay=delay,
+                render=render,
+                verbose=verbose,
+                use_custom_env=use_custom_env,
+                debug=debug,
+                seed=episode_seed,
+                record_dir=task['record_dir'],
+                trace_path=task['trace_path']
+            )
+            if episode_cache is not None and key:
+                store_episode(episode_cache, key, task, result)
+            if agent.transposition_table is not None:
+                transposition_stats.append(agent.transposition_table.stats.as_dict())
         
         # Print episode summary
-        print(f"\nEpisode {episode + 1} Summary:")
-        print(f"  Score: {result['score']}")
-        print(f"  Lines cleared: {result['lines_cleared']}")
-        print(f"  Steps: {result['steps']}")
-        print(f"  Duration: {result['duration']:.2f} seconds")
+        print_episode_summary(episode, episodes, result)
         
         # Store results
         all_results.append(result)
     
-    # Aggregate action counts
-    action_counts = {action.name: 0 for action in Action}
-    for result in all_results:
-        for action, count in result['action_counts'].items():
-            action_counts[action] = action_counts.get(action, 0) + count
-    
-    # Create and return aggregated results
-    return AggregatedResults(
-        weights=weights,
-        episodes=episodes,
-        avg_score=sum(r['score'] for r in all_results) / episodes,
-        avg_lines=sum(r['lines_cleared'] for r in all_results) / episodes,
-        avg_steps=sum(r['steps'] for r in all_results) / episodes,
-        avg_duration=sum(r['duration'] for r in all_results) / episodes,
-        max_score=max(r['score'] for r in all_results),
-        max_lines=max(r['lines_cleared'] for r in all_results),
-        episode_results=all_results,
-        action_counts=action_counts
-    )
+    return aggregate_results(weights, all_results, merge_transposition_stats(transposition_stats))
 
 
 def save_results(results: AggregatedResults, test_name: str) -> str:
@@ -379,6 +722,23 @@ def print_results_table(results: AggregatedResults) -> None:
     action_table = [[action, count] for action, count in results['action_counts'].items()]
     print(tabulate(action_table, headers=["Action", "Count"], tablefmt="grid"))
     
+    # Print where the decision time went, in total and per search
+    print("\n=== Decision Stats ===")
+    stats = results['decision_stats']
+    searches = max(stats['decisions'] - stats['replayed'], 1)
+    stats_table = [
+        [name, f"{value:.2f}" if isinstance(value, float) else value,
+         f"{value / searches:.3f}" if name not in ('decisions', 'replayed', 'peak_frontier') else ""]
+        for name, value in stats.items()
+    ]
+    print(tabulate(stats_table, headers=["Stat", "Total", "Per Search"], tablefmt="grid"))
+    
+    # Print transposition table counters
+    if results['transposition']:
+        print("\n=== Transposition Table ===")
+        transposition_table = [[name, value] for name, value in results['transposition'].items()]
+        print(tabulate(transposition_table, headers=["Counter", "Value"], tablefmt="grid"))
+    
     # Print episode results
     print("\n=== Episode Results ===")
     episode_table = [
@@ -403,6 +763,30 @@ def main():
     _ = parser.add_argument('--debug', action='store_true', help='Enable debug mode for the agent')
     _ = parser.add_argument('--test-name', type=str, default='heuristic_test', help='Name for the test')
     _ = parser.add_argument('--custom-env', action='store_true', help='Use custom environment without automatic downward movement')
+    _ = parser.add_argument('--search-mode', type=str, default='placement', choices=SEARCH_MODES,
+                            help='How the agent finds final positions')
+    _ = parser.add_argument('--lookahead', action='store_true', help='Also score the best placement of the next piece')
+    _ = parser.add_argument('--beam-width', type=int, default=5, help='Number of placements expanded by the lookahead')
+    _ = parser.add_argument('--deadline-ms', type=float, default=None,
+                            help='Time budget per decision; search with increasing effort until it runs out')
+    _ = parser.add_argument('--transposition-size', type=int, default=256,
+                            help='Number of evaluated situations kept for reuse (0 to disable)')
+    _ = parser.add_argument('--prune', action='store_true',
+                            help='Skip lookahead placements whose score bound cannot beat the best found '
+                                 '(needs --lookahead or --deadline-ms)')
+    _ = parser.add_argument('--workers', type=int, default=1,
+                            help='Number of processes to spread the episodes over (rendering needs 1)')
+    _ = parser.add_argument('--seed', type=int, default=None,
+                            help='Base seed; episode i is played with seed + i')
+    _ = parser.add_argument('--record-dir', type=str, default=None,
+                            help='Stream per-step metrics to column files in this directory instead of the results JSON')
+    _ = parser.add_argument('--trace-dir', type=str, default=None,
+                            help='Write a compact binary trace of every episode to this directory')
+    _ = parser.add_argument('--cache', action='store_true',
+                            help='Reuse seeded episodes played before with the same weights, options and agent code '
+                                 '(not for deadline, recorded or traced runs)')
+    _ = parser.add_argument('--contour-table', type=str, default=None,
+                            help='Answer common surfaces from this contour table (see contour_table.py)')
     
     # Weight parameters
     _ = parser.add_argument('--holes-weight', type=float, default=-4.0, help='Weight for holes')
@@ -412,6 +796,8 @@ def main():
     _ = parser.add_argument('--well-weight', type=float, default=0.5, help='Weight for well depth')
     
     args: Namespace = parser.parse_args()
+    if args.prune and not args.lookahead and args.deadline_ms is None:
+        parser.error('--prune requires --lookahead or --deadline-ms')
     
     # Create weights dictionary from arguments
     weights: dict[str, float] = {
@@ -434,7 +820,19 @@ def main():
         render=not args.no_render,
         verbose=args.verbose,
         debug=args.debug,
-        use_custom_env=args.custom_env
+        use_custom_env=args.custom_env,
+        search_mode=args.search_mode,
+        lookahead=args.lookahead,
+        beam_width=args.beam_width,
+        deadline_ms=args.deadline_ms,
+        transposition_size=args.transposition_size,
+        prune=args.prune,
+        workers=args.workers,
+        seed=args.seed,
+        record_dir=args.record_dir,
+        cache=args.cache,
+        trace_dir=args.trace_dir,
+        contour_table=args.contour_table
     )
     
     # Print results table
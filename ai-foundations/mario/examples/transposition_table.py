@@ -0,0 +1,91 @@
+"""
+Bounded LRU transposition table for the heuristic Tetris agent.
+
+The same (board, piece) situation comes up again and again, above all early in
+a game and across the episodes of a weight sweep. The table maps a fingerprint
+of such a situation to the result of evaluating it, so a repeated situation
+is answered without searching again. The least recently used entry is evicted
+once the table is full.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Generic, Hashable, TypeVar
+
+V = TypeVar('V')
+
+
+@dataclass
+class TranspositionStats:
+    """Lookup counters of a transposition table."""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    size: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups answered from the table."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> dict[str, float]:
+        """Get the counters and the hit rate as a dictionary."""
+        return {**asdict(self), 'hit_rate': self.hit_rate}
+
+
+class TranspositionTable(Generic[V]):
+    """LRU mapping from situation keys to evaluation results, with hit/miss/eviction counts."""
+
+    def __init__(self, max_entries: int = 256):
+        """
+        Initialize an empty table.
+
+        Args:
+            max_entries: Number of entries kept before the least recently used is evicted
+        """
+        if max_entries < 1:
+            raise ValueError(f"Transposition table needs room for at least 1 entry, got {max_entries}")
+        self.max_entries: int = max_entries
+        self.stats: TranspositionStats = TranspositionStats()
+        self._entries: OrderedDict[Hashable, V] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> V | None:
+        """
+        Look up an entry and mark it as recently used.
+
+        Args:
+            key: Fingerprint of the situation
+
+        Returns:
+            The stored value, or None on a miss
+        """
+        value = self._entries.get(key)
+        if value is None:
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: V) -> None:
+        """
+        Store an entry, evicting the least recently used one if the table is full.
+
+        Args:
+            key: Fingerprint of the situation
+            value: Result of evaluating it
+        """
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            _ = self._entries.popitem(last=False)
+            self.stats.evictions += 1
+        self.stats.size = len(self._entries)
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        self._entries.clear()
+        self.stats = TranspositionStats()
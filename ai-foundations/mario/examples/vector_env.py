@@ -0,0 +1,119 @@
+"""
+Vectorized Tetris environment that steps several boards in lockstep.
+
+VectorTetrisEnv wraps N environments behind batched reset() and step()
+calls. The boards' grids are kept together in one (N, rows, cols) array and
+their observations in one (N, ...) array, finished episodes are reset
+automatically, and the agent decides for all boards with one
+HeuristicAgent.get_best_actions() call that reads the grid array:
+
+    vec_env = VectorTetrisEnv(16, seed=0)
+    _ = vec_env.reset()
+    while vec_env.episodes_finished < 100:
+        actions, _ = agent.get_best_actions(vec_env.envs, vec_env.grids)
+        _ = vec_env.step(np.array([action.value for action in actions]))
+
+The engine keeps one Board per environment and has no batched step, so
+step() still applies the actions board by board and copies each board's
+grid into its row of the array. What is batched is the agent's decision,
+which scores the candidates of all boards in one NumPy pass.
+"""
+from typing import Any, Callable
+import numpy as np
+from numpy.typing import NDArray
+
+from tetris.environment.tetris_env import TetrisEnv
+
+
+class VectorTetrisEnv:
+    """N Tetris environments stepped together, with automatic resets."""
+
+    def __init__(self, num_envs: int, env_factory: Callable[[], TetrisEnv] = TetrisEnv, seed: int | None = None):
+        """
+        Create the environments.
+
+        Args:
+            num_envs: Number of boards
+            env_factory: Creates one environment, e.g. CustomTetrisEnv
+            seed: Base seed. Episode k of board i is played with seed
+                seed + k * num_envs + i, so every episode gets its own seed
+                and a run is reproducible. None leaves the episodes unseeded
+        """
+        if num_envs < 1:
+            raise ValueError(f"Vector environment needs at least 1 board, got {num_envs}")
+        self.num_envs: int = num_envs
+        self.envs: list[TetrisEnv] = [env_factory() for _ in range(num_envs)]
+        self.seed: int | None = seed
+        self.grids: NDArray[np.int8] | None = None  # Grids of all boards, shape (N, rows, cols)
+        self.observations: NDArray | None = None  # Observations of all boards
+        self.episode_counts: NDArray[np.int64] = np.zeros(num_envs, dtype=np.int64)  # Episodes started per board
+        self.episodes_finished: int = 0
+        self.episode_steps: NDArray[np.int64] = np.zeros(num_envs, dtype=np.int64)
+
+    def _episode_seed(self, index: int) -> int | None:
+        """Seed of the next episode of a board."""
+        if self.seed is None:
+            return None
+        return self.seed + int(self.episode_counts[index]) * self.num_envs + index
+
+    def _reset_env(self, index: int) -> tuple[Any, dict[str, Any]]:
+        """Start the next episode of one board."""
+        obs, info = self.envs[index].reset(seed=self._episode_seed(index))
+        self.episode_counts[index] += 1
+        self.episode_steps[index] = 0
+        return obs, info
+
+    def _store(self, index: int, obs: Any) -> None:
+        """Copy the grid and observation of one board into the batch arrays."""
+        grid = self.envs[index].board.grid
+        if self.grids is None or self.observations is None:
+            self.grids = np.empty((self.num_envs, *grid.shape), dtype=grid.dtype)
+            obs = np.asarray(obs)
+            self.observations = np.empty((self.num_envs, *obs.shape), dtype=obs.dtype)
+        self.grids[index] = grid
+        self.observations[index] = obs
+
+    def reset(self) -> tuple[NDArray, list[dict[str, Any]]]:
+        """
+        Start a new episode on every board.
+
+        Returns:
+            Tuple of (observations with shape (N, ...), info of each board)
+        """
+        infos: list[dict[str, Any]] = []
+        for i in range(self.num_envs):
+            obs, info = self._reset_env(i)
+            self._store(i, obs)
+            infos.append(info)
+        return self.observations, infos
+
+    def step(self, actions: NDArray[np.int64]) -> tuple[NDArray, NDArray[np.float64], NDArray[np.bool_],
+                                                         NDArray[np.bool_], list[dict[str, Any]]]:
+        """
+        Apply one action to every board.
+
+        A board whose episode ends is reset right away. Its info then holds
+        the final 'episode_score' and 'episode_steps' of the finished episode,
+        and its observation is the first one of the new episode.
+
+        Args:
+            actions: Action value for each board
+
+        Returns:
+            Tuple of (observations, rewards, terminated flags, truncated flags, info of each board)
+        """
+        rewards = np.zeros(self.num_envs, dtype=np.float64)
+        terminated = np.zeros(self.num_envs, dtype=np.bool_)
+        truncated = np.zeros(self.num_envs, dtype=np.bool_)
+        infos: list[dict[str, Any]] = []
+        for i, env in enumerate(self.envs):
+            obs, reward, terminated[i], truncated[i], info = env.step(np.int64(actions[i]))
+            rewards[i] = reward
+            self.episode_steps[i] += 1
+            if terminated[i] or truncated[i]:
+                info = {**info, 'episode_score': info['score'], 'episode_steps': int(self.episode_steps[i])}
+                self.episodes_finished += 1
+                obs, _ = self._reset_env(i)
+            self._store(i, obs)
+            infos.append(info)
+        return self.observations, rewards, terminated, truncated, infos
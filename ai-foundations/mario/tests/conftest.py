@@ -0,0 +1,75 @@
+"""
+Shared fixtures for the agent tests.
+
+Run from the mario directory:
+
+    python -m pytest tests
+"""
+import os
+import sys
+from typing import Callable
+
+import numpy as np
+import pytest
+from numpy.typing import NDArray
+
+# The agent's modules are imported as examples.*, like the scripts do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Spawn shape matrices of the seven tetrominoes, filled with their piece ids
+PIECE_SHAPES: dict[str, NDArray[np.int8]] = {
+    name: np.array(shape, dtype=np.int8) * (index + 1)
+    for index, (name, shape) in enumerate({
+        'I': [[0, 0, 0, 0], [1, 1, 1, 1], [0, 0, 0, 0], [0, 0, 0, 0]],
+        'O': [[1, 1], [1, 1]],
+        'T': [[0, 1, 0], [1, 1, 1], [0, 0, 0]],
+        'S': [[0, 1, 1], [1, 1, 0], [0, 0, 0]],
+        'Z': [[1, 1, 0], [0, 1, 1], [0, 0, 0]],
+        'J': [[1, 0, 0], [1, 1, 1], [0, 0, 0]],
+        'L': [[0, 0, 1], [1, 1, 1], [0, 0, 0]],
+    }.items())
+}
+
+
+def make_random_board(rng: np.random.Generator, rows: int = 20, cols: int = 10) -> NDArray[np.int8]:
+    """
+    Build a random board with holes, wells and nearly full rows.
+
+    Args:
+        rng: Random generator
+        rows: Number of rows
+        cols: Number of columns
+
+    Returns:
+        Board grid without a falling piece and without full rows
+    """
+    heights = rng.integers(0, rows - 4, size=cols)
+    below_surface = np.arange(rows)[:, np.newaxis] >= rows - heights
+    grid = (below_surface & (rng.random((rows, cols)) < 0.8)).astype(np.int8)
+    # Rows that one piece can complete, open from above or not
+    for row in rng.choice(np.arange(rows // 2, rows), size=rng.integers(0, 4), replace=False):
+        grid[row] = 1
+        grid[row, rng.integers(cols)] = 0
+    grid[np.all(grid > 0, axis=1)] = 0
+    return grid * rng.integers(1, 8, size=(rows, cols)).astype(np.int8)
+
+
+@pytest.fixture
+def random_boards() -> Callable[[int], list[NDArray[np.int8]]]:
+    """Factory of reproducible random boards."""
+    def build(count: int, rows: int = 20, cols: int = 10) -> list[NDArray[np.int8]]:
+        rng = np.random.default_rng(count)
+        return [make_random_board(rng, rows, cols) for _ in range(count)]
+    return build
+
+
+@pytest.fixture(scope='session')
+def piece_shapes() -> dict[str, NDArray[np.int8]]:
+    """Spawn shapes of all tetrominoes, by name."""
+    return dict(PIECE_SHAPES)
+
+
+@pytest.fixture(params=sorted(PIECE_SHAPES))
+def piece_shape(request: pytest.FixtureRequest) -> NDArray[np.int8]:
+    """Spawn shape of each tetromino."""
+    return PIECE_SHAPES[request.param]
@@ -0,0 +1,97 @@
+"""Frames of the agent server and its handling of malformed requests."""
+import asyncio
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip('tetris')
+
+from examples.agent_server import (
+    PLACEMENT_DTYPE, STATUS_ERROR, STATUS_OK, _LENGTH, AgentServer, decode_request, encode_error,
+    encode_request, encode_response
+)
+from examples.board_features import FEATURE_NAMES
+from examples.heuristic_agent import HeuristicAgent
+
+
+def test_request_round_trip(random_boards, piece_shape):
+    for grid in random_boards(10) + random_boards(5, rows=12, cols=7):
+        decoded_grid, decoded_shape = decode_request(encode_request(grid, piece_shape))
+        assert decoded_grid.dtype == decoded_shape.dtype == np.int8
+        assert np.array_equal(decoded_grid, (grid > 0).astype(np.int8))
+        assert np.array_equal(decoded_shape, (piece_shape > 0).astype(np.int8))
+
+
+@pytest.mark.parametrize('payload', [
+    b'',
+    b'\x14\x0a',
+    encode_request(np.zeros((20, 10), np.int8), np.ones((2, 2), np.int8))[:-1],
+    encode_request(np.zeros((20, 10), np.int8), np.ones((2, 2), np.int8)) + b'\x01',
+    encode_request(np.zeros((0, 10), np.int8), np.ones((2, 2), np.int8)),
+    encode_request(np.zeros((20, 10), np.int8), np.zeros((2, 2), np.int8)),
+], ids=['empty', 'short_header', 'truncated', 'trailing_bytes', 'empty_grid', 'empty_shape'])
+def test_malformed_request_raises(payload):
+    with pytest.raises(ValueError):
+        _ = decode_request(payload)
+
+
+def test_response_round_trip(random_boards, piece_shapes):
+    agent = HeuristicAgent()
+    grid = random_boards(1)[0]
+    evaluations = agent.evaluate_placements_batch([grid], [piece_shapes['T']])[0]
+    response = encode_response(evaluations)
+    assert response[0] == STATUS_OK
+    records = np.frombuffer(response, dtype=PLACEMENT_DTYPE, offset=1)
+    assert len(records) == len(evaluations) > 0
+    for record, evaluation in zip(records, evaluations):
+        placement = evaluation.placement
+        assert (record['rotation'], record['x'], record['y']) == (placement.rotation, placement.x, placement.y)
+        assert record['score'] == np.float32(evaluation.score)
+        assert record['features'].tolist() == np.float32([evaluation.metrics[n] for n in FEATURE_NAMES]).tolist()
+
+    error = encode_error("bad board")
+    assert error[0] == STATUS_ERROR and error[1:].decode() == "bad board"
+
+
+async def _exchange(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, payload: bytes) -> bytes:
+    """Send one frame and read the response frame."""
+    writer.write(_LENGTH.pack(len(payload)) + payload)
+    await writer.drain()
+    (length,) = _LENGTH.unpack(await asyncio.wait_for(reader.readexactly(_LENGTH.size), 5))
+    return await asyncio.wait_for(reader.readexactly(length), 5)
+
+
+def test_server_answers_malformed_frame_and_keeps_serving(tmp_path, piece_shapes):
+    path = str(tmp_path / 'agent.sock')
+    agent = HeuristicAgent()
+    grid = np.zeros((20, 10), np.int8)
+    request = encode_request(grid, piece_shapes['L'])
+    expected = encode_response(agent.evaluate_placements_batch([grid], [piece_shapes['L']])[0])
+
+    async def run() -> None:
+        server = AgentServer(agent, path, batch_window_ms=5.0)
+        serving = asyncio.create_task(server.serve())
+        while not os.path.exists(path):
+            await asyncio.sleep(0.01)
+        try:
+            good = await asyncio.open_unix_connection(path)
+            bad = await asyncio.open_unix_connection(path)
+            responses = await asyncio.gather(_exchange(*good, request), _exchange(*bad, b'\x14\x0a\x02'))
+            assert responses[0] == expected
+            assert responses[1][0] == STATUS_ERROR
+            assert "shorter than its header" in responses[1][1:].decode()
+
+            # Both connections stay open and are answered again
+            assert await _exchange(*bad, request) == expected
+            assert await _exchange(*good, request) == expected
+            assert server.stats.requests == 3
+            for _, writer in (good, bad):
+                writer.close()
+        finally:
+            _ = serving.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await serving
+        assert not os.path.exists(path)
+
+    asyncio.run(run())
@@ -0,0 +1,118 @@
+"""Vectorized and incremental board features against direct recomputation."""
+import numpy as np
+import pytest
+
+pytest.importorskip('tetris')
+
+from examples.board_features import (
+    FEATURE_NAMES, IncrementalFeatures, extract_features, score_upper_bound, weight_vector
+)
+from examples.heuristic_agent import HeuristicAgent
+from examples.placement import list_placements, piece_symmetry, place_pieces
+
+
+def reference_metrics(board: np.ndarray, lines_cleared: int) -> dict[str, float]:
+    """Features computed cell by cell, as HeuristicAgent did before extract_features()."""
+    rows, cols = board.shape
+    holes = 0
+    heights: list[int] = []
+    for col in range(cols):
+        for row in range(rows):
+            if board[row, col] > 0:
+                holes += sum(1 for r in range(row + 1, rows) if board[r, col] == 0)
+                heights.append(rows - row)
+                break
+        else:
+            heights.append(0)
+    bumpiness = sum(abs(heights[i] - heights[i + 1]) for i in range(cols - 1))
+    well_depth = 0
+    for i in range(cols):
+        left_higher = i > 0 and heights[i - 1] - heights[i] >= 2
+        right_higher = i < cols - 1 and heights[i + 1] - heights[i] >= 2
+        if left_higher and right_higher:
+            well_depth += min(heights[i - 1], heights[i + 1]) - heights[i]
+        elif left_higher:
+            well_depth += heights[i - 1] - heights[i]
+        elif right_higher:
+            well_depth += heights[i + 1] - heights[i]
+    return {
+        'holes': float(holes),
+        'height': float(max(heights)),
+        'bumpiness': float(bumpiness),
+        'lines_cleared': float(lines_cleared),
+        'well_depth': float(well_depth),
+    }
+
+
+def test_extract_features_matches_reference(random_boards):
+    boards = random_boards(200)
+    lines = np.arange(len(boards)) % 4
+    features = extract_features(np.stack(boards), lines)
+    for i, board in enumerate(boards):
+        assert features.metrics(i) == reference_metrics(board, int(lines[i]))
+
+
+def test_evaluate_position_matches_reference(random_boards):
+    agent = HeuristicAgent()
+    for board in random_boards(50):
+        info = {'lines_cleared': 7, 'prev_lines_cleared': 5}
+        assert agent._evaluate_position(board, info) == reference_metrics(board, 2)
+
+
+def test_extract_features_clears_full_rows(random_boards):
+    for board in random_boards(50):
+        full = board.copy()
+        full[-1] = 1
+        features = extract_features(full)
+        cleared = np.vstack([np.zeros((1, board.shape[1]), dtype=board.dtype), board[:-1]])
+        assert features.metrics(0) == reference_metrics(cleared, 1)
+
+
+def test_incremental_place_matches_recompute(random_boards, piece_shape):
+    for board in random_boards(40):
+        state = IncrementalFeatures.from_grid(board)
+        assert state.metrics() == reference_metrics(board, 0)
+
+        placements = list_placements(state.heights, board.shape[0], piece_shape)
+        results, lines = place_pieces(board, placements)
+        expected = extract_features(results, lines).matrix()
+        for placement, result, row in zip(placements, results, expected):
+            child = state.place(placement.cells, placement.x, placement.y)
+            assert child.vector() == row.tolist()
+            recomputed = IncrementalFeatures.from_grid(result)
+            assert child.columns == recomputed.columns
+            assert child.row_counts == recomputed.row_counts
+            assert child.heights == recomputed.heights
+            assert child.column_holes == recomputed.column_holes
+            assert child.wells == recomputed.wells
+
+            # A second piece placed on the derived state
+            for second in list_placements(child.heights, board.shape[0], piece_shape)[::7]:
+                grandchild = child.place(second.cells, second.x, second.y)
+                second_results, second_lines = place_pieces(result, [second])
+                assert grandchild.vector() == extract_features(second_results, second_lines).matrix()[0].tolist()
+
+
+@pytest.mark.parametrize('weights', [
+    HeuristicAgent().weights,
+    *({name: float(value) for name, value in zip(FEATURE_NAMES, np.random.default_rng(seed).normal(size=5))}
+      for seed in range(4)),
+])
+def test_score_upper_bound_is_never_below_true_score(random_boards, piece_shape, weights):
+    vector = weight_vector(weights)
+    orientations = piece_symmetry(piece_shape).orientations
+    piece_cells = len(orientations[0].cells)
+    piece_width = max(len(o.columns) for o in orientations)
+    piece_span = max(max(r for r, _ in o.cells) - o.top + 1 for o in orientations)
+    for board in random_boards(60):
+        state = IncrementalFeatures.from_grid(board)
+        placements = list_placements(state.heights, board.shape[0], piece_shape)
+        if not placements:
+            continue
+        children = np.array([state.place(p.cells, p.x, p.y).vector() for p in placements])
+        for lines_before in (0, 2):
+            totals = children.copy()
+            totals[:, FEATURE_NAMES.index('lines_cleared')] += lines_before
+            scores = totals @ vector
+            bound = score_upper_bound(state, vector, piece_cells, piece_width, piece_span, lines_before)
+            assert bound >= max(scores) - 1e-9
@@ -0,0 +1,99 @@
+"""Contour table answers against the full search."""
+import numpy as np
+import pytest
+
+pytest.importorskip('tetris')
+
+from tetris.environment.tetris_env import TetrisEnv
+
+from examples.contour_table import ContourTable, build_contour_table, contour_boards
+from examples.heuristic_agent import HeuristicAgent, CONTOUR_FREE_ROWS
+
+ROWS, COLS, CLIP = 12, 6, 1
+
+
+@pytest.fixture(scope='module')
+def table_path(tmp_path_factory, piece_shapes):
+    path = str(tmp_path_factory.mktemp('contour') / 'table.bin')
+    build_contour_table(path, piece_shapes, HeuristicAgent().weights, rows=ROWS, cols=COLS, clip=CLIP,
+                        workers=1)
+    return path
+
+
+def full_search_choice(agent, grid, shape):
+    """(rotation, column) of the first best placement of the full search, or None."""
+    evaluations = agent.evaluate_placements_batch([grid], [shape])[0]
+    if not evaluations:
+        return None
+    best = max(evaluations, key=lambda e: e.score).placement
+    return best.rotation, best.x
+
+
+def random_hole_free_boards(count, seed=0):
+    """Hole-free boards whose surface steps lie within the table's clip."""
+    rng = np.random.default_rng(seed)
+    boards = []
+    while len(boards) < count:
+        heights = np.concatenate([[0], np.cumsum(rng.integers(-CLIP, CLIP + 1, size=COLS - 1))])
+        heights -= heights.min()
+        if heights.max() > ROWS - CONTOUR_FREE_ROWS:
+            continue
+        boards.append((np.arange(ROWS)[:, np.newaxis] >= ROWS - heights).astype(np.int8))
+    return boards
+
+
+def test_table_agrees_with_full_search_on_hole_free_boards(table_path, piece_shapes):
+    table = ContourTable(table_path)
+    agent = HeuristicAgent(transposition_size=0)
+    answered = agreed = 0
+    for grid in random_hole_free_boards(300):
+        heights = (grid > 0).sum(axis=0)
+        for name, shape in piece_shapes.items():
+            entry = table.lookup(name, shape, heights)
+            if entry is None:
+                continue
+            answered += 1
+            agreed += entry == full_search_choice(agent, grid, shape)
+    print(f"Contour table agrees with the full search on {agreed}/{answered} hole-free lookups")
+    assert answered > 0
+    assert agreed == answered
+
+
+def test_hole_free_boards_are_the_table_boards():
+    # Full rows are cleared, so the lowest column of a hole-free board is empty
+    indices = np.arange((2 * CLIP + 1) ** (COLS - 1))
+    for index, board in zip(indices, contour_boards(indices, ROWS, COLS, CLIP)):
+        heights = (board > 0).sum(axis=0)
+        assert heights.min() == 0
+        assert np.array_equal(board > 0, np.arange(ROWS)[:, np.newaxis] >= ROWS - heights)
+
+
+class RecordingTable:
+    """Contour table stand-in that records the boards it was asked about."""
+
+    def __init__(self):
+        self.lookups = 0
+
+    def lookup(self, piece_type, shape, heights):
+        self.lookups += 1
+        return None
+
+
+@pytest.mark.parametrize('fill, used', [
+    (None, True),  # Empty board
+    ('hole', False),
+    ('high', False),
+])
+def test_table_is_only_used_on_low_hole_free_boards(fill, used):
+    env = TetrisEnv()
+    _ = env.reset(seed=0)
+    grid = env.board.grid
+    rows = grid.shape[0]
+    if fill == 'hole':
+        grid[rows - 2, 0] = 1
+    elif fill == 'high':
+        grid[rows - (rows - CONTOUR_FREE_ROWS + 1):, 0] = 1
+    agent = HeuristicAgent()
+    agent.contour_table = RecordingTable()
+    assert agent._contour_move(env.board) is None
+    assert agent.contour_table.lookups == (1 if used else 0)
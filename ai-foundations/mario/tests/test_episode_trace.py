@@ -0,0 +1,101 @@
+"""Episode traces written, read back and replayed."""
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+pytest.importorskip('tetris')
+
+from tetris.environment.tetris_env import TetrisEnv
+
+from examples.episode_trace import TraceRecorder, load_trace, replay_actions
+from examples.heuristic_agent import HeuristicAgent
+from examples.test_heuristic_agent import run_test_episode
+
+SEED = 7
+STEPS = 300
+
+
+def piece_name(env: TetrisEnv) -> str:
+    piece_type = env.board.current_piece.type
+    return str(getattr(piece_type, 'value', piece_type))[0]
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    """Trace of a short seeded episode, with what was played in it."""
+    path = str(tmp_path / 'episode.trace')
+    env = TetrisEnv()
+    _ = env.reset(seed=SEED)
+    agent = HeuristicAgent()
+    recorder = TraceRecorder(path, env.board, SEED)
+    actions, pieces, boards = [], [piece_name(env)], [env.board.grid > 0]
+    for _ in range(STEPS):
+        piece = env.board.current_piece
+        action, decision_ms, _, _ = agent.get_best_action(env)
+        _, _, terminated, _, info = env.step(np.int64(action.value))
+        recorder.record(action, decision_ms, env.board, info['lines_cleared'])
+        actions.append(action.value)
+        if env.board.current_piece is not piece:
+            boards.append(env.board.grid > 0)
+            if not terminated:
+                pieces.append(piece_name(env))
+        if terminated:
+            break
+    recorder.close()
+    return path, actions, pieces[:len(boards) - 1], boards
+
+
+def test_trace_round_trip(trace_file):
+    path, actions, pieces, boards = trace_file
+    trace = load_trace(path)
+
+    assert trace.seed == SEED
+    assert (trace.rows, trace.cols) == boards[0].shape
+    assert trace.actions.tolist() == actions
+    assert len(trace.decision_ms) == len(actions)
+    assert trace.piece_types() == pieces
+    assert len(pieces) > 10
+    unpacked = trace.boards()
+    assert unpacked.shape == (len(boards), *boards[0].shape)
+    for recorded, board in zip(unpacked, boards):
+        assert np.array_equal(recorded > 0, board)
+
+
+def test_replay_accepts_trace_and_rejects_other_boards(trace_file):
+    trace = load_trace(trace_file[0])
+    assert replay_actions(trace, TetrisEnv())
+
+    # Fill an empty cell of the board after the first piece
+    packed = trace.packed_boards.copy()
+    boards = trace.boards()
+    row, col = np.argwhere(boards[1] == 0)[0]
+    bit = row * trace.cols + col
+    packed[1, bit // 8] |= 0x80 >> (bit % 8)
+    assert not replay_actions(replace(trace, packed_boards=packed), TetrisEnv())
+
+
+def test_harness_writes_replayable_trace(tmp_path):
+    path = str(tmp_path / 'harness.trace')
+    result = run_test_episode(HeuristicAgent(), delay=0.0, render=False, seed=SEED, max_steps=100,
+                              trace_path=path)
+    trace = load_trace(path)
+    assert trace.seed == SEED
+    assert len(trace.actions) == result['steps']
+    assert replay_actions(trace, TetrisEnv())
+
+
+@pytest.mark.parametrize('corrupt', [
+    lambda data: data[:10],
+    lambda data: data[:-1],
+    lambda data: data + b'\0',
+    lambda data: b'XXXX' + data[4:],
+    lambda data: data[:4] + bytes([data[4] + 1]) + data[5:],
+], ids=['short_header', 'truncated', 'trailing_bytes', 'bad_magic', 'bad_version'])
+def test_corrupted_trace_raises(trace_file, tmp_path, corrupt):
+    with open(trace_file[0], 'rb') as f:
+        data = f.read()
+    path = tmp_path / 'corrupted.trace'
+    _ = path.write_bytes(corrupt(data))
+    with pytest.raises(ValueError):
+        _ = load_trace(str(path))
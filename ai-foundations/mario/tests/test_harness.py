@@ -0,0 +1,20 @@
+"""Episodes of the test harness, played in one process and in several."""
+import pytest
+
+pytest.importorskip('tetris')
+
+from examples.heuristic_agent import HeuristicAgent
+from examples.test_heuristic_agent import run_weight_test
+
+
+@pytest.mark.parametrize('lookahead', [False, True])
+def test_sequential_and_parallel_runs_match(lookahead):
+    weights = HeuristicAgent().weights
+    runs = [
+        run_weight_test(weights, episodes=3, delay=0.0, render=False, seed=11, workers=workers,
+                        lookahead=lookahead, cache=False)
+        for workers in (1, 2)
+    ]
+    sequential, parallel = ([(e['score'], e['lines_cleared'], e['steps']) for e in run['episode_results']]
+                            for run in runs)
+    assert sequential == parallel
@@ -0,0 +1,67 @@
+"""Metrics recordings written in chunks and loaded back."""
+import numpy as np
+import pytest
+
+pytest.importorskip('tetris')
+
+from tetris.environment.tetris_env import Action
+
+from examples.heuristic_agent import HeuristicAgent
+from examples.metrics_recorder import FIXED_COLUMNS, METRIC_DTYPE, MetricsRecorder, load_metrics
+from examples.test_heuristic_agent import run_test_episode
+
+
+def test_chunks_load_back_with_values_and_dtypes(tmp_path):
+    path = str(tmp_path / 'recording')
+    recorder = MetricsRecorder(path, chunk_size=4)
+    actions = list(Action)
+    steps = []
+    # Two full chunks and a partly filled one; 'late' first appears in the
+    # second chunk and 'sparse' is missing from every other step
+    for step in range(1, 11):
+        metrics = {'holes': step * 0.5}
+        if step >= 6:
+            metrics['late'] = -step
+        if step % 2:
+            metrics['sparse'] = step / 3
+        steps.append((step, actions[step % len(actions)], step * 1.5, step * 100, step // 3, step * 0.25, metrics))
+        recorder.record(*steps[-1])
+        if step == 9:
+            # Only whole chunks are on disk before the episode ends
+            assert len(load_metrics(path)['step']) == 8
+            assert len(recorder) == 9
+    recorder.close()
+
+    columns = load_metrics(path)
+    assert {name: str(column.dtype) for name, column in columns.items()} == {
+        **FIXED_COLUMNS, 'holes': METRIC_DTYPE, 'late': METRIC_DTYPE, 'sparse': METRIC_DTYPE
+    }
+    assert columns['step'].tolist() == list(range(1, 11))
+    assert columns['action'].tolist() == [action.value for _, action, *_ in steps]
+    np.testing.assert_array_equal(columns['reward'], np.float32([reward for _, _, reward, *_ in steps]))
+    assert columns['score'].tolist() == [score for *_, score, _, _, _ in steps]
+    assert columns['lines_cleared'].tolist() == [lines for *_, lines, _, _ in steps]
+    np.testing.assert_array_equal(columns['decision_time_ms'], np.float32([ms for *_, ms, _ in steps]))
+    for name in ('holes', 'late', 'sparse'):
+        expected = np.float32([metrics.get(name, np.nan) for *_, metrics in steps])
+        np.testing.assert_array_equal(columns[name], expected)
+
+
+def test_harness_recording_matches_metrics_history(tmp_path):
+    path = str(tmp_path / 'episode')
+    recorded = run_test_episode(HeuristicAgent(), delay=0.0, render=False, seed=0, record_dir=path)
+    in_memory = run_test_episode(HeuristicAgent(), delay=0.0, render=False, seed=0)
+    history = in_memory['metrics_history']
+    # A finished game spanning more than one chunk, ending on a partly filled one
+    assert recorded['steps'] == len(history) > 1024
+    assert len(history) % 1024
+
+    columns = load_metrics(path)
+    assert columns['step'].tolist() == [entry['step'] for entry in history]
+    assert columns['action'].tolist() == [Action[entry['action']].value for entry in history]
+    for name, column in columns.items():
+        if name in ('step', 'action', 'decision_time_ms'):
+            continue
+        default = np.nan if column.dtype.kind == 'f' else 0
+        expected = np.array([entry.get(name, default) for entry in history]).astype(column.dtype)
+        np.testing.assert_array_equal(column, expected, err_msg=name)
@@ -0,0 +1,45 @@
+"""Batched placement against the per-board path."""
+import copy
+
+import numpy as np
+import pytest
+
+pytest.importorskip('tetris')
+
+from examples.board_features import column_heights
+from examples.placement import list_placements, place_pieces, place_pieces_on
+
+
+def test_place_pieces_on_matches_place_pieces(random_boards, piece_shape):
+    boards = random_boards(30)
+    expected_grids, expected_lines, stacked, placements = [], [], [], []
+    for board in boards:
+        listed = list_placements(column_heights(board)[0], board.shape[0], piece_shape)
+        grids, lines = place_pieces(board, copy.deepcopy(listed))
+        expected_grids.extend(grids)
+        expected_lines.extend(lines.tolist())
+        stacked.extend([board] * len(listed))
+        placements.extend(listed)
+
+    # Every board's placements in one stack, some without their cells
+    for placement in placements[::3]:
+        placement.cells = None
+    grids, lines = place_pieces_on(np.stack(stacked), placements)
+    assert np.array_equal(grids, np.stack(expected_grids))
+    assert lines.tolist() == expected_lines
+    for placement, grid in zip(placements, grids):
+        assert placement.grid is not None and np.array_equal(placement.grid, grid)
+
+
+def test_place_pieces_on_leaves_input_boards_alone(random_boards, piece_shape):
+    board = random_boards(1)[0]
+    original = board.copy()
+    placements = list_placements(column_heights(board)[0], board.shape[0], piece_shape)
+    _ = place_pieces_on(np.repeat(board[np.newaxis], len(placements), axis=0), placements)
+    _ = place_pieces(board, placements)
+    assert np.array_equal(board, original)
+
+
+def test_place_pieces_on_without_placements():
+    grids, lines = place_pieces_on(np.zeros((0, 20, 10), dtype=np.int8), [])
+    assert grids.shape == (0, 20, 10) and lines.shape == (0,)
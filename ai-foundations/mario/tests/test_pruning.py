@@ -0,0 +1,33 @@
+"""Branch-and-bound pruning of the lookahead."""
+import numpy as np
+import pytest
+
+pytest.importorskip('tetris')
+
+from tetris.environment.tetris_env import TetrisEnv
+
+from examples.heuristic_agent import HeuristicAgent
+
+
+def test_pruning_needs_lookahead():
+    with pytest.raises(ValueError):
+        _ = HeuristicAgent(prune=True)
+    _ = HeuristicAgent(prune=True, lookahead=True)
+    _ = HeuristicAgent(prune=True, deadline_ms=50.0)
+
+
+def test_pruned_lookahead_plays_the_same_moves():
+    envs = [TetrisEnv(), TetrisEnv()]
+    agents = [HeuristicAgent(lookahead=True, transposition_size=0),
+              HeuristicAgent(lookahead=True, transposition_size=0, prune=True)]
+    for env in envs:
+        _ = env.reset(seed=3)
+    pruned = 0
+    for _ in range(600):
+        actions = [agent.get_best_action(env)[0] for agent, env in zip(agents, envs)]
+        assert actions[0] == actions[1]
+        pruned += agents[1].last_stats.pruned_states
+        results = [env.step(np.int64(action.value)) for env, action in zip(envs, actions)]
+        if results[0][2]:
+            break
+    assert pruned > 0
@@ -0,0 +1,42 @@
+"""Simulation boards against each other and against the engine's Board."""
+import pytest
+
+pytest.importorskip('tetris')
+
+from tetris.environment.tetris_env import TetrisEnv
+
+from examples.sim_board import SimBoard, BitBoard
+
+
+def test_bitboard_fits_matches_simboard(random_boards, piece_shape):
+    for board in random_boards(40):
+        rows, cols = board.shape
+        sim = SimBoard(board, 'piece', piece_shape, 3, 0)
+        bits = BitBoard(board, 'piece', piece_shape, 3, 0)
+        for rotation in range(4):
+            for x in range(-4, cols + 2):
+                for y in range(-4, rows + 2):
+                    assert bits.fits(x, y, rotation) == sim.fits(x, y, rotation), (rotation, x, y)
+
+
+def test_simboard_rotation_matches_board():
+    env = TetrisEnv()
+    seen: set[object] = set()
+    for seed in range(500):
+        _ = env.reset(seed=seed)
+        board = env.board
+        piece = board.current_piece
+        if piece is None or piece.type in seen:
+            continue
+        seen.add(piece.type)
+        # Room below the spawn row for rotations that reach downwards
+        for _ in range(2):
+            _ = board.move_down()
+        sim = SimBoard.from_board(board)
+        for clockwise in (True,) * 4 + (False,) * 4 + (True, False, False, True):
+            _ = board.rotate(clockwise)
+            _ = sim.rotate(clockwise)
+            real, simulated = board.current_piece, sim.current_piece
+            assert (simulated.x, simulated.y) == (real.x, real.y), piece.type
+            assert (simulated.shape > 0).tolist() == (real.shape > 0).tolist(), piece.type
+    assert len(seen) == 7
@@ -0,0 +1,22 @@
+"""Boards stepped together in a vectorized environment."""
+import numpy as np
+import pytest
+
+pytest.importorskip('tetris')
+
+from examples.heuristic_agent import HeuristicAgent
+from examples.vector_env import VectorTetrisEnv
+
+
+def test_grids_follow_the_boards_and_feed_batched_decisions():
+    vec_env = VectorTetrisEnv(4, seed=0)
+    _ = vec_env.reset()
+    from_grids, from_boards = HeuristicAgent(), HeuristicAgent()
+    for _ in range(300):
+        assert vec_env.grids is not None and vec_env.grids.shape[0] == 4
+        for env, grid in zip(vec_env.envs, vec_env.grids):
+            assert np.array_equal(env.board.grid, grid)
+        actions, _ = from_grids.get_best_actions(vec_env.envs, vec_env.grids)
+        expected, _ = from_boards.get_best_actions(vec_env.envs)
+        assert actions == expected
+        _ = vec_env.step(np.array([action.value for action in actions]))